@@ -0,0 +1,136 @@
+"""Animation scheduler for run_game: named tweens with easing and callbacks on one scalable, injectable clock."""
+import inspect
+import math
+
+import pygame
+
+def linear(t):
+    return t
+
+def ease_out_quad(t):
+    return 1.0 - (1.0 - t) * (1.0 - t)
+
+def wave(now, period_ms):
+    """0..1 sine with the given period, for pulses and blinks that loop forever."""
+    phase = (now % period_ms) / float(period_ms)
+    return 0.5 + 0.5 * math.sin(2 * math.pi * phase)
+
+class ManualClock:
+    """A clock that only moves when told to, so a headless run can advance() through a round."""
+
+    def __init__(self, ms=0):
+        self.ms = ms
+
+    def __call__(self):
+        return self.ms
+
+    def advance(self, ms):
+        self.ms += ms
+
+class Tween:
+    """One running animation; tween["key"] reads (and sets) whatever data start() was given."""
+
+    def __init__(self, name, start, duration, ease, on_done, data):
+        self.name = name
+        self.start = start
+        self.duration = duration
+        self.ease = ease
+        self.on_done = on_done
+        self.data = data
+
+    @property
+    def end(self):
+        return self.start + self.duration
+
+    def elapsed(self, now):
+        return now - self.start
+
+    def progress(self, now):
+        """Eased 0..1 at time now."""
+        t = (now - self.start) / float(self.duration) if self.duration > 0 else 1.0
+        return self.ease(min(1.0, max(0.0, t)))
+
+    def __getitem__(self, key):
+        return self.data[key]
+
+    def __setitem__(self, key, value):
+        self.data[key] = value
+
+class Animator:
+    """
+    Named tweens on one clock. tick() once per frame samples the clock and
+    sets now (animation ms); await update() then retires the tweens that are
+    over and fires their on_done(tween) in start order. Callbacks may be
+    coroutines and may start follow-up tweens (start=tween.end keeps a
+    sequence on schedule); those already over finish in the same update().
+    start() replaces a running tween of the same name.
+
+    time_scale speeds animation time up (2.0) or slows it down (0.5) against
+    the clock. clock is any function returning ms: pygame's ticks by
+    default, a ManualClock for deterministic runs.
+    """
+
+    def __init__(self, clock=None, time_scale=1.0):
+        self.clock = clock
+        self.time_scale = time_scale
+        self.tweens = {}      # name -> Tween, in start order
+        self.now = 0
+        self._time = None     # animation time (float, so slow scales still add up)
+        self._ticks = None    # clock reading at the last tick()
+
+    def _read(self):
+        return self.clock() if self.clock is not None else pygame.time.get_ticks()
+
+    def set_clock(self, clock):
+        """Switch clocks without a jump in animation time."""
+        self.clock = clock
+        if self._ticks is not None:
+            self._ticks = self._read()
+
+    def tick(self):
+        ticks = self._read()
+        if self._ticks is None:
+            self._time = float(ticks)
+        else:
+            self._time += (ticks - self._ticks) * self.time_scale
+        self._ticks = ticks
+        self.now = int(self._time)
+        return self.now
+
+    @property
+    def active(self):
+        """Something is moving (the loop has to keep drawing at full rate)."""
+        return bool(self.tweens)
+
+    def __contains__(self, name):
+        return name in self.tweens
+
+    def get(self, name):
+        return self.tweens.get(name)
+
+    def start(self, name, duration, ease=linear, on_done=None, start=None, **data):
+        tween = Tween(name, self.now if start is None else start, duration, ease, on_done, data)
+        self.tweens.pop(name, None)
+        self.tweens[name] = tween
+        return tween
+
+    def cancel(self, name):
+        self.tweens.pop(name, None)
+
+    def ends_within(self, ms):
+        """True if a tween finishes in the next ms (animation time)."""
+        return any(tween.end <= self.now + ms for tween in self.tweens.values())
+
+    async def update(self):
+        while True:
+            done = [tween for tween in self.tweens.values() if tween.end <= self.now]
+            if not done:
+                return
+            for tween in done:
+                if self.tweens.get(tween.name) is not tween:
+                    continue   # cancelled or restarted by an earlier callback
+                del self.tweens[tween.name]
+                if tween.on_done is not None:
+                    result = tween.on_done(tween)
+                    if inspect.isawaitable(result):
+                        await result
@@ -0,0 +1,299 @@
+"""Integer hexagram engine: 6-bit codes and precomputed transition tables."""
+import hashlib
+import os
+import struct
+import sys
+from array import array
+from collections import deque
+
+try:
+    import mmap
+except ImportError:  # not every web runtime ships mmap
+    mmap = None
+
+HEX_COUNT = 64
+
+# Packed solver entries: distance in the low DIST_BITS, first-move bitset above
+DIST_BITS = 7
+DIST_MASK = (1 << DIST_BITS) - 1
+UNREACHABLE = DIST_MASK
+
+# --- Encoding ---
+# Binary strings are bottom-first ("line 1" is the first char), so line N
+# lands in bit N-1 of the code.
+def to_code(binary):
+    return int(binary[::-1], 2)
+
+def to_binary(code):
+    return format(code, "06b")[::-1]
+
+BINARIES = [to_binary(c) for c in range(HEX_COUNT)]   # code -> "010011"
+CODES = {b: c for c, b in enumerate(BINARIES)}        # "010011" -> code
+
+def build_transitions(funcs):
+    """
+    Run every string transform once over all 64 hexagrams.
+    Returns one 64-byte row per transform: row[code] is the resulting code.
+    """
+    return [bytes(CODES[func(b)] for b in BINARIES) for func in funcs]
+
+def shortest_path_with_allowed(transitions, start, goal, allowed_indices):
+    """
+    BFS on 64 hexagram codes using only transforms in allowed_indices.
+    Returns (distance:int or None, first_moves:set[int]).
+    If start==goal → (0, set()).
+    """
+    if start == goal:
+        return 0, set()
+
+    rows = [(idx, transitions[idx]) for idx in allowed_indices]
+
+    # BFS state
+    dist = {start: 0}
+    first_move = {start: None}   # first transform index taken from the start to reach this node
+    q = deque([start])
+
+    best_distance = None
+    optimal_first_moves = set()
+
+    while q:
+        cur = q.popleft()
+        d = dist[cur]
+
+        # If we already found goal at distance best_distance, do not expand deeper layers
+        if best_distance is not None and d >= best_distance:
+            continue
+
+        for idx, row in rows:
+            nxt = row[cur]
+
+            # Determine the first move to reach nxt
+            fm = idx if cur == start else first_move[cur]
+
+            # First time we see nxt
+            if nxt not in dist:
+                dist[nxt] = d + 1
+                first_move[nxt] = fm
+
+                # If we reached the goal, record best distance and first move
+                if nxt == goal:
+                    if best_distance is None:
+                        best_distance = d + 1
+                    optimal_first_moves.add(fm)
+
+                # Only enqueue nodes up to best_distance
+                if best_distance is None or (d + 1) <= best_distance:
+                    q.append(nxt)
+
+            # If we have seen nxt at the same depth, still collect first moves
+            elif nxt == goal and dist[nxt] == d + 1:
+                optimal_first_moves.add(fm)
+
+    return best_distance, optimal_first_moves
+
+# --- All-pairs tables per unlock mask ---
+def mask_from_flags(flags):
+    """[True, False, True, ...] (TRANSFORM_UNLOCKED) -> bitmask with bit i = transform i."""
+    mask = 0
+    for i, ok in enumerate(flags):
+        if ok:
+            mask |= 1 << i
+    return mask
+
+def bit_indices(bits):
+    """Transform indices set in a bitmask/bitset, lowest first."""
+    return [i for i in range(bits.bit_length()) if bits >> i & 1]
+
+def entry_typecode(n_transforms):
+    """Array typecode wide enough for DIST_BITS + one bit per transform."""
+    return "H" if DIST_BITS + n_transforms <= 16 else "I"
+
+def solve_mask(transitions, mask):
+    """
+    All-pairs table for one unlock mask.
+    Returns an array indexed start * 64 + goal; each entry packs the distance
+    (UNREACHABLE if there is no path) and the first-move bitset, matching what
+    shortest_path_with_allowed returns for the same query.
+    """
+    rows = [(idx, transitions[idx]) for idx in bit_indices(mask)]
+    table = array(entry_typecode(len(transitions)), [UNREACHABLE]) * (HEX_COUNT * HEX_COUNT)
+
+    for start in range(HEX_COUNT):
+        # Plain BFS from start; first_move is whatever the first discovery used,
+        # exactly like the reference search.
+        dist = {start: 0}
+        first_move = {}
+        order = [start]
+        for cur in order:
+            d = dist[cur] + 1
+            for idx, row in rows:
+                nxt = row[cur]
+                if nxt not in dist:
+                    dist[nxt] = d
+                    first_move[nxt] = idx if cur == start else first_move[cur]
+                    order.append(nxt)
+
+        # A goal's optimal first moves are the first moves of every node one
+        # layer closer that has an edge into it (direct edges for the start).
+        moves = dict.fromkeys(order, 0)
+        for cur in order:
+            d = dist[cur] + 1
+            for idx, row in rows:
+                nxt = row[cur]
+                if dist[nxt] == d:
+                    moves[nxt] |= 1 << (idx if cur == start else first_move[cur])
+
+        base = start * HEX_COUNT
+        for goal in order:
+            table[base + goal] = dist[goal] | (moves[goal] << DIST_BITS)
+
+    return table
+
+class SolverTables:
+    """Distance / first-move tables for every unlock mask, each solved on first use."""
+
+    def __init__(self, transitions, blob=None):
+        self.transitions = transitions
+        self.tables = {}   # mask -> packed array from solve_mask
+        self.blob = blob   # every mask's table back to back (cache file), or None
+
+    def table(self, mask):
+        table = self.tables.get(mask)
+        if table is None:
+            if self.blob is not None:
+                size = HEX_COUNT * HEX_COUNT
+                table = self.blob[mask * size:(mask + 1) * size]
+            else:
+                table = solve_mask(self.transitions, mask)
+            self.tables[mask] = table
+        return table
+
+    def build_all(self):
+        for mask in range(1 << len(self.transitions)):
+            self.table(mask)
+
+    def lookup(self, mask, start, goal):
+        """(distance or None, first-move bitset) for start -> goal under mask."""
+        entry = self.table(mask)[start * HEX_COUNT + goal]
+        d = entry & DIST_MASK
+        return (None if d == UNREACHABLE else d), entry >> DIST_BITS
+
+# --- Bitboard search ---
+# A set of hexagrams is one int with bit `code` set, so a whole BFS frontier
+# expands with a few table lookups instead of one node at a time.
+ALL_HEXAGRAMS = (1 << HEX_COUNT) - 1
+
+def board_of(codes):
+    board = 0
+    for code in codes:
+        board |= 1 << code
+    return board
+
+def build_images(transitions):
+    """Per transform, the image bitboard of every singleton: images[idx][code]."""
+    return [[1 << row[code] for code in range(HEX_COUNT)] for row in transitions]
+
+class Bitboards:
+    """Set-at-a-time search; the step table of each unlock mask is built on first use."""
+
+    def __init__(self, transitions):
+        self.images = build_images(transitions)
+        self.steps = {}   # mask -> 8 byte lanes x 256 successor boards
+
+    def step_table(self, mask):
+        lanes = self.steps.get(mask)
+        if lanes is None:
+            singles = [0] * HEX_COUNT
+            for idx in bit_indices(mask):
+                for code, image in enumerate(self.images[idx]):
+                    singles[code] |= image
+            # lane[byte] = union of the successors of the codes set in that byte
+            lanes = []
+            for lane in range(8):
+                table = [0] * 256
+                for value in range(1, 256):
+                    low = value & -value
+                    table[value] = table[value ^ low] | singles[lane * 8 + low.bit_length() - 1]
+                lanes.append(table)
+            self.steps[mask] = lanes
+        return lanes
+
+    def expand(self, mask, frontier):
+        """Every hexagram one move away from any hexagram in frontier."""
+        l0, l1, l2, l3, l4, l5, l6, l7 = self.step_table(mask)
+        return (l0[frontier & 255] | l1[frontier >> 8 & 255]
+                | l2[frontier >> 16 & 255] | l3[frontier >> 24 & 255]
+                | l4[frontier >> 32 & 255] | l5[frontier >> 40 & 255]
+                | l6[frontier >> 48 & 255] | l7[frontier >> 56])
+
+    def reachable_within(self, mask, sources, moves):
+        """Bitboard of everything reachable from sources in at most `moves` moves."""
+        seen = frontier = sources
+        for _ in range(moves):
+            frontier = self.expand(mask, frontier) & ~seen
+            if not frontier:
+                break
+            seen |= frontier
+        return seen
+
+# --- On-disk cache (solver.bin next to hexagrams.json) ---
+# Header, then the packed table of every mask 0 .. 2**n - 1, little-endian.
+CACHE_MAGIC = b"HXST"
+CACHE_VERSION = 1
+CACHE_HEADER = struct.Struct("<4sHHH20s2x")   # magic, version, n transforms, entry size, fingerprint (32 bytes)
+
+def fingerprint(transitions):
+    """Hash of what the transforms actually do; any change to TRANSFORMATIONS changes it."""
+    return hashlib.sha1(b"".join(transitions)).digest()
+
+def save_tables(path, tables):
+    """Solve every mask and write the cache file (atomically replaces path)."""
+    n = len(tables.transitions)
+    typecode = entry_typecode(n)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(CACHE_HEADER.pack(
+            CACHE_MAGIC, CACHE_VERSION, n, array(typecode).itemsize, fingerprint(tables.transitions)
+        ))
+        for mask in range(1 << n):
+            table = array(typecode, tables.table(mask))
+            if sys.byteorder != "little":
+                table.byteswap()
+            f.write(table.tobytes())
+    os.replace(tmp_path, path)
+
+def load_tables(path, transitions, whole_file=False):
+    """
+    SolverTables backed by the cache file at path: memory-mapped, or read as
+    one blob when whole_file is set (web). A missing or stale file (other
+    fingerprint or layout) falls back to solving masks on first use.
+    """
+    tables = SolverTables(transitions)
+    try:
+        with open(path, "rb") as f:
+            if whole_file or mmap is None:
+                buf = f.read()
+            else:
+                buf = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError) as e:
+        print(f"[solver-cache] not loaded from {path}: {e}")
+        return tables
+
+    n = len(transitions)
+    typecode = entry_typecode(n)
+    itemsize = array(typecode).itemsize
+    expected = (CACHE_MAGIC, CACHE_VERSION, n, itemsize, fingerprint(transitions))
+    size = CACHE_HEADER.size + (1 << n) * HEX_COUNT * HEX_COUNT * itemsize
+    if len(buf) != size or CACHE_HEADER.unpack_from(buf) != expected:
+        print(f"[solver-cache] {path} is stale; solving masks on demand")
+        return tables
+
+    data = memoryview(buf)[CACHE_HEADER.size:]
+    if sys.byteorder == "little":
+        tables.blob = data.cast(typecode)
+    else:
+        swapped = array(typecode)
+        swapped.frombytes(data)
+        swapped.byteswap()
+        tables.blob = memoryview(swapped)
+    return tables
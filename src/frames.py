@@ -0,0 +1,120 @@
+"""Frame pacing for run_game (capped FPS while something moves, input-driven when static) and partial repaints."""
+import asyncio
+
+import pygame
+
+# How fast to redraw (modes, from frame_mode() in main.py)
+IDLE, AMBIENT, MOTION = 0, 1, 2
+MOTION_FPS = 60          # swooshes, flips, the win sequence, pending card
+AMBIENT_FPS = 20         # slow pulses/blinks (Coins outline, hint ring, prompt arrow)
+IDLE_REDRAW_MS = 1000    # static screen: redraw this often even without input
+WAIT_SLICE_MS = 50       # longest single blocking wait, so other asyncio tasks still run
+MAX_CLIPS = 4            # partial frames are drawn once per clip rect, at most this many
+
+class FrameScheduler:
+    """
+    await next_frame(mode) once per loop instead of asyncio.sleep(0): it returns
+    the input events when the next frame is due. Desktop blocks in
+    pygame.event.wait between frames; on the web (pygbag) it never blocks and
+    just yields to the browser until a frame is due.
+    """
+
+    def __init__(self, web=False, motion_fps=MOTION_FPS, ambient_fps=AMBIENT_FPS,
+                 idle_redraw_ms=IDLE_REDRAW_MS):
+        self.web = web
+        self.intervals = {
+            IDLE: idle_redraw_ms,
+            AMBIENT: 1000 // ambient_fps,
+            MOTION: 1000 // motion_fps,
+        }
+        self.last = None   # ticks of the last frame
+
+    async def next_frame(self, mode):
+        """Events since the last frame, once a frame is due (input makes it due sooner)."""
+        await asyncio.sleep(0)   # always yield once per frame (pygbag needs it)
+        pending = pygame.event.get()
+        if self.last is None:
+            self.last = pygame.time.get_ticks()
+            return pending
+
+        while True:
+            now = pygame.time.get_ticks()
+            # input is answered at the motion rate; otherwise wait out this mode's interval
+            due = self.last + self.intervals[MOTION if pending else mode]
+            if now >= due:
+                self.last = now
+                return pending
+            if not self.web:
+                event = pygame.event.wait(min(due - now, WAIT_SLICE_MS))
+                if event.type != pygame.NOEVENT:
+                    pending.append(event)
+            await asyncio.sleep(0)
+            pending += pygame.event.get()
+
+def clip_rects(rects, limit=MAX_CLIPS):
+    """
+    Clips covering rects: overlapping ones are merged, then (while there are
+    more than limit) the pair whose union adds the least area.
+    """
+    clips = [rect for rect in rects if rect.width > 0 and rect.height > 0]
+    i = 0
+    while i < len(clips):
+        hit = clips[i].collidelist(clips[i + 1:])
+        if hit < 0:
+            i += 1
+        else:
+            clips[i] = clips[i].union(clips.pop(i + 1 + hit))
+            i = 0
+    area = lambda r: r.width * r.height
+    while len(clips) > limit:
+        i, j = min(((i, j) for i in range(len(clips)) for j in range(i + 1, len(clips))),
+                   key=lambda p: area(clips[p[0]].union(clips[p[1]])) - area(clips[p[0]]) - area(clips[p[1]]))
+        clips[i] = clips[i].union(clips.pop(j))
+    return clips
+
+class DirtyRects:
+    """
+    Partial repaints. Drawing code mark()s the rects it animates in place
+    (pulses, flips, swoosh paths) and the caller names the rects it damaged
+    before drawing (a hover box that moved); when nothing else can have
+    changed since the last frame (same scene key, no forced full frame), the
+    next frame is drawn once per clip over those rects (see clip_rects) and
+    only they are presented.
+    """
+
+    def __init__(self, enabled=True):
+        self.enabled = enabled
+        self.key = None
+        self.full = True
+        self.last = []      # rects marked during the previous frame
+        self.damaged = []   # rects damaged before this frame was drawn
+        self.marked = []    # rects marked during this one
+
+    def begin(self, key, full=False, damaged=()):
+        """
+        Start a frame; returns the clips to draw it through, one pass each:
+        [None] (everything) for a full frame. With nothing to repaint it is
+        one empty clip, so the animations still get to mark() their rects.
+        """
+        self.last, self.marked = self.marked, []
+        self.damaged = [pygame.Rect(rect) for rect in damaged]
+        self.full = full or not self.enabled or key != self.key
+        self.key = key
+        if self.full:
+            return [None]
+        return clip_rects(self.last + self.damaged) or [pygame.Rect(0, 0, 0, 0)]
+
+    def mark(self, rect):
+        rect = pygame.Rect(rect)
+        if rect not in self.marked:   # every pass over the frame marks again
+            self.marked.append(rect)
+
+    def present(self, surface, key):
+        """Show the frame; key is the scene key again, after drawing."""
+        surface.set_clip(None)
+        if key != self.key:
+            self.key = None   # the scene changed mid-frame (outside the clip): repaint it all next time
+        if self.full:
+            pygame.display.flip()
+        elif self.last or self.damaged or self.marked:
+            pygame.display.update(self.last + self.damaged + self.marked)
@@ -0,0 +1,257 @@
+"""Headless game rules: one run of Hexadeck as a plain object (no pygame)."""
+import random
+
+from engine import HEX_COUNT, bit_indices, mask_from_flags
+from transforms import TRANSFORMATIONS
+
+# --- Rules / balancing knobs (defaults for GameState) ---
+TRANSFORMATION_LIMIT = 10   # moves per round before it fails
+BUY_START_COST = 6          # cost of the first purchase
+BUY_COST_STEP  = 6          # cost increase after each purchase
+HINT_COST_IP = 1            # cost of a one-move hint (Insight Points)
+OPTIMAL_BONUS_IP  = 1       # +1 if the round used exactly the optimal number of moves (even with hints)
+HINT_PENALTY_IP   = 1       # −1 per hint
+SUCCESS_AWARD_MIN_IP = 1    # floor for any successful round (even with hints)
+
+# Free transforms (no purchase needed), by TRANSFORMATIONS "short" label
+FREEBIE_SHORTS = {"SHIFT", "INVERT ▼", "MIRROR ▲"}
+FREEBIE_MASK = mask_from_flags([t["short"] in FREEBIE_SHORTS for t in TRANSFORMATIONS])
+
+class GameState:
+    """
+    Everything the rules care about, stepped by explicit calls:
+    toss() → play()/buy()/buy_hint() … → end_round() → toss() …
+    The chain and goal are hexagram codes; the pygame front end only draws them.
+    """
+
+    __slots__ = (
+        # tables and rules
+        "transitions", "solver", "limit", "buy_start_cost", "buy_cost_step",
+        "hint_cost", "optimal_bonus", "hint_penalty", "success_min", "freebies",
+        # run
+        "seed", "rng", "pool", "collected", "unlocked", "buy_cost", "balance",
+        "total_moves", "total_optimal", "total_insight", "total_spent",
+        "run_hints", "hints_used", "streak", "best_streak",
+        # round
+        "chain", "goal", "round_start", "shortest", "round_optimal", "live_dist", "live_moves",
+        "outcome", "locked", "failed", "awarded", "round_insight", "round_hints",
+        "hint_active", "shop_open",
+    )
+
+    def __init__(self, solver, seed=None, *, limit=TRANSFORMATION_LIMIT,
+                 buy_start_cost=BUY_START_COST, buy_cost_step=BUY_COST_STEP,
+                 hint_cost=HINT_COST_IP, optimal_bonus=OPTIMAL_BONUS_IP,
+                 hint_penalty=HINT_PENALTY_IP, success_min=SUCCESS_AWARD_MIN_IP,
+                 freebies=FREEBIE_MASK):
+        self.solver = solver
+        self.transitions = solver.transitions
+        self.limit = limit
+        self.buy_start_cost = buy_start_cost
+        self.buy_cost_step = buy_cost_step
+        self.hint_cost = hint_cost
+        self.optimal_bonus = optimal_bonus
+        self.hint_penalty = hint_penalty
+        self.success_min = success_min
+        self.freebies = freebies
+        self.new_run(seed)
+        self.chain = []
+        self.goal = None
+        self.locked = False
+        self.new_round()
+        self.shop_open = False     # no shop before the first toss
+
+    # --- resets ---
+    def new_run(self, seed=None):
+        """
+        Clear everything that accumulates across rounds. Each run draws from
+        its own RNG, so (seed, moves) reproduces a run exactly.
+        """
+        self.seed = random.getrandbits(32) if seed is None else seed
+        self.rng = random.Random(self.seed)
+        self.pool = bytearray(range(HEX_COUNT))   # goals not dealt yet this run
+        self.collected = set()
+        self.unlocked = self.freebies
+        self.buy_cost = self.buy_start_cost
+        self.balance = 0
+        self.total_moves = 0
+        self.total_optimal = 0
+        self.total_insight = 0
+        self.total_spent = 0
+        self.run_hints = 0
+        self.hints_used = False
+        self.streak = 0
+        self.best_streak = 0
+
+    def new_round(self):
+        """Clear the per-round flags (the chain and goal are set by toss)."""
+        self.round_start = None
+        self.shortest = None
+        self.round_optimal = None
+        self.live_dist = None
+        self.live_moves = 0
+        self.outcome = None        # None, "success" or "failure"
+        self.failed = False
+        self.awarded = False
+        self.round_insight = 0
+        self.round_hints = 0
+        self.hint_active = False
+        self.shop_open = True
+
+    # --- queries ---
+    @property
+    def current(self):
+        return self.chain[-1]
+
+    @property
+    def moves(self):
+        return len(self.chain) - 1
+
+    @property
+    def deck_complete(self):
+        return len(self.collected) >= HEX_COUNT
+
+    def is_unlocked(self, idx):
+        return 0 <= idx < len(self.transitions) and bool(self.unlocked >> idx & 1)
+
+    def hint_moves(self):
+        """Transform indices that start a shortest path from the current card."""
+        return bit_indices(self.live_moves)
+
+    def can_buy(self, idx):
+        return (self.shop_open and 0 <= idx < len(self.transitions)
+                and not self.is_unlocked(idx) and self.balance >= self.buy_cost)
+
+    def recompute_live(self):
+        """Distance / first moves from the current card (hint rings, POSSIBLE marker)."""
+        if self.goal is None or not self.chain:
+            self.live_dist, self.live_moves = None, 0
+            return
+        self.live_dist, self.live_moves = self.solver.lookup(self.unlocked, self.current, self.goal)
+
+    def recompute_static(self, anchor=None):
+        """Static OPTIMAL distance from anchor (the round's start card by default)."""
+        if anchor is None:
+            anchor = self.round_start
+        if self.goal is None or anchor is None:
+            self.round_optimal = None
+            return
+        self.round_optimal, _ = self.solver.lookup(self.unlocked, anchor, self.goal)
+
+    # --- actions ---
+    def toss(self, start=None, full_reset=False, seed=None):
+        """
+        Deal a round: start card (random, or start e.g. the last goal) and an
+        unused goal. full_reset starts a new run (fresh seed unless given).
+        Returns False when no goal is left (the run is locked).
+        """
+        self.new_round()
+        if full_reset:
+            self.new_run(seed)
+            self.shop_open = False
+
+        if start is None:
+            start = self.rng.getrandbits(6)   # six 50/50 yin-yang lines
+        self.chain = [start]
+        self.locked = False
+
+        # Draw from the unused pool; the start card is parked at the end so it can't be drawn
+        pool = self.pool
+        at = pool.find(start)
+        if at >= 0:
+            pool[at], pool[-1] = pool[-1], start
+        n = len(pool) - (at >= 0)
+        if n == 0:
+            self.locked = True
+            return False
+        pick = self.rng.randrange(n)
+        self.goal = pool[pick]
+        pool[pick] = pool[-1]
+        pool.pop()
+
+        self.round_start = start
+        self.shortest, _ = self.solver.lookup(self.unlocked, start, self.goal)
+        self.recompute_static()
+        self.recompute_live()
+        return True
+
+    def play(self, idx):
+        """Apply TRANSFORMATIONS[idx]; returns the new code, or None if the move isn't allowed."""
+        if self.locked or not self.chain or not self.is_unlocked(idx):
+            return None
+        code = self.transitions[idx][self.current]
+        self.chain.append(code)
+        self.shop_open = False
+        self.hint_active = False     # a hint lasts for one move
+        self.recompute_live()
+
+        if code == self.goal:
+            self.collected.add(code)
+            optimal = self.shortest if self.shortest is not None else self.moves
+            self._finish("success", optimal)
+        elif self.moves >= self.limit:
+            self.failed = True
+            optimal = self.round_optimal if self.round_optimal is not None else self.moves
+            self._finish("failure", optimal)
+        return code
+
+    def _finish(self, outcome, optimal):
+        """Lock the round and add it to the run totals (awards come in end_round)."""
+        self.locked = True
+        self.outcome = outcome
+        self.round_insight = max(1, optimal * 2 - self.moves)
+        self.total_moves += self.moves
+        self.total_optimal += optimal
+
+    def buy(self, idx):
+        """Unlock a transform for the rest of the run. Returns True if bought."""
+        if not self.can_buy(idx):
+            return False
+        self.balance -= self.buy_cost
+        self.total_spent += self.buy_cost
+        self.unlocked |= 1 << idx
+        self.buy_cost += self.buy_cost_step
+        self.recompute_live()
+        # mid-round purchase: measure OPTIMAL again from the current card
+        self.recompute_static(self.current if self.chain else None)
+        return True
+
+    def buy_hint(self):
+        """Show the optimal moves for the next move only. Returns True if bought."""
+        if self.hint_active or self.balance < self.hint_cost:
+            return False
+        self.hint_active = True
+        self.balance -= self.hint_cost
+        self.total_spent += self.hint_cost
+        self.round_hints += 1
+        self.run_hints += 1
+        self.hints_used = True
+        return True
+
+    def end_round(self):
+        """Grant the round's Insight Points once (streak, bonuses). Returns the award."""
+        if self.awarded:
+            return self.round_insight
+        self.awarded = True
+
+        moves = self.moves
+        optimal = self.round_optimal if self.round_optimal is not None else moves
+        was_optimal = (self.round_optimal is not None and moves == self.round_optimal)
+
+        # hintless optimal streak
+        if self.outcome == "success" and self.round_hints == 0 and was_optimal:
+            self.streak += 1
+            self.best_streak = max(self.best_streak, self.streak)
+        else:
+            self.streak = 0
+
+        if self.outcome == "success":
+            base = max(1, optimal * 2 - moves)
+            bonus = self.optimal_bonus if was_optimal else 0
+            gained = base + bonus + self.streak - self.hint_penalty * self.round_hints
+            gained = max(self.success_min, gained)
+            self.balance += gained
+            self.total_insight += gained
+        else:
+            gained = 0
+        self.round_insight = gained
+        return gained
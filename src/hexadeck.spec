@@ -7,6 +7,7 @@ a = Analysis(
     binaries=[],
     datas=[
         ('hexagrams.json', '.'),
+        ('solver.bin', '.'),
         ('iching.png', '.'),
         ('fonts', 'fonts'),
     ],
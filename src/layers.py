@@ -0,0 +1,37 @@
+"""Static layers: parts of the screen that only change with game state, cached as one surface each."""
+import pygame
+
+class Layer:
+    """
+    paint(surface, *args) draws the layer at (0, 0) onto a surface of the
+    layer's size (args are whatever blit() was given after the key).
+    blit() repaints the cached surface only when the key (everything paint
+    reads: state, page, fonts, layout) or the size changed since last time,
+    then composites it with a single blit. With a colorkey, pixels left in that
+    color stay transparent (for layers that only outline things).
+    """
+
+    def __init__(self, paint, colorkey=None):
+        self.paint = paint
+        self.colorkey = colorkey
+        self.key = None
+        self.surface = None
+        self.builds = 0
+
+    def invalidate(self):
+        self.surface = None
+
+    def render(self, size, key, *args):
+        """The cached surface for this key, repainted if needed."""
+        if self.surface is None or self.surface.get_size() != tuple(size) or key != self.key:
+            self.surface = pygame.Surface(size)
+            if self.colorkey is not None:
+                self.surface.fill(self.colorkey)
+                self.surface.set_colorkey(self.colorkey)
+            self.paint(self.surface, *args)
+            self.key = key
+            self.builds += 1
+        return self.surface
+
+    def blit(self, target, rect, key, *args):
+        target.blit(self.render(rect.size, key, *args), rect.topleft)
@@ -0,0 +1,60 @@
+"""Board geometry: where the chain/goal grid and its slots sit in the window."""
+import pygame
+
+class GridLayout:
+    """
+    Grid placement for one window size and chain length, computed once.
+    The grid is centered horizontally and vertically in the band between
+    area_top and area_bottom (nudged up a third of a row gap so the
+    OPTIMAL label clears row 2). It always has room for the slot rows and
+    the goal row. cell_rect(i) is slot i's outer cell and card_rect(i) the
+    card inside it, as fresh copies. key holds every input, so a caller
+    can rebuild only when it changes.
+    """
+
+    def __init__(self, width, height, *, columns, cell_w, cell_h, row_gap, card_pad,
+                 slot_rows, goal_row, chain_rows, area_top, area_bottom):
+        self.key = (width, height, columns, cell_w, cell_h, row_gap, card_pad,
+                    slot_rows, goal_row, chain_rows, area_top, area_bottom)
+        self.columns = columns
+        self.cell_w, self.cell_h, self.row_gap, self.card_pad = cell_w, cell_h, row_gap, card_pad
+
+        self.rows = max(chain_rows, goal_row + 1, slot_rows)
+        self.width = columns * cell_w
+        self.height = self.rows * cell_h + (self.rows - 1) * row_gap
+
+        self.origin_x = (width - self.width) // 2
+        available_h = max(0, area_bottom - area_top)
+        origin_y = area_top + max(0, (available_h - self.height) // 2)
+        self.origin_y = max(area_top, origin_y - row_gap // 3)
+
+        # Bounds of the full grid area (matching the slot rows)
+        self.bounds = pygame.Rect(
+            self.origin_x + card_pad,
+            self.origin_y + card_pad,
+            columns * cell_w - 2 * card_pad,
+            slot_rows * cell_h + (slot_rows - 1) * row_gap - 2 * card_pad
+        )
+        # Outline layer area: every slot row, each with its trailing gap
+        self.slot_area = pygame.Rect(self.origin_x, self.origin_y, columns * cell_w, slot_rows * (cell_h + row_gap))
+
+        self._cells = [self._cell(i) for i in range(self.rows * columns)]
+        self._cards = [c.inflate(-2 * card_pad, -2 * card_pad) for c in self._cells]
+
+    def _cell(self, index):
+        row, col = divmod(index, self.columns)
+        return pygame.Rect(self.origin_x + col * self.cell_w,
+                           self.origin_y + row * (self.cell_h + self.row_gap),
+                           self.cell_w, self.cell_h)
+
+    def cell_rect(self, index):
+        """Outer cell of slot index (row-major)."""
+        if 0 <= index < len(self._cells):
+            return self._cells[index].copy()
+        return self._cell(index)
+
+    def card_rect(self, index):
+        """Card rect inside slot index (the cell minus card_pad all round)."""
+        if 0 <= index < len(self._cards):
+            return self._cards[index].copy()
+        return self._cell(index).inflate(-2 * self.card_pad, -2 * self.card_pad)
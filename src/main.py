@@ -2,11 +2,21 @@ import pygame
 import pygame.freetype
 import math
 import sys
-import random
 import json
 import os
-from collections import deque
 import asyncio
+import time
+from collections import OrderedDict
+from transforms import TRANSFORMATIONS
+from anim import Animator, ease_out_quad, wave
+from frames import AMBIENT, IDLE, MOTION, DirtyRects, FrameScheduler
+from layers import Layer
+from layout import GridLayout
+from profiler import FrameProfiler
+from surfpool import SurfacePool
+from gamestate import GameState
+from replay import BUY, COINS, HINT, PLAY, ReplayWriter
+from engine import BINARIES, CODES, HEX_COUNT, SolverTables, board_of, build_transitions, load_tables
 
 try:
     import js
@@ -58,13 +68,16 @@ HEXAGRAM_DATA = {}  # filled later in load_data()
 
 BG_COLOR = (30, 30, 30)
 WIDTH, HEIGHT = 1000, 750
+MIN_WIDTH, MIN_HEIGHT = WIDTH, HEIGHT   # design size: the window can grow, not shrink
 screen = None  # filled in run_game()
 
 # --- Web detection (put near imports)
 WEB = (sys.platform == "emscripten" or getattr(sys, "_emscripten_info", None))
+WINDOW_FLAGS = 0 if WEB else pygame.RESIZABLE   # pygbag sizes the canvas itself
 
 # --- Asset placeholders (filled later in load_assets) ---
 HEXAGRAM_DATA = {}       # JSON loaded later
+HEX_BY_CODE = [None] * HEX_COUNT   # HEXAGRAM_DATA entries indexed by 6-bit code
 icon = None
 ICON_SURF = None
 font = None
@@ -102,12 +115,6 @@ hint_icon_size = deck_icon_size
 hint_icon_rect = pygame.Rect(0, help_button.y, hint_icon_size, hint_icon_size)
 hint_icon_rect.right = deck_icon_rect.left - HINT_GAP
 
-# --- Hint usage counters ---
-HINTS_COUNT_THIS_ROUND = 0   # increments each time the player buys a one-move hint
-RUN_HINTS_COUNT        = 0   # cumulative across the run
-
-OPTIMAL_BONUS_IP  = 1   # +1 if current_moves == ROUND_OPTIMAL_DIST (even with hints)
-HINT_PENALTY_IP   = 1   # −1 per hint
 AWARD_FLOOR_IP    = 0   # clamp final award at >= 0
 
 # Transformation buttons
@@ -117,17 +124,7 @@ button_spacing = 8
 button_start_x = 10
 transform_button_y = HEIGHT - 110
 
-# ── Shop knobs
-BUY_START_COST = 6      # cost of the first purchase
-BUY_COST_STEP  = 6      # cost increase after each purchase
-SHOP_VISIBLE = False
-
-# ── Persistent unlocks (per run)
-# Start with 3 freebies: Shift, Invert lower, Mirror
-FREEBIE_SHORTS = {"SHIFT", "INVERT ▼", "MIRROR ▲"}
-
-# Current price for the next purchase this run
-BUY_COST_CURRENT = BUY_START_COST
+# Shop, hint and award knobs (and the freebie changes) live in gamestate.py
 
 # Hexagram line styling
 HEX_LINE_THICK     = 4     # vertical thickness of each line
@@ -144,8 +141,10 @@ TOP_MARGIN = 90    # was 50; pushes grid down from the top
 # --- Slots (visual placeholders) ---
 SLOT_ROWS = 2      # two rows of slots
 
-# Number of grid columns auto-fits window width
+# Number of grid columns fits the design width (fixed: the slot count is the move limit)
 columns = WIDTH // CELL_W
+GRID_AREA_TOP = 20   # grid is centered between this and just above Coins
+LAYOUT = None        # GridLayout for the current window / chain length (see board_layout())
 
 # Left margin that centers the whole grid horizontally
 SIDE_MARGIN = (WIDTH - (columns * CELL_W)) // 2
@@ -180,30 +179,37 @@ CARD_BORDER_FAILURE= (200, 90, 90)
 # Slightly-dim fill for past cards in the chain (lighter than inactive gray)
 CHAIN_CARD_BG_DIM = (217, 217, 217)  # tweak 224–235 to taste
 
-# "Goal → Deck" swoosh (runs after success popup appears)
-ADD2DECK = None          # dict while animating; None otherwise
+# "Goal → Deck" swoosh (runs after success popup appears; ANIM tween "add2deck")
 ADD2DECK_DONE = False    # prevents retrigger while the popup stays open
 ADD2DECK_DURATION_MS = 600  # total time of the swoosh
 
-# --- Goal → Start swoosh (triggered when COINS is pressed after a success)
-GOAL2START = None                         # dict while animating; None otherwise
+# --- Goal → Start swoosh (triggered when COINS is pressed after a success; ANIM tween "goal2start")
 GOAL2START_DURATION_MS = 600              # tweak to taste
 
-# --- Flip animation on card resolve ---
+# --- Flip animation on card resolve (ANIM tween "flip": rect, down_col, up_col, index) ---
 FLIP_MS = 220  # total duration of the flip (tweak 160–260ms to taste)
-RESOLVE_FLIP = None   # {"started_at": int, "rect": pygame.Rect, "down_col": (r,g,b), "up_col": (r,g,b)}
 
-# Live shortest distance from CURRENT card to the goal (recomputed each move)
-LIVE_POSSIBLE_DIST = None
+# --- Replay logs (seed + one byte per action, see replay.py) ---
+RECORD_REPLAYS = not WEB
+REPLAY_DIR = os.environ.get("HEXADECK_REPLAYS", "replays")
+REPLAY = None   # ReplayWriter for the current run
+
+# --- Frame pacing and partial repaints (see frames.py, frame_mode and scene_key) ---
+FRAMES = FrameScheduler(web=WEB)
+DIRTY_RECTS = True   # False: repaint and flip the whole screen every frame
+DIRTY = DirtyRects(enabled=DIRTY_RECTS)
+POOL = SurfacePool()   # per-frame SRCALPHA scratch + cached overlays (POOL.frame_allocs: 0 when steady)
 
-# --- Optimal streaks (hintless) ---
-OPTIMAL_STREAK_CURR = 0  # consecutive hintless+optimal successes
-OPTIMAL_STREAK_BEST = 0  # best streak this run
+# --- Animations (see anim.py): flips, swooshes and the win sequence are ANIM tweens ---
+ANIM_TIME_SCALE = 1.0   # <1 slows every animation down, >1 speeds it up
+ANIM = Animator(time_scale=ANIM_TIME_SCALE)
+PULSE_PERIOD_MS = 500 * math.pi   # Coins outline and hint ring (one cycle of sin(ms / 250))
 
-# Change button/card colors and shades
-PURPLE = (128, 0, 128)      # whole
-GREEN  = (50, 160, 90)      # lower
-BLUE   = (70, 120, 220)     # upper
+# --- Frame profiler (see profiler.py): F3 records and shows per-section frame times, F4 dumps them to CSV ---
+PROFILE_OVERLAY_KEY = pygame.K_F3
+PROFILE_DUMP_KEY = pygame.K_F4
+PROFILE_DIR = os.environ.get("HEXADECK_PROFILES", "profiles")
+PROF = FrameProfiler(("events", "hud", "buttons", "chain", "hover", "popups", "overlay", "flip"))
 
 # --- Developer tools / cheats ---
 DEV_TOOLS_ENABLED = False   # ← flip True only while developing
@@ -223,20 +229,16 @@ BTN_INNER_STROKE     = (245, 245, 245)   # subtle 1px inner stroke when active
 
 # --- Win sequence (post-win “flip” placeholder) ---
 WIN_SEQ_ACTIVE = False
-WIN_SEQ_STARTED_AT = 0
+WIN_SEQ_TWEENS = ("win_gather", "win_merge", "win_linger")   # the ANIM tweens of one sequence, in order
 WIN_SEQ_PER_CARD_MS = 100     # speed of the left→right hide
 WIN_SEQ_LINGER_MS   = 100   # how long to linger on the last two
 WIN_SEQ_START_DELAY_MS = 400   # ⬅️ new: pause before the gather starts (ms)
 WIN_SEQ_MERGE_MS = 240  # how long the winning "sweep" lasts (ms)
-SEQ_OUTCOME = None   # "success" or "failure"
 WIN_CARD_INDEX= -1
-SUCCESS_AWARD_MIN_IP = 1   # floor for any successful round (even with hints)
 
 # Persistent flags
 optimal_filled_wrong = False
 
-AWARDS_GRANTED = False
-
 POPUP_VISIBLE = False  # True only while the judgment popup is on-screen
 
 # --- at module top ---
@@ -260,160 +262,16 @@ def darken(rgb, amt=40):
 BUTTON_W, BUTTON_H, BUTTON_PAD = 220, 56, 14
 BUTTON_START_X, BUTTON_START_Y = 20, 16
 
-# --- Coin flip logic ---
-def generate_hexagram():
-    """Generate a 6-bit hexagram using 50/50 yin-yang random lines."""
-    return "".join(random.choice("01") for _ in range(6))
-
-# --- Transformation Functions ---
-def hu_gua(hexagram6):
-    return hexagram6[1:4] + hexagram6[2:5]
-
-def cuo_gua(hexagram6):
-    return "".join("0" if c == "1" else "1" for c in hexagram6)
-
-def cuo_ba_gua(hexagram6):
-    # Invert only the lower trigram (first 3 bits)
-    inverted_lower = "".join("0" if c == "1" else "1" for c in hexagram6[:3])
-    return inverted_lower + hexagram6[3:]
-
-def zong_gua(hexagram6):
-    return hexagram6[::-1]
-
-def yi_wei_gua(hexagram6):
-    return hexagram6[-1] + hexagram6[:-1]
-
-def jiao_gua(hexagram6):
-    return hexagram6[3:] + hexagram6[:3]
-
-def chong_ba_gua(hexagram6):
-    # Duplicate the lower trigram into the upper trigram
-    lower = hexagram6[:3]
-    return lower + lower
-
-def dui_chen_ba_gua(hexagram6):
-    # Mirror lower trigram (bits 0–2) onto upper (bits 3–5)
-    lower = hexagram6[:3]
-    return lower + lower[::-1]
-
-def zong_ba_gua(hexagram6):
-    # Reverse only the lower trigram (first 3 bits)
-    lower_reversed = hexagram6[:3][::-1]
-    return lower_reversed + hexagram6[3:]
-
-# Friendly names -> existing implementations
-def shift_hexagram(h): return yi_wei_gua(h)        # 位卦
-def flip_hexagram(h): return zong_gua(h)           # 综卦
-def swap_hexagram(h): return jiao_gua(h)           # 交卦
-def unhide_hexagram(h): return hu_gua(h)           # 核卦
-def invert_hexagram(h): return cuo_gua(h)          # 错卦
-
-def invert_lower_trigram(h): return cuo_ba_gua(h)  # 错八卦 (lower)
-def flip_lower_trigram(h):   return zong_ba_gua(h) # 综八卦 (lower)
-def mirror_onto_upper_trigram(h): return dui_chen_ba_gua(h)  # 对八卦 (lower → upper)
-def copy_onto_upper_trigram(h):   return chong_ba_gua(h)     # 重八卦 (lower → upper)
-
-# Ensure consistent ordering and labeling throughout
-TRANSFORMATIONS = [
-    # WHOLE (purple)
-    {
-        "short": "SHIFT",
-        "card": "SHIFT (位卦 Yí Wèi Guà)",
-        "desc": "Shift all lines up, top falls.",
-        "scope": "whole",
-        "char": "位卦",
-        "pinyin": "Yí Wèi Guà",
-        "color": PURPLE,
-        "func": shift_hexagram,
-    },
-    {
-        "short": "FLIP",
-        "card": "FLIP (综卦 Zǒng Guà)",
-        "desc": "Flip line order, all lines.",
-        "scope": "whole",
-        "char": "综卦",
-        "pinyin": "Zǒng Guà",
-        "color": PURPLE,
-        "func": flip_hexagram,
-    },
-    {
-        "short": "SWAP",
-        "card": "SWAP (交卦 Jiāo Guà)",
-        "desc": "Swap lower and upper trigrams.",
-        "scope": "whole",
-        "char": "交卦",
-        "pinyin": "Jiāo Guà",
-        "color": PURPLE,
-        "func": swap_hexagram,
-    },
-    {
-        "short": "UNHIDE",
-        "card": "UNHIDE (核卦 Hu Guà)",
-        "desc": "Unhide lines 2-4 ▼, lines 3-5 ▲.",
-        "scope": "whole",
-        "char": "核卦",
-        "pinyin": "Hu Guà",
-        "color": PURPLE,
-        "func": unhide_hexagram,
-    },
-    {
-        "short": "INVERT",
-        "card": "INVERT (错卦 Cuò Guà)",
-        "desc": "Invert yin ↔ yang, all lines.",
-        "scope": "whole",
-        "char": "错卦",
-        "pinyin": "Cuò Guà",
-        "color": PURPLE,
-        "func": invert_hexagram,
-    },
-
-    # LOWER (green)
-    {
-        "short": "INVERT ▼",
-        "card": "INVERT ▼ (错八卦 Cuò Bā Guà)",
-        "desc": "Invert yin ↔ yang, lower trigram.",
-        "scope": "lower",
-        "char": "错八卦",
-        "pinyin": "Cuò Bā Guà",
-        "color": GREEN,
-        "func": invert_lower_trigram,
-    },
-    {
-        "short": "FLIP ▼",
-        "card": "FLIP ▼ (综八卦 Zǒng Bā Guà)",
-        "desc": "Flip line order, lower trigram.",
-        "scope": "lower",
-        "char": "综八卦",
-        "pinyin": "Zǒng Bā Guà",
-        "color": GREEN,
-        "func": flip_lower_trigram,
-    },
-
-    # UPPER (blue)
-    {
-        "short": "MIRROR ▲",
-        "card": "MIRROR ▲ (对八卦 Duìchèn Bā Guà)",
-        "desc": "Mirror lower trigram onto upper.",
-        "scope": "upper",
-        "char": "对八卦",
-        "pinyin": "Duìchèn Bā Guà",
-        "color": BLUE,
-        "func": mirror_onto_upper_trigram,
-    },
-    {
-        "short": "COPY ▲",
-        "card": "COPY ▲ (重八卦 Chóng Bā Guà)",
-        "desc": "Copy lower trigram onto upper.",
-        "scope": "upper",
-        "char": "重八卦",
-        "pinyin": "Chóng Bā Guà",
-        "color": BLUE,
-        "func": copy_onto_upper_trigram,
-    },
-]
+# 9×64 transition table, built once: TRANSITIONS[idx][code] -> resulting code
+TRANSITIONS = build_transitions([t["func"] for t in TRANSFORMATIONS])
 
-# Initialize unlocked list based on TRANSFORMATIONS' "short" labels
-TRANSFORM_UNLOCKED = [ (t["short"] in FREEBIE_SHORTS) for t in TRANSFORMATIONS ]
+# Distance / optimal-first-move tables, one per unlock mask.
+# Solved on first use until load_assets() maps in solver.bin.
+SOLVER = SolverTables(TRANSITIONS)
+
+# Rules state for the current run (chain, goal, wallet, unlocks, totals).
+# Everything below draws from it; rebuilt in load_assets() on the loaded tables.
+STATE = GameState(SOLVER)
 
 button_hitboxes = []  # [(rect, idx)]
 by_scope = {"whole": [], "lower": [], "upper": []}
@@ -425,6 +283,17 @@ def contrast_color(rgb):
     # YIQ-ish luma
     return (0, 0, 0) if (r*299 + g*587 + b*114)/1000 > 150 else (255, 255, 255)
 
+def place_ui():
+    """Re-anchor the fixed-size controls to the window: Coins centered near the bottom, icons bottom-right."""
+    global coins_button_x, coins_button_y, transform_button_y
+    coins_button_x = (WIDTH - coins_button_width) // 2
+    coins_button_y = HEIGHT - 160
+    coins_button.topleft = (coins_button_x, coins_button_y)
+    help_button.topright = (WIDTH - 25, coins_button_y)
+    deck_icon_rect.topright = (help_button.left - HINT_GAP, help_button.y)
+    hint_icon_rect.topright = (deck_icon_rect.left - HINT_GAP, help_button.y)
+    transform_button_y = HEIGHT - 110
+
 async def rebuild_buttons():
     global button_hitboxes
     button_hitboxes = []
@@ -495,20 +364,50 @@ def transforms_enabled():
 # and no success/failure sequence or popup showing.
     return (
         game_started
-        and not locked
+        and not STATE.locked
         and not WIN_SEQ_ACTIVE
         and not POPUP_VISIBLE
-        and GOAL2START is None   
+        and "goal2start" not in ANIM
     )
 
+def frame_mode():
+    """How often run_game has to redraw: MOTION while something moves, AMBIENT for pulses, else IDLE."""
+    if pending_change is not None or ANIM.active:
+        return MOTION
+    coins_pulse = (not game_started) or POPUP_VISIBLE
+    hint_pulse = STATE.hint_active and transforms_enabled()
+    prompt_blink = game_started and not STATE.locked and not (deck_popup_visible or help_popup_visible)
+    if coins_pulse or hint_pulse or prompt_blink:
+        return AMBIENT
+    return IDLE
+
+def scene_key():
+    """
+    Everything (besides DIRTY-marked animations) that changes how a frame
+    looks without input. The mouse isn't in it: hover_damage() repaints just
+    the hover boxes when they change.
+    """
+    return (
+        tuple(STATE.chain), STATE.goal, len(STATE.collected), STATE.balance, STATE.unlocked,
+        STATE.buy_cost, STATE.shop_open, STATE.hint_active, STATE.outcome, STATE.locked,
+        game_started, POPUP_VISIBLE, WIN_SEQ_ACTIVE, DISPLAY_TOTAL_INSIGHT, ENDGAME_TEST_ARMED,
+        deck_popup_visible, help_popup_visible, deck_page,
+        pending_change is None, tuple(ANIM.tweens),
+    )
+
+def animation_ending():
+    """True if a DIRTY-marked animation finishes by the next frame (it changes the scene as it ends)."""
+    return ANIM.ends_within(FRAMES.intervals[MOTION] * ANIM.time_scale)
+
 def draw_buttons(surface, font):
     enabled = transforms_enabled()
 
     # pulse used for hint ring
     pulse = 1.0
-    if enabled and HINTS_ENABLED:
-        t = pygame.time.get_ticks() / 250.0
-        pulse = 1.0 + 0.6 * (0.5 + 0.5 * math.sin(t))
+    if enabled and STATE.hint_active:
+        pulse = 1.0 + 0.6 * wave(ANIM.now, PULSE_PERIOD_MS)
+
+    hint_moves = STATE.hint_moves()
 
     # we’ll need a small font for the Buy labels
     small_font = TOOLTIP_FONT if 'TOOLTIP_FONT' in globals() else font
@@ -517,7 +416,7 @@ def draw_buttons(surface, font):
         tdef = TRANSFORMATIONS[idx]
 
         style_enabled = enabled
-        unlocked = TRANSFORM_UNLOCKED[idx]
+        unlocked = STATE.is_unlocked(idx)
         usable = style_enabled and unlocked
 
         # --- original visuals restored ---
@@ -531,9 +430,10 @@ def draw_buttons(surface, font):
             border_w = 1
 
         # HINT ring only for usable buttons
-        if usable and HINTS_ENABLED and (idx in optimal_next_buttons):
+        if usable and STATE.hint_active and (idx in hint_moves):
             border_w = max(2, int(3 * pulse))
             border_col = (255, 255, 140)
+            DIRTY.mark(rect)
 
         pygame.draw.rect(surface, bg, rect, border_radius=10)
         pygame.draw.rect(surface, border_col, rect, border_w, border_radius=10)
@@ -544,9 +444,9 @@ def draw_buttons(surface, font):
         surface.blit(surf, surf.get_rect(center=rect.center))
 
         # --- Buy button under LOCKED transforms (Phase 1A) ---
-        if style_enabled and (not unlocked) and SHOP_VISIBLE and (INSIGHT_BALANCE >= BUY_COST_CURRENT):
+        if style_enabled and (not unlocked) and STATE.shop_open and (STATE.balance >= STATE.buy_cost):
             buy_rect = get_buy_rect_for_transform(rect)
-            affordable = (INSIGHT_BALANCE >= BUY_COST_CURRENT)
+            affordable = (STATE.balance >= STATE.buy_cost)
 
             # look: small rounded pill; light if affordable, dark if not
             if affordable:
@@ -561,15 +461,15 @@ def draw_buttons(surface, font):
             pygame.draw.rect(surface, buy_bg, buy_rect, border_radius=8)
             pygame.draw.rect(surface, buy_border, buy_rect, 1, border_radius=8)
 
-            msg = f"Buy for {BUY_COST_CURRENT} IP"
+            msg = f"Buy for {STATE.buy_cost} IP"
             msg_surf = render_surf(small_font, msg, buy_fg)
             surface.blit(msg_surf, msg_surf.get_rect(center=buy_rect.center))
 
     # Informational message when Buy pills are not visible
     # Show if: round is underway AND (shop is closed OR not affordable yet)
-    if game_started and (not SHOP_VISIBLE or INSIGHT_BALANCE < BUY_COST_CURRENT):
+    if game_started and (not STATE.shop_open or STATE.balance < STATE.buy_cost):
         small_font = globals().get("TOOLTIP_FONT", font)
-        affordable = (INSIGHT_BALANCE >= BUY_COST_CURRENT)
+        affordable = (STATE.balance >= STATE.buy_cost)
 
         # Compute row geometry from the button rects
         row_left   = min(r.left   for (r, _) in button_hitboxes)
@@ -580,7 +480,7 @@ def draw_buttons(surface, font):
         # Place a bit closer to the buttons than before
         y = row_bottom + 22
 
-        if (not SHOP_VISIBLE) and affordable:
+        if (not STATE.shop_open) and affordable:
             # Wallet can afford, but shop is closed → show “beginning of the round”
             msg = "New change cards available for purchase at beginning of the next round."
             msg_surf = render_surf(small_font, msg, (230, 230, 230))
@@ -589,7 +489,7 @@ def draw_buttons(surface, font):
         else:
             # Either shop is closed and not affordable yet, or shop is open but not affordable
             prefix   = "New change cards available for purchase at "
-            cost_str = f"{BUY_COST_CURRENT} IP."
+            cost_str = f"{STATE.buy_cost} IP."
 
             prefix_surf = render_surf(small_font, prefix, (230, 230, 230))
 
@@ -610,64 +510,24 @@ def draw_buttons(surface, font):
 
 
 
-# Game state
+# View state (display cards for STATE.chain / STATE.goal, plus UI flags)
 hexagram_chain = []
 goal_hexagram = None
-transformation_limit = 10
-locked = False
-shortest_path_length = None
 has_moved = False
 hover_preview = None  # (button_rect, transformed_hexagram_dict, color)
 game_started = False  # Track if coins button has been clicked
-previous_goal_hexagram_binary = None
-used_hexagrams = set()     # Track hexagrams used in this run
-round_failed = False       # Tracks whether the player has failed
-hexagrams_collected = 0
-collected_hexagrams = set()
 deck_popup_visible = False
 deck_page = 0
 coin_button_used = False
 goal_revealed = False
 
-# --- Run totals for the final-round message ---
-RUN_TOTAL_MOVES = 0          # sum of moves across all completed rounds
-RUN_TOTAL_OPTIMAL = 0        # sum of optimal moves (shortest_path_length) across completed rounds
-RUN_TOTAL_INSIGHT = 0      # sum of per-round Insight Points (your formula)
-RUN_TOTAL_SPENT = 0        # placeholder until spending mechanics exist
-
-# --- Optimal guidance state (static vs live) ---
-ROUND_START_BIN = None          # binary at round start
-ROUND_OPTIMAL_DIST = None       # static 'optimal' distance used for label & popup
-
 # Display-only counters / flags
 DISPLAY_TOTAL_INSIGHT = 0      # what we show in the HUD; updates when the popup appears
 POPUP_WAS_VISIBLE = False      # to detect the moment the popup turns on
 
-# Hint usage tracking
-HINTS_USED_THIS_ROUND = False  # becomes True if the Hint button is ever enabled in this round
-RUN_HINTS_USED = False         # True if any round in the run used hints
-
-# Spendable insight wallet (separate from total earned)
-INSIGHT_BALANCE = 0
-
-# Hints purchase/lock for the current round
-HINTS_ENABLED = False                 # you likely already have this
-HINTS_PURCHASED_THIS_ROUND = False
-
-# Cost to enable Hints per round (Insight Points)
-HINT_COST_IP = 1
-
-# Round insight tracking
-LAST_ROUND_INSIGHT = 0
-LAST_ROUND_USED_HINTS = False
-
 # Debug flag - set to True to enable console debugging
 DEBUG_BUTTONS = False
 
-# --- Hint system toggle ---
-HINTS_ENABLED = False         # controlled by the toolbar Hint button
-optimal_next_buttons = set()  # indices in TRANSFORMATIONS that are optimal right now
-
 def debug_print(message):
     """Print debug messages only when DEBUG_BUTTONS is True"""
     if DEBUG_BUTTONS:
@@ -689,70 +549,76 @@ def _scale_to_height(surf, target_h):
     new_w = max(1, int(surf.get_width() * (target_h / h)))
     return pygame.transform.smoothscale(surf, (new_w, target_h))
 
-def render_surf(f, text, color, aa=True, size=None):
-    # freetype path
-    try:
-        if size is not None:
-            surf, _ = f.render(text, color, size=size)
-        else:
-            surf, _ = f.render(text, color)
-        return surf
-    except TypeError:
-        # classic pygame.font.Font path
-        surf = f.render(text, aa, color)
-        if size is not None:
-            surf = _scale_to_height(surf, size)
-        return surf
-
-def render_pair(f, text, color, aa=True, size=None):
-    try:
+# --- Text surfaces: LRU cache shared by render_surf / render_pair / draw_text_to ---
+TEXT_CACHE_SIZE = 1024                 # distinct (font, text, color, aa, size) surfaces kept
+TEXT_CACHE = OrderedDict()             # key -> (surface, rect), least recently used first
+TEXT_CACHE_STATS = {"hits": 0, "misses": 0}
+_FONT_IS_FREETYPE = {}                 # font -> True (pygame.freetype) / False (pygame.font)
+
+def is_freetype(f):
+    """Resolve a font's backend once instead of trying one API and catching TypeError."""
+    kind = _FONT_IS_FREETYPE.get(f)
+    if kind is None:
+        kind = _FONT_IS_FREETYPE[f] = isinstance(f, pygame.freetype.Font)
+    return kind
+
+def _rasterize(f, text, color, aa, size):
+    if is_freetype(f):
         if size is not None:
             surf, rect = f.render(text, color, size=size)
         else:
             surf, rect = f.render(text, color)
         return surf, (rect or surf.get_rect())
-    except TypeError:
-        surf = f.render(text, aa, color)
-        if size is not None:
-            surf = _scale_to_height(surf, size)
-        return surf, surf.get_rect()
+    surf = f.render(text, aa, color)
+    if size is not None:
+        surf = _scale_to_height(surf, size)
+    return surf, surf.get_rect()
+
+def render_pair(f, text, color, aa=True, size=None):
+    """
+    (surface, rect) for freetype or classic fonts, through the LRU cache.
+    The surface is shared: copy it before changing it (set_alpha etc.).
+    """
+    key = (f, text, tuple(color), aa, size)
+    entry = TEXT_CACHE.get(key)
+    if entry is not None:
+        TEXT_CACHE.move_to_end(key)
+        TEXT_CACHE_STATS["hits"] += 1
+    else:
+        TEXT_CACHE_STATS["misses"] += 1
+        entry = TEXT_CACHE[key] = _rasterize(f, text, color, aa, size)
+        if len(TEXT_CACHE) > TEXT_CACHE_SIZE:
+            TEXT_CACHE.popitem(last=False)
+    surf, rect = entry
+    return surf, rect.copy()
+
+def render_surf(f, text, color, aa=True, size=None):
+    return render_pair(f, text, color, aa=aa, size=size)[0]
 
 # backward compat if you already used render_text earlier:
 render_text = render_pair
 
 def text_size(f, text, size=None):
     """(w,h) for both backends, without assuming .get_rect exists."""
-    # freetype has get_rect; classic has size()
-    try:
-        import pygame.freetype as ft
-        if isinstance(f, ft.Font):
-            r = f.get_rect(text, size=size)
-            return (r.width, r.height)
-    except Exception:
-        pass
-    # classic or fallback
-    try:
-        return f.size(text)  # classic API
-    except Exception:
-        surf = render_surf(f, text, (0,0,0), size=size)
-        return surf.get_width(), surf.get_height()
+    if is_freetype(f):
+        r = f.get_rect(text, size=size) if size is not None else f.get_rect(text)
+        return (r.width, r.height)
+    return f.size(text)  # classic API
+
+def faded_text(f, text, color, alpha):
+    """Cached text with a surface alpha, on a pool scratch copy (valid for this frame)."""
+    src = render_surf(f, text, color)
+    surf = POOL.scratch(src.get_size())
+    surf.blit(src, (0, 0), special_flags=pygame.BLEND_RGBA_ADD)   # onto transparent black: an exact copy
+    surf.set_alpha(alpha)
+    return surf
 
 def draw_text_to(f, surface, pos, text, color, aa=True, size=None):
     """Draw text at pos for freetype or classic fonts; optional size target height."""
-    # Try freetype's fast path
-    try:
-        if size is not None:
-            f.render_to(surface, pos, text, color, size=size)
-        else:
-            f.render_to(surface, pos, text, color)
-        return
-    except Exception:
-        # Fall back to render + blit
-        surf = render_surf(f, text, color, aa=aa, size=size)
-        surface.blit(surf, pos)
+    surface.blit(render_surf(f, text, color, aa=aa, size=size), pos)
 
 async def load_assets():
-    global HEXAGRAM_DATA, ICON_SURF, font, TOOLTIP_FONT, chinese_font, symbol_font, hexagram_font
+    global HEXAGRAM_DATA, HEX_BY_CODE, SOLVER, STATE, ICON_SURF, font, TOOLTIP_FONT, chinese_font, symbol_font, hexagram_font
 
     if WEB:
         await asyncio.sleep(0)
@@ -760,6 +626,12 @@ async def load_assets():
     # JSON
     with open(resource_path("hexagrams.json"), "r", encoding="utf-8") as f:
         HEXAGRAM_DATA = json.load(f)
+    HEX_BY_CODE = [HEXAGRAM_DATA.get(b) for b in BINARIES]
+    DECK_ORDER[:] = sorted(range(HEX_COUNT), key=lambda c: HEX_BY_CODE[c]["number"])
+
+    # Solver tables (tools/build_tables.py): memory-mapped on desktop, one read on web
+    SOLVER = load_tables(resource_path("solver.bin"), TRANSITIONS, whole_file=bool(WEB))
+    STATE = GameState(SOLVER)
 
     # Icon (set later after set_mode)
     try:
@@ -794,62 +666,94 @@ async def load_assets():
 
     print("assets loaded:", bool(HEXAGRAM_DATA))
 
-def apply_transformation(transform_func, label, color=None, short=None):
-    """Apply a transformation to the current hexagram"""
-    global locked, has_moved, round_failed, goal_revealed, HINTS_ENABLED
-    if hexagram_chain and not locked:
-        prev = hexagram_chain[-1]
-        new_binary = transform_func(prev["binary"])
-        new_data = HEXAGRAM_DATA.get(new_binary)
-        if new_data:
+def hexagram_card(code, **extra):
+    """Chain/goal card dict for a hexagram code (display fields come from HEXAGRAM_DATA)."""
+    data = HEX_BY_CODE[code]
+    if data is None:
+        return None
+    card = {
+        "code": code,
+        "binary": BINARIES[code],
+        "number": data["number"],
+        "unicode": data["unicode"],
+        "name": data["name"],
+    }
+    card.update(extra)
+    return card
+
+def start_replay_log():
+    """Open a new log for the run STATE just started (one file per run)."""
+    global REPLAY
+    if REPLAY is not None:
+        REPLAY.close()
+        REPLAY = None
+    if not RECORD_REPLAYS:
+        return
+    name = f"run-{time.strftime('%Y%m%d-%H%M%S')}-{STATE.seed:08x}.hxr"
+    try:
+        os.makedirs(REPLAY_DIR, exist_ok=True)
+        REPLAY = ReplayWriter(os.path.join(REPLAY_DIR, name), STATE.seed, TRANSITIONS)
+    except OSError as e:
+        print(f"[replay] not recording: {e}")
+
+def dump_profile():
+    """Write the profiler's buffered frames to a new CSV in PROFILE_DIR."""
+    path = os.path.join(PROFILE_DIR, f"frames-{time.strftime('%Y%m%d-%H%M%S')}.csv")
+    try:
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        PROF.dump_csv(path)
+        print(f"[profile] {len(PROF.frames)} frames -> {path}")
+    except OSError as e:
+        print(f"[profile] not written: {e}")
+
+def record_action(action):
+    global REPLAY
+    if REPLAY is None:
+        return
+    try:
+        REPLAY.record(action)
+    except OSError as e:
+        print(f"[replay] stopped recording: {e}")
+        REPLAY = None
+
+def apply_transformation(idx):
+    """Apply TRANSFORMATIONS[idx] to the current hexagram"""
+    global has_moved, goal_revealed
+    if hexagram_chain and not STATE.locked:
+        t = TRANSFORMATIONS[idx]
+        label, color, short = t["card"], t["color"], t["short"]
+        new_code = STATE.play(idx)   # also settles success / failure for the round
+        if new_code is None:
+            return
+        record_action(PLAY | idx)
+        new_card = hexagram_card(
+            new_code,
+            transform_label=label,
+            # edge metadata (arrow from prev → this)
+            edge_color=color,
+            edge_short=short,   # e.g., "INVERT ●" (optional to render)
+        )
+        if new_card:
             has_moved = True
-            hexagram_chain.append({
-                "binary": new_binary,
-                "number": new_data["number"],
-                "unicode": new_data["unicode"],
-                "name": new_data["name"],
-                "transform_label": label,
-                # NEW: edge metadata (arrow from prev → this)
-                "edge_color": color,
-                "edge_short": short,   # e.g., "INVERT ●" (optional to render)
-            })
+            hexagram_chain.append(new_card)
             # Use the passed-in color (from the transform button), lighten to match your button fill
             down_src = color if color is not None else (230, 230, 230)
             down_col = lighten(down_src, 0.75)
             start_resolve_flip_for(len(hexagram_chain) - 1, down_col)
-            recompute_live_guidance()
-            # one-move hint is consumed as soon as a move is made
-            if HINTS_ENABLED:
-                HINTS_ENABLED = False
 
-            if not goal_revealed and new_binary == goal_hexagram["binary"]:
+            if not goal_revealed and new_code == STATE.goal:
                 goal_revealed = True
-            # after you append the new card
-            current_moves = len(hexagram_chain) - 1  # moves = chain length minus the starting card
-            if (
-                current_moves > transformation_limit
-                and not (goal_hexagram and new_binary == goal_hexagram["binary"])
-            ):
-                locked = True
-                round_failed = True
-            debug_print(f"Applied transformation: {label} -> {new_binary}")
+            debug_print(f"Applied transformation: {label} -> {BINARIES[new_code]}")
         else:
-            debug_print(f"ERROR: No data found for hexagram {new_binary}")
+            debug_print(f"ERROR: No data found for hexagram {BINARIES[new_code]}")
 
 async def reset_game(start_hexagram=None, full_reset=False):
-    global buttons, button_definitions, hexagram_chain, goal_hexagram, hexagrams_collected, collected_hexagrams
-    global locked, has_moved, shortest_path_length, help_popup_visible, goal_revealed, pending_change
-    global game_started, previous_goal_hexagram_binary, used_hexagrams, round_failed
-    global WIN_SEQ_ACTIVE, WIN_SEQ_STARTED_AT, POPUP_VISIBLE  
-    global RUN_TOTAL_MOVES, RUN_TOTAL_OPTIMAL, RUN_TOTAL_INSIGHT, RUN_TOTAL_SPENT
-    global SEQ_OUTCOME
-    global HINTS_ENABLED, HINTS_USED_THIS_ROUND, RUN_HINTS_USED, HINTS_PURCHASED_THIS_ROUND, HINTS_COUNT_THIS_ROUND, RUN_HINTS_COUNT
-    global DISPLAY_TOTAL_INSIGHT, POPUP_WAS_VISIBLE, INSIGHT_BALANCE
-    global ADD2DECK, ADD2DECK_DONE
-    global TRANSFORM_UNLOCKED, BUY_COST_CURRENT
-    global AWARDS_GRANTED
-    global SHOP_VISIBLE
-    global OPTIMAL_STREAK_CURR, OPTIMAL_STREAK_BEST
+    global hexagram_chain, goal_hexagram
+    global has_moved, help_popup_visible, goal_revealed, pending_change
+    global game_started
+    global WIN_SEQ_ACTIVE, POPUP_VISIBLE
+    global DISPLAY_TOTAL_INSIGHT, POPUP_WAS_VISIBLE
+    global ADD2DECK_DONE
     global ENDGAME_TEST_ARMED
     global optimal_filled_wrong
 
@@ -859,134 +763,51 @@ async def reset_game(start_hexagram=None, full_reset=False):
     has_moved = False
     goal_revealed = False
     pending_change = None
-    round_failed = False  # reset failure flag by default
     POPUP_VISIBLE = False
     WIN_SEQ_ACTIVE = False
-    WIN_SEQ_STARTED_AT = 0
-    SEQ_OUTCOME = None
-    HINTS_ENABLED = False
-    HINTS_PURCHASED_THIS_ROUND = False
-    HINTS_USED_THIS_ROUND = False
     POPUP_WAS_VISIBLE = False
-    ADD2DECK = None
-    AWARDS_GRANTED = False
+    for name in ("add2deck",) + WIN_SEQ_TWEENS:
+        ANIM.cancel(name)
     ADD2DECK_DONE = False
-    SHOP_VISIBLE = True 
-    HINTS_COUNT_THIS_ROUND = 0
     optimal_filled_wrong = False
     if full_reset:
-        RUN_TOTAL_INSIGHT = 0
-        RUN_TOTAL_SPENT   = 0
-        RUN_TOTAL_MOVES   = 0
-        RUN_TOTAL_OPTIMAL = 0
-        RUN_HINTS_COUNT   = 0
-        RUN_HINTS_USED    = False
-        INSIGHT_BALANCE   = 0
         DISPLAY_TOTAL_INSIGHT = 0
-        OPTIMAL_STREAK_CURR = 0
-        OPTIMAL_STREAK_BEST = 0
-
-        collected_hexagrams = set()
-        hexagrams_collected = 0
-        TRANSFORM_UNLOCKED = [ (t["short"] in FREEBIE_SHORTS) for t in TRANSFORMATIONS ]
-        AWARDS_GRANTED = False
-        RUN_HINTS_COUNT = 0
-        BUY_COST_CURRENT = BUY_START_COST     # your starting cost knob
-        SHOP_VISIBLE = False
         ENDGAME_TEST_ARMED = False
 
-    # Reset used hexagrams if this is a fresh start
+    # Deal start + goal (random start unless continuing from the last goal)
+    dealt = STATE.toss(start=start_hexagram, full_reset=full_reset)
     if full_reset:
-        used_hexagrams.clear()
-    
-    # Generate start hexagram
-    if start_hexagram is None:
-        # Choose new random start
-        while True:
-            collapsed = generate_hexagram()
-            if collapsed in HEXAGRAM_DATA:
-                break
-            await asyncio.sleep(0)
-    else:
-        collapsed = start_hexagram
+        debug_print(f"Run seed: {STATE.seed}")
+        start_replay_log()
+    record_action(COINS)
 
-    hx_data = HEXAGRAM_DATA.get(collapsed)
-    
-    if hx_data:
-        hexagram_chain = [{
-            "binary": collapsed,
-            "number": hx_data["number"],
-            "unicode": hx_data["unicode"],
-            "name": hx_data["name"],
-            "transform_label": None
-        }]
-        locked = False
-        debug_print(f"Start hexagram: {collapsed}")
-
-    # Generate goal hexagram (must be unused and not same as start)
-    possible_hexagrams = set(HEXAGRAM_DATA.keys()) - used_hexagrams - {collapsed}
-    
-    if not possible_hexagrams:
+    start_card = hexagram_card(STATE.current, transform_label=None)
+    if start_card:
+        hexagram_chain = [start_card]
+        debug_print(f"Start hexagram: {BINARIES[STATE.current]}")
+
+    if not dealt:
         print("All 64 hexagrams used! Game complete.")
-        locked = True
         return
 
-    collapsed_end = random.choice(list(possible_hexagrams))
-
-    goal_data = HEXAGRAM_DATA.get(collapsed_end)
-    if goal_data:
-        goal_hexagram = {
-            "binary": collapsed_end,
-            "number": goal_data["number"],
-            "unicode": goal_data["unicode"],
-            "name": goal_data["name"]
-        }
-        debug_print(f"Goal hexagram: {collapsed_end}")
-
-    recompute_optimal_guidance()
-
-    # after you set the new start card and goal
-    ROUND_START_BIN = collapsed  # <- set anchor for this round
-    recompute_static_optimal(ROUND_START_BIN)  # static OPTIMAL distance
-    recompute_live_guidance()                  # live hint rings
-
-    # Reset help popup visibility
-    help_popup_visible = False
-
-    # 
-    used_hexagrams.add(collapsed_end)
-    previous_goal_hexagram_binary = collapsed_end
-
-    # manage hexagram counter ONLY on full reset
-    if full_reset:
-        hexagrams_collected = 0  # initial toss resets the visible run counter
-
-    # Reset win-sequence state
-    WIN_SEQ_ACTIVE = False
-    WIN_SEQ_STARTED_AT = 0
-    POPUP_VISIBLE = False
-
-    # Reset move counters
-    if full_reset:
-        used_hexagrams.clear()
-        RUN_TOTAL_MOVES = 0          # <-- add
-        RUN_TOTAL_OPTIMAL = 0        # <-- add
-        RUN_TOTAL_INSIGHT = 0
-        RUN_TOTAL_SPENT = 0
+    goal_card = hexagram_card(STATE.goal)
+    if goal_card:
+        goal_hexagram = goal_card
+        debug_print(f"Goal hexagram: {BINARIES[STATE.goal]}")
 
 def handle_transformation_click(button_index):
     global pending_change
-    if locked or pending_change is not None:
+    if STATE.locked or pending_change is not None:
         return
     if 0 <= button_index < len(TRANSFORMATIONS):
         t = TRANSFORMATIONS[button_index]
         pending_change = {
-            "started_at": pygame.time.get_ticks(),
+            "started_at": ANIM.now,
             "name": t["short"],          # KEEP symbols like ●/▲/▼
             "label": t["card"],          # still kept, not used for headline now
             "desc": t["desc"],
             "color": t["color"],
-            "transform_func": t["func"],
+            "index": button_index,
             "pinyin": t["pinyin"],       # <-- add
             "char": t["char"],           # <-- add
         }
@@ -994,11 +815,8 @@ def handle_transformation_click(button_index):
 
 async def handle_mouse_click(event_pos):
     """Centralized mouse click handling"""
-    global help_popup_visible, hexagrams_collected, coin_button_used, HINTS_ENABLED, HINTS_USED_THIS_ROUND
-    global HINTS_PURCHASED_THIS_ROUND, INSIGHT_BALANCE, RUN_TOTAL_SPENT, RUN_HINTS_USED, HINTS_COUNT_THIS_ROUND, RUN_HINTS_COUNT
-    global BUY_COST_CURRENT, TRANSFORM_UNLOCKED
-    global SHOP_VISIBLE
-    global POPUP_VISIBLE, GOAL2START
+    global help_popup_visible, coin_button_used
+    global POPUP_VISIBLE
     
     debug_print(f"Mouse click at: {event_pos}")
     
@@ -1012,8 +830,8 @@ async def handle_mouse_click(event_pos):
                     # brand-new run
                     await reset_game(full_reset=True)
                 else:
-                    if SEQ_OUTCOME == "success":
-                        deck_complete = (len(collected_hexagrams) >= 64)
+                    if STATE.outcome == "success":
+                        deck_complete = STATE.deck_complete
                         if deck_complete:
                             # final success → start a fresh run
                             POPUP_VISIBLE = False
@@ -1021,13 +839,13 @@ async def handle_mouse_click(event_pos):
                         else:
                             # normal success → goal → start swoosh
                             POPUP_VISIBLE = False
-                            GOAL2START = {
-                                "started_at": pygame.time.get_ticks(),
+                            ANIM.start(
+                                "goal2start", GOAL2START_DURATION_MS, ease_out_quad, on_done=finish_goal2start,
                                 # fill these next frame to avoid scope issues here:
-                                "start_rect": None,
-                                "end_rect":   None,
-                                "start_bin":  goal_hexagram["binary"],
-                            }
+                                start_rect=None,
+                                end_rect=None,
+                                start_code=goal_hexagram["code"],
+                            )
                     else:
                         # failure → fresh run (change to full_reset=False if you want to keep run state)
                         POPUP_VISIBLE = False
@@ -1040,21 +858,10 @@ async def handle_mouse_click(event_pos):
             modal_open     = deck_popup_visible or help_popup_visible or POPUP_VISIBLE
 
             if round_underway and not modal_open:
-                # We only purchase when it's currently OFF
-                if not HINTS_ENABLED:
-                    if INSIGHT_BALANCE >= HINT_COST_IP:
-                        HINTS_ENABLED = True                  # turns on hint ring for the NEXT move only
-                        INSIGHT_BALANCE -= HINT_COST_IP       # spend
-                        RUN_TOTAL_SPENT += HINT_COST_IP
-                        HINTS_COUNT_THIS_ROUND += 1           # count this hint
-                        RUN_HINTS_COUNT        += 1
-                        RUN_HINTS_USED          = True        # legacy flag for compatibility
-                    else:
-                        # insufficient IP → no-op (tooltip will show red)
-                        pass
-                else:
-                    # already ON for the next move; cannot toggle off
-                    pass
+                # turns on the hint ring for the NEXT move only; no-op if it's
+                # already on or unaffordable (tooltip will show red)
+                if STATE.buy_hint():
+                    record_action(HINT)
             return
 
     # only one popup at a time
@@ -1067,37 +874,27 @@ async def handle_mouse_click(event_pos):
 
     # Buy buttons (unlock transforms persistently)
     if (event.type == pygame.MOUSEBUTTONDOWN and event.button == 1
-    and game_started and SHOP_VISIBLE and (INSIGHT_BALANCE >= BUY_COST_CURRENT)
+    and game_started and STATE.shop_open and (STATE.balance >= STATE.buy_cost)
     and not (deck_popup_visible or help_popup_visible or POPUP_VISIBLE)):
         mx, my = event.pos
         for rect, idx in button_hitboxes:
-            if not TRANSFORM_UNLOCKED[idx]:
+            if not STATE.is_unlocked(idx):
                 buy_rect = get_buy_rect_for_transform(rect)
                 if buy_rect.collidepoint((mx, my)):
-                    # can we afford this purchase?
-                    if INSIGHT_BALANCE >= BUY_COST_CURRENT:
-                        cost = BUY_COST_CURRENT            # <-- capture current price
-                        INSIGHT_BALANCE -= cost            # spend wallet
-                        RUN_TOTAL_SPENT += cost            # <-- add to "spent" readout
-                        TRANSFORM_UNLOCKED[idx] = True     # unlock permanently (this run)
-                        BUY_COST_CURRENT += BUY_COST_STEP  # escalate for next purchase
-                        recompute_live_guidance()
-                        
-                        # Reset static baseline BUT from the *current* card (not start) so it’s useful mid-round:
-                        current_bin = hexagram_chain[-1]["binary"] if hexagram_chain else ROUND_START_BIN
-                        recompute_static_optimal(anchor_bin=current_bin)
-                        
-                        # optional: feedback/sfx
+                    # unlock permanently (this run); OPTIMAL is re-measured from the current card
+                    if STATE.buy(idx):
+                        record_action(BUY | idx)
+                    # optional: feedback/sfx
                     return  # swallow the click either way
 
     # Transformation buttons (respect persistent unlock)
-    if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and hexagram_chain and not locked:
+    if event.type == pygame.MOUSEBUTTONDOWN and event.button == 1 and hexagram_chain and not STATE.locked:
         mx, my = event.pos
         for rect, idx in button_hitboxes:
             if rect.collidepoint((mx, my)):
                 if is_change_unlocked(idx):
                     # close the shop as soon as the first usable transform is pressed
-                    SHOP_VISIBLE = False
+                    STATE.shop_open = False
                     handle_transformation_click(idx)
                 # swallow the click either way once we hit a button area
                 return
@@ -1105,10 +902,10 @@ async def handle_mouse_click(event_pos):
 def get_hover_preview(mouse_pos):
     """Get hover preview information for transformation buttons, gated by IP and round state."""
     # Must be during a round and have a current hexagram
-    if not game_started or locked or not hexagram_chain:
+    if not game_started or STATE.locked or not hexagram_chain:
         return None
 
-    current_binary = hexagram_chain[-1]["binary"]
+    current_code = hexagram_chain[-1]["code"]
 
     for rect, idx in button_hitboxes:
         if rect.collidepoint(mouse_pos):
@@ -1117,19 +914,17 @@ def get_hover_preview(mouse_pos):
                 return None
 
             t = TRANSFORMATIONS[idx]
-            try:
-                preview_binary = t["func"](current_binary)
-            except Exception:
-                return None  # defensive: bad transform shouldn't crash hover
+            preview_code = TRANSITIONS[idx][current_code]
 
-            hx_data = HEXAGRAM_DATA.get(preview_binary)
+            hx_data = HEX_BY_CODE[preview_code]
             if not hx_data:
                 return None
 
             return (
                 rect,
                 {
-                    "binary": preview_binary,
+                    "code": preview_code,
+                    "binary": BINARIES[preview_code],
                     "number": hx_data["number"],
                     "name": hx_data["name"]["english"],
                 },
@@ -1139,89 +934,144 @@ def get_hover_preview(mouse_pos):
             # no need to keep looping once we found the hit
     return None
 
-def wrap_two_lines(text, max_width, font):
-    """Greedy 2-line wrap that preserves word order."""
-    words = text.split()
-    if not words:
-        return "", None
-
-    line1, line2 = "", ""
-    in_second = False
+PREVIEW_BOX_H = 140       # hover preview box, 5px above the button
+PREVIEW_TIP_PAD_X = 8     # description tip under it, overlapping the button (looks like a single block)
+PREVIEW_TIP_PAD_Y = 6
+PREVIEW_TIP_LINES = 3     # capped to avoid super tall tips (adds ellipsis)
+PREVIEW_TIP_OVERLAP = 18
+
+def hover_preview_rects(rect, idx):
+    """(preview box, description tip, the tip's lines) for hovering button rect of TRANSFORMATIONS[idx]."""
+    box = pygame.Rect(rect.centerx - rect.width // 2, rect.top - PREVIEW_BOX_H - 5, rect.width, PREVIEW_BOX_H)
+    lines = wrap_text(TRANSFORMATIONS[idx]["desc"], rect.width - PREVIEW_TIP_PAD_X * 2, TOOLTIP_FONT, PREVIEW_TIP_LINES)
+    tip_h = PREVIEW_TIP_PAD_Y * 2 + len(lines) * TOOLTIP_FONT.get_height()
+    tip_y = rect.bottom - PREVIEW_TIP_OVERLAP
+    if tip_y + tip_h > HEIGHT - 4:   # clamp bottom in case of very small windows
+        tip_y = max(4, HEIGHT - 4 - tip_h)
+    return box, pygame.Rect(rect.x, tip_y, rect.width, tip_h), lines
+
+HOVER_DRAWN = ([], None, None)   # (rects, button idx, tooltip text) the hover covered last frame
+
+def hover_rects():
+    """Rects the hover preview (button, box, tip) and the toolbar tooltip cover this frame."""
+    rects = []
+    if hover_preview:
+        rect, _, _, idx = hover_preview
+        box, tip, _ = hover_preview_rects(rect, idx)
+        rects += [rect, box, tip]
+    if hover_text and hover_rect:
+        size = render_surf(font, hover_text, TOOLTIP_TEXT).get_size()
+        rects.append(tooltip_rect(screen.get_size(), size, hover_rect))
+    return rects
+
+def hover_damage():
+    """
+    Where the hover was drawn last frame and is drawn now, if that changed
+    (DIRTY repaints just those instead of the whole screen); [] otherwise.
+    """
+    global HOVER_DRAWN
+    drawn = (hover_rects(), hover_preview and hover_preview[3], hover_text)
+    if drawn == HOVER_DRAWN:
+        return []
+    old, HOVER_DRAWN = HOVER_DRAWN[0], drawn
+    return old + drawn[0]
+
+# --- Word wrap: one engine behind every wrapper, memoized per (font, text, width, lines) ---
+WRAP_CACHE_SIZE = 512
+WRAP_CACHE = OrderedDict()             # (font, text, max_width, max_lines, trim_words) -> tuple of lines
+WRAP_ELLIPSIS = "…"
+WORD_WIDTH_CACHE_SIZE = 2048
+_WORD_WIDTHS = OrderedDict()           # (font, word) -> px, least recently used first
+
+def _word_width(font, word):
+    key = (font, word)
+    w = _WORD_WIDTHS.get(key)
+    if w is not None:
+        _WORD_WIDTHS.move_to_end(key)
+        return w
+    w = _WORD_WIDTHS[key] = font.size(word)[0]
+    if len(_WORD_WIDTHS) > WORD_WIDTH_CACHE_SIZE:
+        _WORD_WIDTHS.popitem(last=False)
+    return w
+
+def _fitting_prefix(font, text, max_width, suffix):
+    """Longest k with (text[:k] + suffix).strip() no wider than max_width (binary search)."""
+    lo, hi = 0, len(text)
+    while lo < hi:
+        mid = (lo + hi + 1) // 2
+        if font.size((text[:mid] + suffix).strip())[0] <= max_width:
+            lo = mid
+        else:
+            hi = mid - 1
+    return lo
 
-    for w in words:
-        if not in_second:
-            test = (line1 + " " + w).strip()
-            if font.size(test)[0] <= max_width:
-                line1 = test
-            else:
-                # move this word to second line
-                line2 = w
-                in_second = True
+def wrap_text(text, max_width, font, max_lines=None, trim_words=False):
+    """
+    Greedy word wrap; returns a tuple of lines. Breaks are placed from word
+    widths measured once and summed, then settled against the joined line's
+    real width (kerning), so each line costs a couple of font.size calls.
+    A word wider than max_width gets a line of its own. Past max_lines the
+    rest is folded into the last line and cut to fit with an ellipsis; with
+    trim_words the last line keeps only its own words instead, dropped from
+    the end until the ellipsis fits (a lone word is cut mid-word).
+    """
+    key = (font, text, max_width, max_lines, trim_words)
+    lines = WRAP_CACHE.get(key)
+    if lines is not None:
+        WRAP_CACHE.move_to_end(key)
+        return lines
+
+    words = text.split() if text else []
+    widths = [_word_width(font, w) for w in words]
+    space = _word_width(font, " ")
+    out = []
+    i, n = 0, len(words)
+    while i < n:
+        end, w = i + 1, widths[i]
+        while end < n and w + space + widths[end] <= max_width:
+            w += space + widths[end]
+            end += 1
+        while end > i + 1 and font.size(" ".join(words[i:end]))[0] > max_width:
+            end -= 1
+        while end < n and font.size(" ".join(words[i:end + 1]))[0] <= max_width:
+            end += 1
+        out.append(" ".join(words[i:end]))
+        i = end
+
+    if max_lines and len(out) > max_lines and trim_words:
+        last = out[max_lines - 1]
+        while " " in last and font.size((last + WRAP_ELLIPSIS).strip())[0] > max_width:
+            last = last.rsplit(" ", 1)[0]
+        last = (last[:_fitting_prefix(font, last, max_width, WRAP_ELLIPSIS)] + WRAP_ELLIPSIS).strip()
+        out = out[:max_lines - 1] + [last]
+    elif max_lines and len(out) > max_lines:
+        rest = " ".join(out[max_lines - 1:])
+        if font.size(WRAP_ELLIPSIS)[0] > max_width:
+            last = ""
         else:
-            test2 = (line2 + " " + w).strip()
-            if font.size(test2)[0] <= max_width:
-                line2 = test2
-            else:
-                # truncate second line with ellipsis
-                # trim until it fits with an ellipsis
-                while font.size((line2 + "…").strip())[0] > max_width and " " in line2:
-                    line2 = line2.rsplit(" ", 1)[0]
-                if font.size((line2 + "…").strip())[0] > max_width:
-                    # worst case: hard trim
-                    while line2 and font.size((line2 + "…").strip())[0] > max_width:
-                        line2 = line2[:-1]
-                line2 = (line2 + "…").strip()
-                break
-
-    return line1, (line2 if line2 else None)
+            last = (rest[:_fitting_prefix(font, rest, max_width, WRAP_ELLIPSIS)] + WRAP_ELLIPSIS).strip()
+        out = out[:max_lines - 1] + [last]
+
+    lines = WRAP_CACHE[key] = tuple(out)
+    if len(WRAP_CACHE) > WRAP_CACHE_SIZE:
+        WRAP_CACHE.popitem(last=False)
+    return lines
+
+def wrap_two_lines(text, max_width, font):
+    """Greedy 2-line wrap that preserves word order; (line1, line2 or None), overflow trimmed to a word plus ellipsis."""
+    lines = wrap_text(text, max_width, font, 2, trim_words=True)
+    if not lines:
+        return "", None
+    return lines[0], (lines[1] if len(lines) > 1 else None)
 
 # multiline wrapper
 def wrap_multiline(text, max_width, font):
     """Greedy wrap to as many lines as needed."""
-    if not text:
-        return []
-    words = text.split()
-    lines = []
-    cur = ""
-    for w in words:
-        test = (cur + " " + w).strip()
-        if font.size(test)[0] <= max_width:
-            cur = test
-        else:
-            if cur:
-                lines.append(cur)
-            cur = w
-    if cur:
-        lines.append(cur)
-    return lines
+    return list(wrap_text(text, max_width, font))
 
 def wrap_three_lines(text, max_width, font):
-    if not text:
-        return "", "", ""
-    # First get greedy lines
-    lines = wrap_multiline(text, max_width, font)
-    if len(lines) <= 3:
-        # Always return exactly 3 slots (may be empty strings)
-        return (lines + ["", "", ""])[:3]
-
-    # Too many lines; fold the remainder into the 3rd, then fit with ellipsis
-    first, second = lines[0], lines[1]
-    third = " ".join(lines[2:])  # pack the rest into the 3rd
-    ell = "…"
-
-    # If even "…" doesn’t fit, hard-trim
-    if font.size(ell)[0] > max_width:
-        # fallback: show as much plain text as possible
-        third = ""
-        while third and font.size(third)[0] > max_width:
-            third = third[:-1]
-        return first, second, third
-
-    # Trim until "third + ellipsis" fits
-    while third and font.size((third + ell).strip())[0] > max_width:
-        third = third[:-1]
-    third = (third + ell).strip()
-    return first, second, third
+    """Always exactly 3 slots (may be empty strings); overflow ends in an ellipsis."""
+    return (wrap_text(text, max_width, font, 3) + ("", "", ""))[:3]
 
 def toggle_popup(which):
     global help_popup_visible, deck_popup_visible
@@ -1238,16 +1088,20 @@ def toggle_popup(which):
 
 def draw_modal_dim(screen, alpha=190):
     """Dim the entire screen (modal backdrop)."""
-    w, h = screen.get_size()
-    mask = pygame.Surface((w, h), flags=pygame.SRCALPHA)
-    mask.fill((0, 0, 0, alpha))  # semi-transparent black
-    screen.blit(mask, (0, 0))
+    size = screen.get_size()
+
+    def build():
+        mask = pygame.Surface(size, flags=pygame.SRCALPHA)
+        mask.fill((0, 0, 0, alpha))  # semi-transparent black
+        return mask
+
+    screen.blit(POOL.cached(("dim", size, alpha), build), (0, 0))
 
 def draw_toolbar_icons(screen):
     # states
     deck_active = deck_popup_visible
     help_active = help_popup_visible
-    hint_active = HINTS_ENABLED
+    hint_active = STATE.hint_active
 
     # ---- Deck ----
     deck_bg = BTN_BG_ACTIVE if deck_active else BTN_BG_DEFAULT
@@ -1270,11 +1124,11 @@ def draw_toolbar_icons(screen):
     modal_open     = deck_popup_visible or help_popup_visible or POPUP_VISIBLE
 
     style_enabled  = round_underway and not modal_open
-    affordable     = (INSIGHT_BALANCE >= HINT_COST_IP)
+    affordable     = (STATE.balance >= STATE.hint_cost)
 
     if not style_enabled:
         hint_bg, hint_border_col, hint_border_w, icon_color = BTN_BG_LOCKED, BTN_BORDER, BTN_BORDER_W, (20,20,20)
-    elif HINTS_ENABLED:
+    elif STATE.hint_active:
         # Active (just purchased, for the next move)
         hint_bg, hint_border_col, hint_border_w, icon_color = BTN_BG_ACTIVE, BTN_BORDER_ACTIVE, BTN_BORDER_W_ACTIVE, (20,20,20)
     else:
@@ -1286,7 +1140,7 @@ def draw_toolbar_icons(screen):
 
     pygame.draw.rect(screen, hint_bg, hint_icon_rect, border_radius=BTN_RADIUS)
     pygame.draw.rect(screen, hint_border_col, hint_icon_rect, hint_border_w, border_radius=BTN_RADIUS)
-    if style_enabled and HINTS_ENABLED:
+    if style_enabled and STATE.hint_active:
         inner = hint_icon_rect.inflate(-4, -4)
         pygame.draw.rect(screen, BTN_INNER_STROKE, inner, 1, border_radius=BTN_RADIUS)
 
@@ -1330,16 +1184,20 @@ def draw_tooltip(screen, text, anchor_rect, font, prefer_above=True, fg=None):
     box_h = text_surf.get_height() + TOOLTIP_PAD * 2
 
     # Box surface with translucency
-    box = pygame.Surface((box_w, box_h), pygame.SRCALPHA)
-    box.fill((0, 0, 0, 0))
+    box = POOL.scratch((box_w, box_h))
     pygame.draw.rect(box, (0, 0, 0, 190), box.get_rect(), border_radius=TOOLTIP_RADIUS)
     pygame.draw.rect(box, TOOLTIP_BORDER, box.get_rect(), 1, border_radius=TOOLTIP_RADIUS)
 
     # Blit the colored text (this is the key change)
     box.blit(text_surf, (TOOLTIP_PAD, TOOLTIP_PAD))
 
-    # Position
-    WIDTH, HEIGHT = screen.get_size()
+    screen.blit(box, tooltip_rect(screen.get_size(), text_surf.get_size(), anchor_rect, prefer_above))
+
+def tooltip_rect(screen_size, text_size, anchor_rect, prefer_above=True):
+    """Where draw_tooltip puts the box for text of text_size, next to anchor_rect."""
+    WIDTH, HEIGHT = screen_size
+    box_w = text_size[0] + TOOLTIP_PAD * 2
+    box_h = text_size[1] + TOOLTIP_PAD * 2
     x = anchor_rect.centerx - box_w // 2
     y = (anchor_rect.top - box_h - 6) if prefer_above else (anchor_rect.bottom + 6)
 
@@ -1347,25 +1205,35 @@ def draw_tooltip(screen, text, anchor_rect, font, prefer_above=True, fg=None):
     if x + box_w > WIDTH - 4: x = WIDTH - 4 - box_w
     if prefer_above and y < 4:
         y = anchor_rect.bottom + 6
+    return pygame.Rect(x, y, box_w, box_h)
 
-    screen.blit(box, (x, y))
+def start_add2deck_swoosh(goal_rect):
+    """Goal → Deck: a yellow card flies from the goal slot into the deck icon."""
+    # end at a small rectangle inside the deck icon
+    end_rect = deck_icon_rect.inflate(-deck_icon_rect.width // 2,
+                                      -deck_icon_rect.height // 2)
+    if end_rect.width < 10 or end_rect.height < 10:
+        end_rect = deck_icon_rect.inflate(-deck_icon_rect.width // 3,
+                                          -deck_icon_rect.height // 3)
+    end_rect.center = deck_icon_rect.center
 
-def draw_add2deck_swoosh(screen, now):
-    global ADD2DECK, ADD2DECK_DONE
-    if ADD2DECK is None:
-        return
+    ANIM.start("add2deck", ADD2DECK_DURATION_MS, ease_out_quad, on_done=add2deck_done,
+               start_rect=goal_rect.copy(), end_rect=end_rect)
 
-    t = (now - ADD2DECK["started_at"]) / float(ADD2DECK_DURATION_MS)
-    if t >= 1.0:
-        ADD2DECK = None
-        ADD2DECK_DONE = True
+def add2deck_done(tween):
+    global ADD2DECK_DONE
+    ADD2DECK_DONE = True
+
+def draw_add2deck_swoosh(screen, now):
+    swoosh = ANIM.get("add2deck")
+    if swoosh is None:
         return
 
-    # ease-out for nicer motion
-    u = 1.0 - (1.0 - t) * (1.0 - t)
+    u = swoosh.progress(now)   # eased out for nicer motion
 
-    sr = ADD2DECK["start_rect"]
-    er = ADD2DECK["end_rect"]
+    sr = swoosh["start_rect"]
+    er = swoosh["end_rect"]
+    DIRTY.mark(sr.union(er))   # the whole path, so the next frame also erases this one
 
     cx = sr.centerx + u * (er.centerx - sr.centerx)
     cy = sr.centery + u * (er.centery - sr.centery)
@@ -1459,9 +1327,9 @@ def draw_side_label(screen, text, font, anchor_rect, side="left", pad=4, ccw=Tru
     side: "left" or "right"
     ccw:  True = 90° counterclockwise, False = clockwise
     """
-    label_surf = render_surf(font, text, color)
     rot = 90 if ccw else -90
-    label_surf = pygame.transform.rotate(label_surf, rot)
+    label_surf = POOL.cached(("label", font, text, tuple(color), rot),
+                             lambda: pygame.transform.rotate(render_surf(font, text, color), rot))
 
     if side == "left":
         x = anchor_rect.left - pad - label_surf.get_width()
@@ -1485,7 +1353,7 @@ def is_change_unlocked(i):
     """A change button is usable iff the round is underway, no modal is open, and it's purchased/unlocked (or a freebie)."""
     round_underway = game_started
     modal_open = deck_popup_visible or help_popup_visible or POPUP_VISIBLE
-    return round_underway and (not modal_open) and TRANSFORM_UNLOCKED[i]
+    return round_underway and (not modal_open) and STATE.is_unlocked(i)
 
 def get_buy_rect_for_transform(button_rect):
     """Returns a small rect centered below a transform button."""
@@ -1495,175 +1363,77 @@ def get_buy_rect_for_transform(button_rect):
     h = 24  # pill height
     return pygame.Rect(x, y, w, h)
 
-def get_allowed_transform_indices():
-    """Indices that are currently allowed by unlock state."""
-    return [i for i, ok in enumerate(TRANSFORM_UNLOCKED) if ok]
-
-def shortest_path_with_allowed(start_binary, goal_binary, allowed_indices):
-    """
-    BFS on 64 hexagrams using only transforms in allowed_indices.
-    Returns (distance:int or None, first_moves:set[int]).
-    If start==goal → (0, set()).
-    """
-    if start_binary == goal_binary:
-        return 0, set()
-
-    # Build quick access array of funcs in index order
-    funcs = [TRANSFORMATIONS[i]["func"] for i in allowed_indices]
-
-    # BFS state
-    dist = {start_binary: 0}
-    first_move = {start_binary: None}   # first transform index taken from the start to reach this node
-    q = deque([start_binary])
-
-    best_distance = None
-    optimal_first_moves = set()
-
-    while q:
-        cur = q.popleft()
-        d = dist[cur]
-
-        # If we already found goal at distance best_distance, do not expand deeper layers
-        if best_distance is not None and d >= best_distance:
-            continue
-
-        for k, idx in enumerate(allowed_indices):
-            try:
-                nxt = funcs[k](cur)
-            except Exception:
-                continue
-            if not nxt:
-                continue
-
-            # Determine the first move to reach nxt
-            fm = idx if cur == start_binary else first_move[cur]
-
-            # First time we see nxt
-            if nxt not in dist:
-                dist[nxt] = d + 1
-                first_move[nxt] = fm
-
-                # If we reached the goal, record best distance and first move
-                if nxt == goal_binary:
-                    if best_distance is None:
-                        best_distance = d + 1
-                    if fm is not None:
-                        optimal_first_moves.add(fm)
-
-                # Only enqueue nodes up to best_distance
-                if best_distance is None or (d + 1) <= best_distance:
-                    q.append(nxt)
-
-            # If we have seen nxt at the same depth (rare with pure BFS), still collect first moves
-            elif nxt == goal_binary and dist[nxt] == d + 1 and fm is not None:
-                optimal_first_moves.add(fm)
-
-    return best_distance, optimal_first_moves
-
-def recompute_optimal_guidance():
-    """Updates shortest_path_length and optimal_next_buttons using only unlocked transforms."""
-    global shortest_path_length, optimal_next_buttons
-
-    if not goal_hexagram or not hexagram_chain:
-        shortest_path_length = None
-        optimal_next_buttons = set()
-        return
-
-    start_bin = hexagram_chain[-1]["binary"]
-    goal_bin  = goal_hexagram["binary"]
-    allowed   = get_allowed_transform_indices()
-
-    dist, first_moves = shortest_path_with_allowed(start_bin, goal_bin, allowed)
-    shortest_path_length = dist
-    # belt-and-suspenders: filter by unlocks even though first_moves came from 'allowed'
-    optimal_next_buttons = {i for i in (first_moves or set()) if i in allowed}
-
-def recompute_static_optimal(anchor_bin=None):
-    """
-    Recompute the static 'optimal distance' used for the floating OPTIMAL tag
-    and the round summary popup.
-
-    anchor_bin:
-      - None uses ROUND_START_BIN (or current card if empty)
-      - Use current card when called immediately after a purchase mid-round
-    """
-    global ROUND_OPTIMAL_DIST
-    if not goal_hexagram:
-        ROUND_OPTIMAL_DIST = None
-        return
-
-    start_bin = (
-        anchor_bin
-        or ROUND_START_BIN
-        or (hexagram_chain[-1]["binary"] if hexagram_chain else None)
-    )
-    if not start_bin:
-        ROUND_OPTIMAL_DIST = None
-        return
-
-    allowed = get_allowed_transform_indices()
-    dist, _ = shortest_path_with_allowed(start_bin, goal_hexagram["binary"], allowed)
-    ROUND_OPTIMAL_DIST = dist
-
-def recompute_live_guidance():
-    """Update hint rings only (does NOT change the static OPTIMAL distance)."""
-    global optimal_next_buttons, LIVE_POSSIBLE_DIST
-    if not goal_hexagram or not hexagram_chain:
-        optimal_next_buttons = set()
-        LIVE_POSSIBLE_DIST = None
-        return
-
-    start_bin = hexagram_chain[-1]["binary"]
-    goal_bin  = goal_hexagram["binary"]
-    allowed   = get_allowed_transform_indices()
-
-    dist, first_moves = shortest_path_with_allowed(start_bin, goal_bin, allowed)
-    LIVE_POSSIBLE_DIST = dist                    # <-- add this
-    optimal_next_buttons = set(first_moves or [])
+def get_unlock_mask():
+    """Bitmask of the currently unlocked transforms (bit i = TRANSFORMATIONS[i])."""
+    return STATE.unlocked
 
 def finalize_round_awards():
     """Award/record insight exactly once when the judgment popup opens."""
-    global AWARDS_GRANTED, RUN_TOTAL_INSIGHT, INSIGHT_BALANCE, DISPLAY_TOTAL_INSIGHT
-    global LAST_ROUND_INSIGHT, OPTIMAL_STREAK_CURR, OPTIMAL_STREAK_BEST
-
-    # Guard: only do this once per round
-    if AWARDS_GRANTED:
-        return
-    AWARDS_GRANTED = True
-
-    # Compute round facts once
-    current_moves = len(hexagram_chain) - 1
-    optimal       = ROUND_OPTIMAL_DIST if ROUND_OPTIMAL_DIST is not None else current_moves
-    was_optimal   = (ROUND_OPTIMAL_DIST is not None and current_moves == ROUND_OPTIMAL_DIST)
-    was_hintless  = (HINTS_COUNT_THIS_ROUND == 0)
-
-    # --- Update hintless optimal streak (once) ---
-    if SEQ_OUTCOME == "success" and was_hintless and was_optimal:
-        OPTIMAL_STREAK_CURR += 1
-        if OPTIMAL_STREAK_CURR > OPTIMAL_STREAK_BEST:
-            OPTIMAL_STREAK_BEST = OPTIMAL_STREAK_CURR
-    else:
-        OPTIMAL_STREAK_CURR = 0
+    global DISPLAY_TOTAL_INSIGHT
+    STATE.end_round()
 
-    if SEQ_OUTCOME == "success":
-        # Start from whatever base you computed earlier in the success path
-        base = max(1, optimal * 2 - current_moves)
-
-        bonus_optimal = OPTIMAL_BONUS_IP if was_optimal else 0
-        bonus_streak  = OPTIMAL_STREAK_CURR
-        penalty_hints = HINT_PENALTY_IP * HINTS_COUNT_THIS_ROUND
+    # Update the on-screen total display
+    DISPLAY_TOTAL_INSIGHT = STATE.total_insight
 
-        gained_raw = base + bonus_optimal + bonus_streak - penalty_hints
-        gained = max(SUCCESS_AWARD_MIN_IP, gained_raw)   # never below 1 on success
-        LAST_ROUND_INSIGHT  = gained
-        INSIGHT_BALANCE    += gained
-        RUN_TOTAL_INSIGHT  += gained
+def start_win_sequence():
+    """
+    The round settled: after a pause, hide the chain left→right (all but the
+    last card); on success the winner then sweeps onto the goal. Linger a
+    moment and open the judgement popup. One tween per phase (WIN_SEQ_TWEENS),
+    each starting where the previous one ended.
+    """
+    total_to_hide = max(0, len(hexagram_chain) - 1)
+    ANIM.start("win_gather", WIN_SEQ_START_DELAY_MS + total_to_hide * WIN_SEQ_PER_CARD_MS,
+               on_done=win_gathered)
 
+def win_gathered(tween):
+    if STATE.outcome == "success":
+        ANIM.start("win_merge", WIN_SEQ_MERGE_MS, ease_out_quad, on_done=win_linger, start=tween.end)
     else:
-        LAST_ROUND_INSIGHT = 0
-
-    # Update the on-screen total display
-    DISPLAY_TOTAL_INSIGHT = RUN_TOTAL_INSIGHT
+        win_linger(tween)
+
+def win_linger(tween):
+    ANIM.start("win_linger", WIN_SEQ_LINGER_MS, on_done=open_judgement_popup, start=tween.end)
+
+def open_judgement_popup(tween):
+    """End of the win sequence: award the round, show the popup and (success) swoosh the goal into the deck."""
+    global POPUP_VISIBLE
+    finalize_round_awards()
+    POPUP_VISIBLE = True
+    if STATE.outcome == "success":
+        start_add2deck_swoosh(board_layout().card_rect(2 * columns - 1))   # the goal card
+
+# --- Line atlas: the 64 six-line figures pre-rasterized per (size, style), packed 8x8 on one sheet ---
+LINE_STYLES = {
+    "plain":   dict(),   # full-size bars (draw_hex_card_plain)
+    "preview": dict(yin_gap_px=6, inner_pad_x=4, inner_pad_y=6,   # hover preview: tight pads, short yin gap
+                    spacing_scale=1.2, valign=0.0, lead_gap_scale=0.7),
+}
+LINE_ATLAS_LIMIT = 8                   # sheets kept (one per size the UI is showing)
+LINE_ATLASES = OrderedDict()           # (w, h, style, line_thick) -> [subsurface per code]
+
+def line_atlas(size, style="plain", line_thick=HEX_LINE_THICK):
+    """Figures for every code at this size/style: subsurfaces of one packed SRCALPHA sheet."""
+    w, h = size
+    key = (w, h, style, line_thick)
+    figures = LINE_ATLASES.get(key)
+    if figures is not None:
+        LINE_ATLASES.move_to_end(key)
+        return figures
+    sheet = pygame.Surface((w * 8, h * HEX_COUNT // 8), pygame.SRCALPHA)
+    figures = []
+    for code in range(HEX_COUNT):
+        cell = sheet.subsurface(pygame.Rect((code % 8) * w, (code // 8) * h, w, h))
+        draw_hexagram_lines(cell, cell.get_rect(), BINARIES[code], line_thick=line_thick, **LINE_STYLES[style])
+        figures.append(cell)
+    LINE_ATLASES[key] = figures
+    if len(LINE_ATLASES) > LINE_ATLAS_LIMIT:
+        LINE_ATLASES.popitem(last=False)
+    return figures
+
+def draw_line_figure(surface, rect, hex_bin, style="plain", line_thick=HEX_LINE_THICK):
+    """Same bars as draw_hexagram_lines(surface, rect, hex_bin, **LINE_STYLES[style]), as one blit."""
+    surface.blit(line_atlas(rect.size, style, line_thick)[CODES[hex_bin]], rect.topleft)
 
 def draw_hex_card_plain(surface, rect, hex_bin, alpha=255):
     """
@@ -1671,72 +1441,81 @@ def draw_hex_card_plain(surface, rect, hex_bin, alpha=255):
     'alpha' applies to the whole card (0..255).
     """
     # Offscreen buffer so we can alpha the whole card cleanly
-    buf = pygame.Surface((rect.width, rect.height), pygame.SRCALPHA)
+    buf = POOL.scratch(rect.size)
     # card body
     pygame.draw.rect(buf, (245, 245, 245), buf.get_rect(), border_radius=10)
     pygame.draw.rect(buf, (200, 200, 200), buf.get_rect(), 1, border_radius=10)
     # hexagram lines
-    draw_hexagram_lines(
-        buf, buf.get_rect(), hex_bin,
-        line_thick=HEX_LINE_THICK,
-        yin_gap_ratio=HEX_YIN_GAP_RATIO,
-        corner=HEX_LINE_RADIUS,
-    )
+    draw_line_figure(buf, buf.get_rect(), hex_bin)
     if alpha < 255:
         buf.set_alpha(max(0, min(255, int(alpha))))
     surface.blit(buf, rect.topleft)
 
-def render_full_card_surf(size, hx, *, bg, border, border_w, font):
-    """Build a per-pixel-alpha surface that looks exactly like a normal card."""
-    w, h = size
-    surf = pygame.Surface((w, h), pygame.SRCALPHA)
-    rect = pygame.Rect(0, 0, w, h)
-
-    # Card shell
-    pygame.draw.rect(surf, bg, rect, border_radius=CARD_RADIUS)
-    pygame.draw.rect(surf, border, rect, border_w, border_radius=CARD_RADIUS)
-
-    # Title (reserve exactly 3 rows like the chain/goal cards)
-    name = hx["name"]["english"]
-    number = hx["number"]
-    full_title = f"{number}: {name}"
-
-    max_width = rect.width - 16
-    t1, t2, t3 = wrap_three_lines(full_title, max_width, font)
-
-    title_y = 12
-    line_h  = font.get_height()
-    y = title_y
-    for t in (t1, t2, t3):
+# Title + yao-bar placement inside a card: "board" for the chain/goal slots, "full" for the start-card hold
+CARD_LAYOUTS = {
+    "board": dict(spacing_scale=1.10, valign=0.0, lead_gap_scale=0.6, y_offset_px=-2),
+    "full":  dict(spacing_scale=1.10, valign=0.0),
+}
+
+def draw_card_face(surface, rect, hx, font, *, bg=None, border=None, border_w=CARD_BORDER_W, layout="board"):
+    """Card shell (skipped when bg is None), 3-row title and hexagram lines, drawn into rect."""
+    if bg is not None:
+        pygame.draw.rect(surface, bg, rect, border_radius=CARD_RADIUS)
+        pygame.draw.rect(surface, border, rect, border_w, border_radius=CARD_RADIUS)
+
+    # Title: always reserve THREE lines; hexagram bars start on the 4th row
+    full_title = f"{hx['number']}: {hx['name']['english']}"
+    line_h = font.get_height()
+    y = rect.y + 12
+    for t in wrap_three_lines(full_title, rect.width - 16, font):
         if t:
             ts = render_surf(font, t, TEXT_COLOR)
-            tr = ts.get_rect(centerx=rect.centerx, y=y)
-            surf.blit(ts, tr)
+            surface.blit(ts, ts.get_rect(centerx=rect.centerx, y=y))
         y += line_h
 
-    # Bars start on "row 4" – same as your normal cards
-    top_reserve_px = 3 * line_h
-    draw_hexagram_lines(
-        surf, rect, hx["binary"],
-        top_reserve_px=top_reserve_px,
-        spacing_scale=1.10,          # keep in sync with your chain/goal usage
-        valign=0.0
-    )
+    draw_hexagram_lines(surface, rect, hx["binary"], top_reserve_px=3 * line_h, **CARD_LAYOUTS[layout])
+
+# --- Card sprites: each (hexagram, style, size) face rendered once, then blitted ---
+CARD_SPRITE_CACHE_SIZE = 192           # a full chain in every style, with room to spare
+CARD_SPRITES = OrderedDict()           # (layout, code, size, bg, border, border_w) -> Surface
+CARD_SPRITE_KEY = (255, 0, 255)        # colorkey: the rounded corners stay transparent
+_CARD_SPRITE_METRICS = None
+
+def card_sprite(hx, size, font, bg, border, border_w=CARD_BORDER_W, layout="board"):
+    """
+    The card face as a colorkeyed surface (corners transparent). Built on first
+    use; the whole cache is dropped when the font or card/line metrics change.
+    """
+    global _CARD_SPRITE_METRICS
+    metrics = (font, font.get_height(), CARD_RADIUS, TEXT_COLOR, HEX_LINE_THICK,
+               HEX_INNER_PAD, HEX_YIN_GAP_RATIO, HEX_LINE_RADIUS, HEX_LINE_COLOR)
+    if metrics != _CARD_SPRITE_METRICS:
+        CARD_SPRITES.clear()
+        _CARD_SPRITE_METRICS = metrics
+
+    key = (layout, hx["code"], tuple(size), tuple(bg), tuple(border), border_w)
+    surf = CARD_SPRITES.get(key)
+    if surf is not None:
+        CARD_SPRITES.move_to_end(key)
+        return surf
+    surf = pygame.Surface(size)
+    surf.fill(CARD_SPRITE_KEY)
+    surf.set_colorkey(CARD_SPRITE_KEY)
+    draw_card_face(surf, surf.get_rect(), hx, font, bg=bg, border=border, border_w=border_w, layout=layout)
+    CARD_SPRITES[key] = surf
+    if len(CARD_SPRITES) > CARD_SPRITE_CACHE_SIZE:
+        CARD_SPRITES.popitem(last=False)
     return surf
 
+def render_full_card_surf(size, hx, *, bg, border, border_w, font):
+    """A surface that looks exactly like a normal card (cached; don't modify it)."""
+    return card_sprite(hx, size, font, bg, border, border_w, layout="full")
+
 def draw_start_card_hold(screen, font):
     """Draw a full normal start card (white) in row 0, col 0, using the current goal hexagram data."""
     if not goal_hexagram:
         return
-    start_col = 0
-    start_row = 0
-    sx = grid_origin_x + start_col * CELL_W
-    sy = grid_origin_y + start_row * (CELL_H + GRID_ROW_GAP)
-    start_card_rect = pygame.Rect(
-        sx + CARD_PAD, sy + CARD_PAD,
-        CELL_W - CARD_PAD * 2,
-        CELL_H - CARD_PAD * 2
-    )
+    start_card_rect = board_layout().card_rect(0)
     start_surf = render_full_card_surf(
         start_card_rect.size, goal_hexagram,
         bg=CARD_BG_DEFAULT,
@@ -1746,78 +1525,235 @@ def draw_start_card_hold(screen, font):
     )
     screen.blit(start_surf, start_card_rect.topleft)
 
+# --- Static layers (see layers.py): repainted only when their key changes ---
+HELP_TEXT_LINES = [
+    "HOW TO PLAY",
+    "Turn the Start hexagram into the Goal hexagram using Change Cards.",
+    "You have 10 change slots per round. OPTIMAL is the shortest change-path.",
+    "POSSIBLE means you still have a chance. After a successful round, the Goal",
+    "hexagram will be added to your Hexadeck, and you will be awarded Insight",
+    "Points (IP) based on how well you did.",
+    "You can use IP to buy Hints or Change Cards. Hints tell you which Change",
+    "Card to play next from your available deck, but they reduce the IP you earn.",
+    "Change Cards cost more, but they allow for better and shorter change-paths.",
+    "Use Coins to advance rounds. The game is over when you either fail to reach",
+    "the Goal or when you've filled out your Hexadeck with all 64 hexagrams.",
+    "",
+    "HOW TO READ A HEXAGRAM",
+    "A hexagram is a series of six lines, generated randomly by coin flip. Each",
+    "line is either broken (yin) or unbroken (yang). The lines are numbered from",
+    "bottom to top.",
+    "                                                    6 ----- yang",
+    "                                                    5 -- -- yin",
+    "                                                    4 ----- yang",
+    "                                                    3 -- -- yin",
+    "                                                    2 ----- yang",
+    "                                                    1 ----- yang",
+    "Lines 1-3 are the Lower (▼) trigram. Lines 4-6 are the Upper (▲) trigram.",
+    "Some Change Cards act on all lines (purple). Others act only on ▼ (green)",
+    "or ▲ (blue). Hover over the Change Cards to see what they do."
+]
+HELP_HEADINGS = {"HOW TO PLAY", "HOW TO READ A HEXAGRAM"}
+HELP_LINE_STEP = 19
+POPUP_BG = (40, 40, 40)
+
+def paint_slot_grid(surf):
+    """Empty slot outlines (two rows * columns), grid origin at (0, 0)."""
+    for i in range(SLOT_ROWS * columns):
+        col = i % columns
+        row = i // columns
+        slot_rect = pygame.Rect(
+            col * CELL_W + CARD_PAD,
+            row * (CELL_H + GRID_ROW_GAP) + CARD_PAD,
+            CELL_W - CARD_PAD * 2,
+            CELL_H - CARD_PAD * 2
+        )
+        # simple rounded rect with a subtle border
+        pygame.draw.rect(surf, CARD_BORDER_DEFAULT, slot_rect, CARD_BORDER_W, border_radius=CARD_RADIUS)
+
+def paint_help_popup(surf):
+    rect = surf.get_rect()
+    surf.fill(POPUP_BG)
+    pygame.draw.rect(surf, (255, 255, 255), rect, 2)
+
+    line_y = 10
+    for line in HELP_TEXT_LINES:
+        ls = render_surf(font, line, (255, 255, 255))
+        if line in HELP_HEADINGS:
+            # centered horizontally in the popup
+            surf.blit(ls, ls.get_rect(centerx=rect.centerx, y=line_y))
+        else:
+            surf.blit(ls, (50, line_y))
+        line_y += HELP_LINE_STEP
+
+def deck_arrow_rects(popup_rect):
+    """Page up/down buttons (top-right corner inside the deck popup)."""
+    up = pygame.Rect(popup_rect.right - 30, popup_rect.y + 10, 20, 20)
+    return up, up.move(0, 25)
+
+# Deck popup view model: number-ordered index, labels fitted once per font, one cached row per (code, collected)
+DECK_PAGE_SIZE = 40
+DECK_LABEL_W = 100
+DECK_ORDER = []                        # codes by King Wen number (filled in load_assets)
+DECK_LABELS = {}                       # (font, code) -> "number name", name cut to DECK_LABEL_W
+DECK_ROWS = {}                         # (code, collected, font, hexagram_font) -> Surface on POPUP_BG
+
+def deck_label(code):
+    key = (font, code)
+    label = DECK_LABELS.get(key)
+    if label is None:
+        data = HEX_BY_CODE[code]
+        number = str(data["number"])
+        name = data["name"]["english"]
+        label = f"{number} {name}"
+        while font.size(label)[0] > DECK_LABEL_W and len(name) > 1:
+            name = name[:-1]
+            label = f"{number} {name}"
+        DECK_LABELS[key] = label
+    return label
+
+def deck_row(code, collected):
+    """Symbol + label of one deck entry; rendered again only when its collected state changes."""
+    key = (code, collected, font, hexagram_font)
+    row = DECK_ROWS.get(key)
+    if row is None:
+        color = (255, 255, 0) if collected else (255, 255, 255)
+        symbol = render_surf(hexagram_font, HEX_BY_CODE[code]["unicode"], color)
+        w, _ = text_size(hexagram_font, HEX_BY_CODE[code]["unicode"])   # width without assuming freetype
+        label = render_surf(font, deck_label(code), color)
+        row = DECK_ROWS[key] = pygame.Surface((max(symbol.get_width(), w + 5 + label.get_width()),
+                                               max(symbol.get_height(), label.get_height())))
+        row.fill(POPUP_BG)
+        row.blit(symbol, (0, 0))
+        row.blit(label, (w + 5, 0))
+    return row
+
+def paint_deck_popup(surf):
+    """Frame, count, page arrows and the 40/24 entries of deck_page."""
+    rect = surf.get_rect()
+    surf.fill(POPUP_BG)
+    pygame.draw.rect(surf, (255, 255, 255), rect, 2)
+
+    # Title and count
+    title = render_surf(font, "HEXADECK", (255, 255, 255))
+    surf.blit(title, (rect.width // 2 - title.get_width() // 2, 10))
+    count_text = render_surf(font, f"{len(STATE.collected)} of 64 collected", (255, 255, 255))
+    surf.blit(count_text, (rect.width // 2 - count_text.get_width() // 2, 30))
+
+    # Arrow buttons
+    for button, glyph in zip(deck_arrow_rects(rect), ("▲", "▼")):
+        pygame.draw.rect(surf, (200, 200, 200), button)
+        arrow = render_surf(font, glyph, (0, 0, 0))
+        surf.blit(arrow, arrow.get_rect(center=button.center))
+
+    # Deck grid
+    page = DECK_ORDER[deck_page * DECK_PAGE_SIZE:(deck_page + 1) * DECK_PAGE_SIZE]
+    for i, code in enumerate(page):
+        surf.blit(deck_row(code, code in STATE.collected), (20 + (i % 4) * 135, 60 + (i // 4) * 45))
+
+SLOT_LAYER = Layer(paint_slot_grid, colorkey=CARD_SPRITE_KEY)
+HELP_LAYER = Layer(paint_help_popup)
+DECK_LAYER = Layer(paint_deck_popup)
+
+def layout_key():
+    """Everything the grid geometry depends on (part of each static layer's key)."""
+    return (columns, CELL_W, CELL_H, GRID_ROW_GAP, CARD_PAD, CARD_RADIUS, CARD_BORDER_W)
+
+def board_layout():
+    """The grid geometry, rebuilt only when the window size or the chain's row count changes."""
+    global LAYOUT
+    chain_rows = (len(hexagram_chain) - 1) // columns + 1 if hexagram_chain else 1
+    key = (WIDTH, HEIGHT, columns, CELL_W, CELL_H, GRID_ROW_GAP, CARD_PAD,
+           SLOT_ROWS, 1, chain_rows, GRID_AREA_TOP, coins_button.top - 10)
+    if LAYOUT is None or LAYOUT.key != key:
+        LAYOUT = GridLayout(
+            WIDTH, HEIGHT, columns=columns, cell_w=CELL_W, cell_h=CELL_H, row_gap=GRID_ROW_GAP,
+            card_pad=CARD_PAD, slot_rows=SLOT_ROWS, goal_row=1, chain_rows=chain_rows,
+            area_top=GRID_AREA_TOP, area_bottom=coins_button.top - 10,
+        )
+    return LAYOUT
+
+def invalidate_layout_caches():
+    """Drop what was built for the old window size (pooled overlays, static layers, preview atlases)."""
+    POOL.clear()
+    for layer in (SLOT_LAYER, HELP_LAYER, DECK_LAYER):
+        layer.invalidate()
+    LINE_ATLASES.clear()
+
+async def resize_window(size):
+    """Follow a VIDEORESIZE: reflow the UI around the new window size (never below the design size)."""
+    global screen, WIDTH, HEIGHT
+    w, h = max(size[0], MIN_WIDTH), max(size[1], MIN_HEIGHT)   # a smaller window snaps back up
+    screen = pygame.display.get_surface()
+    if screen.get_size() != (w, h):
+        screen = pygame.display.set_mode((w, h), WINDOW_FLAGS)
+    WIDTH, HEIGHT = screen.get_size()
+    place_ui()
+    await rebuild_buttons()
+    invalidate_layout_caches()
+
 # --- Blinking "your move" arrow ---
 PROMPT_ARROW_PERIOD_MS = 900   # blink period; tweak to taste
 PROMPT_ARROW_CHAR = "→"        # swap for a triangle/emoji if you prefer
 
 def get_chain_card_rect_at(index: int) -> pygame.Rect:
     """Inner card rect (with CARD_PAD) for chain slot 'index'."""
-    col = index % columns
-    row = index // columns
-    x = grid_origin_x + col * CELL_W
-    y = grid_origin_y + row * (CELL_H + GRID_ROW_GAP)
-    return pygame.Rect(
-        x + CARD_PAD, y + CARD_PAD,
-        CELL_W - 2 * CARD_PAD, CELL_H - 2 * CARD_PAD
-    )
+    return board_layout().card_rect(index)
 
 def start_resolve_flip_for(index: int, down_color, up_color=None):
     """Begin a flip overlay centered on the given chain slot."""
-    global RESOLVE_FLIP
-    RESOLVE_FLIP = {
-        "started_at": pygame.time.get_ticks(),
-        "rect": get_chain_card_rect_at(index),
-        "down_col": down_color,
-        "up_col": (CARD_BG_DEFAULT if up_color is None else up_color),
-        "index": index,  # ← add this
-    }
+    ANIM.start(
+        "flip", FLIP_MS,
+        rect=get_chain_card_rect_at(index),
+        down_col=down_color,
+        up_col=(CARD_BG_DEFAULT if up_color is None else up_color),
+        index=index,
+    )
 
 def draw_resolve_flip(screen, now):
     """Overlay a quick horizontal 'card flip' (no face graphics)."""
-    global RESOLVE_FLIP
-    if not RESOLVE_FLIP:
+    flip = ANIM.get("flip")
+    if flip is None:
         return
 
-    t = (now - RESOLVE_FLIP["started_at"]) / float(FLIP_MS)
-    if t >= 1.0:
-        RESOLVE_FLIP = None
-        return
+    t = flip.progress(now)
 
     # Cosine width scale: 1 → 0 → 1 (classic flip profile)
     s = max(0.06, abs(math.cos(math.pi * t)))  # clamp so it never fully vanishes
-    face_col = RESOLVE_FLIP["down_col"] if t < 0.5 else RESOLVE_FLIP["up_col"]
+    face_col = flip["down_col"] if t < 0.5 else flip["up_col"]
 
-    dst = RESOLVE_FLIP["rect"]
+    dst = flip["rect"]
+    DIRTY.mark(dst)
     w = max(1, int(dst.width * s))
     h = dst.height
 
     # Draw a rounded slab centered on the card with a subtle border
-    slab = pygame.Surface((w, h), pygame.SRCALPHA)
-    pygame.draw.rect(slab, face_col, slab.get_rect(), border_radius=CARD_RADIUS)
-    pygame.draw.rect(slab, (200, 200, 200), slab.get_rect(), 1, border_radius=CARD_RADIUS)
-    screen.blit(slab, slab.get_rect(center=dst.center))
-
-async def draw_goal2start_swoosh(screen, now):
-    global GOAL2START
-    if GOAL2START is None:
-        return
+    # (into a card-sized scratch surface, so the width can change without reallocating)
+    slab = POOL.scratch(dst.size)
+    face = pygame.Rect(0, 0, w, h)
+    pygame.draw.rect(slab, face_col, face, border_radius=CARD_RADIUS)
+    pygame.draw.rect(slab, (200, 200, 200), face, 1, border_radius=CARD_RADIUS)
+    pos = face.copy()
+    pos.center = dst.center
+    screen.blit(slab, pos, area=face)
+
+async def finish_goal2start(tween):
+    # NEW: if completing the full set, start a fresh run
+    if len(STATE.collected) >= 64:
+        await reset_game(full_reset=True)
+    else:
+        await reset_game(start_hexagram=tween["start_code"])
 
-    t = (now - GOAL2START["started_at"]) / float(GOAL2START_DURATION_MS)
-    if t >= 1.0:
-        start_bin = GOAL2START["start_bin"]
-        GOAL2START = None
-        # NEW: if completing the full set, start a fresh run
-        if len(collected_hexagrams) >= 64:
-            await reset_game(full_reset=True)
-        else:
-            await reset_game(start_hexagram=start_bin)
+def draw_goal2start_swoosh(screen, now):
+    swoosh = ANIM.get("goal2start")
+    if swoosh is None:
         return
 
-    # ease-out
-    u = 1.0 - (1.0 - t) * (1.0 - t)
+    u = swoosh.progress(now)   # ease-out
 
-    sr = GOAL2START["start_rect"]
-    er = GOAL2START["end_rect"]
+    sr = swoosh["start_rect"]
+    er = swoosh["end_rect"]
+    DIRTY.mark(sr.union(er))
 
     cx = sr.centerx + u * (er.centerx - sr.centerx)
     cy = sr.centery + u * (er.centery - sr.centery)
@@ -1837,7 +1773,7 @@ def arm_endgame_test(allow_goal_swap=True):
     By default the missing one is the *current goal* so the next success will complete the deck.
     If the current goal is already collected, we optionally swap the goal to a missing one.
     """
-    global ENDGAME_TEST_ARMED, collected_hexagrams, hexagrams_collected, goal_hexagram
+    global ENDGAME_TEST_ARMED, goal_hexagram
 
     if not DEV_TOOLS_ENABLED:
         return
@@ -1847,30 +1783,30 @@ def arm_endgame_test(allow_goal_swap=True):
         return
 
     # Build "all" set from your data
-    all_bins = set(HEXAGRAM_DATA.keys())
-    missing = goal_hexagram["binary"]
+    all_codes = {CODES[b] for b in HEXAGRAM_DATA}
+    missing = goal_hexagram["code"]
 
     # If goal already collected, pick any missing one and (optionally) switch the goal
-    if missing in collected_hexagrams:
-        alt = next((b for b in all_bins if b not in collected_hexagrams), None)
+    if missing in STATE.collected:
+        alt = next((c for c in all_codes if c not in STATE.collected), None)
         if alt is None:
             # Already have all 64? Nothing to arm.
             return
         if allow_goal_swap:
-            goal_hexagram = HEXAGRAM_DATA[alt]  # swap goal so next success will complete
+            goal_hexagram = hexagram_card(alt)  # swap goal so next success will complete
+            STATE.goal = alt
+            STATE.recompute_static()
+            STATE.recompute_live()
             missing = alt
         else:
             # If you don't allow swapping, we can't guarantee the next success completes the set
             missing = alt
 
     # Prefill: everything except the "missing" one
-    collected_hexagrams = (all_bins - {missing})
-    # If you also track a numeric counter:
-    if 'hexagrams_collected' in globals():
-        hexagrams_collected = len(collected_hexagrams)
+    STATE.collected = (all_codes - {missing})
 
     ENDGAME_TEST_ARMED = True
-    debug_print("[DEV] End-game test ARMED: deck set to 63; missing -> " + missing)
+    debug_print("[DEV] End-game test ARMED: deck set to 63; missing -> " + BINARIES[missing])
 
 def recompute_layout_from_fonts():
     """Recalculate constants that depend on font metrics."""
@@ -1880,10 +1816,10 @@ def recompute_layout_from_fonts():
     GRID_ROW_GAP = max(18, font.get_height())
     # If you have other metrics derived from fonts, recompute them here too.
 
-def draw_centered_text(surface, text, font, y, width=WIDTH, color=(255, 255, 255)):
+def draw_centered_text(surface, text, font, y, width=None, color=(255, 255, 255)):
     text_surf, _ = render_pair(font, text, color)
     text_width = text_surf.get_width()
-    x = (width - text_width) // 2  # Center the text horizontally
+    x = ((WIDTH if width is None else width) - text_width) // 2  # Center the text horizontally
     surface.blit(text_surf, (x, y))
 
 def draw_left_aligned_text(surface, text, font, y, margin=50, color=(255, 255, 255)):
@@ -1899,30 +1835,44 @@ def draw_judgement_popup(
     """
     Grid-shaped overlay with a rounded 'hole' over the goal hexagram.
     Shows SUCCESS (with judgment) or FAILURE (no judgment) content inside
-    a centered narrow column (~2 cells wide).
+    a centered narrow column (~2 cells wide). Composed once (JUDGEMENT_LAYER)
+    and recomposed only when a shown value or the layout changes.
     """
     if not grid_bounds or not goal_rect or not goal_hexagram:
         return
 
+    # Every value the popup shows, plus where and with what it is drawn
+    key = (
+        outcome, goal_hexagram["code"], len(hexagram_chain), STATE.round_optimal, len(STATE.collected),
+        STATE.round_hints, STATE.streak, STATE.round_insight,
+        STATE.total_moves, STATE.total_optimal, STATE.run_hints, STATE.best_streak,
+        STATE.total_insight, STATE.total_spent,
+        tuple(grid_bounds), tuple(goal_rect), card_radius, content_rect and tuple(content_rect), font, chinese_font,
+    )
+    to_local = (-grid_bounds.x, -grid_bounds.y)
+    JUDGEMENT_LAYER.blit(
+        screen, grid_bounds, key,
+        font, chinese_font, goal_hexagram, goal_rect.move(to_local), card_radius,
+        content_rect and content_rect.move(to_local), outcome
+    )
+
+def paint_judgement_popup(surf, font, chinese_font, goal_hexagram, goal_rect, card_radius, content_rect, outcome):
+    """The popup over the grid area; surf is grid-sized and rects are relative to it."""
+    grid_bounds = surf.get_rect()
+
     # --- knobs ---
-    OVERLAY_ALPHA = 255
     HOLE_PAD      = 8
     HOLE_BORDER_W = 3
 
-    # 1) Build overlay over the grid area
-    overlay = pygame.Surface((WIDTH, HEIGHT), flags=pygame.SRCALPHA)
-    pygame.draw.rect(overlay, (40, 40, 40, OVERLAY_ALPHA), grid_bounds, border_radius=card_radius * 2)
+    # 1) Overlay over the grid area (opaque)
+    pygame.draw.rect(surf, (40, 40, 40), grid_bounds, border_radius=card_radius * 2)
 
-    # 2) Punch transparent hole for the goal card
+    # 2) Punch a transparent hole for the goal card (the layer's colorkey)
     hole_rect = goal_rect.inflate(HOLE_PAD, HOLE_PAD)
-    pygame.draw.rect(overlay, (0, 0, 0, 0), hole_rect, border_radius=card_radius)
-
-    # 3) Blit overlay
-    screen.blit(overlay, (0, 0))
+    pygame.draw.rect(surf, JUDGEMENT_LAYER.colorkey, hole_rect, border_radius=card_radius)
 
     # --- Corner caps: fill the rounded corners so the grid can't peek through ---
     corner_r = card_radius * 2  # must match the overlay's border_radius
-    corner_caps = pygame.Surface((grid_bounds.width, grid_bounds.height), flags=pygame.SRCALPHA)
 
     # each cap = a solid square minus a transparent quarter-circle -> leaves a white "wedge"
     cap_color = (255, 255, 255, 255)
@@ -1944,23 +1894,24 @@ def draw_judgement_popup(
         pygame.draw.rect(surface, cap_color, square)
         pygame.draw.circle(surface, (0, 0, 0, 0), center, corner_r)  # punch out the quarter-circle
 
+    corner_caps = pygame.Surface(grid_bounds.size, flags=pygame.SRCALPHA)
     for pos in ("tl", "tr", "bl", "br"):
         draw_corner_cap(corner_caps, pos)
 
     # place the caps over the grid area
-    screen.blit(corner_caps, (grid_bounds.left, grid_bounds.top))
+    surf.blit(corner_caps, grid_bounds.topleft)
 
     # 3.1) Outer white border around the popup (use same rounded shape as the mask)
     WHITE_BORDER_W = 3
     outer_rect = grid_bounds.inflate(-1, -1)  # tiny inset so edges look crisp
     pygame.draw.rect(
-        screen, (255, 255, 255),
+        surf, (255, 255, 255),
         outer_rect, WHITE_BORDER_W, border_radius=card_radius * 2
     )
 
     # 3.2) Border around the goal “hole” (yellow for success, red for failure)
     #hole_border_col = (255, 255, 0) if outcome == "success" else (235, 120, 120)
-    #pygame.draw.rect(screen, hole_border_col, hole_rect, HOLE_BORDER_W, border_radius=card_radius)
+    #pygame.draw.rect(surf, hole_border_col, hole_rect, HOLE_BORDER_W, border_radius=card_radius)
 
     # --- data for this goal ---
     data = HEXAGRAM_DATA[goal_hexagram["binary"]]
@@ -1983,40 +1934,27 @@ def draw_judgement_popup(
 
     # helpers ------------------------------------------------------------
     def wrap_line(text, max_w):
-        # Use existing wrap_multiline if available; otherwise a simple wrapper
-        try:
-            return wrap_multiline(text, max_w, font)
-        except Exception:
-            words, lines, cur = text.split(), [], ""
-            for w in words:
-                test = (cur + " " + w) if cur else w
-                if font.size(test)[0] <= max_w:
-                    cur = test
-                else:
-                    if cur: lines.append(cur)
-                    cur = w
-            if cur: lines.append(cur)
-            return lines
+        return wrap_multiline(text, max_w, font)
 
     def blit_center_line(text, color, y):
         s = render_surf(font, text, color)
         r = s.get_rect(centerx=content_rect.centerx, y=y)
-        screen.blit(s, r)
+        surf.blit(s, r)
         return y + font.get_height()
 
     def blit_left_line(text, color, y, pad=0):
         x = content_rect.left + 10 + pad
         s = render_surf(font, text, color)
-        screen.blit(s, (x, y))
+        surf.blit(s, (x, y))
         return y + font.get_height()
 
     def blit_kv(label, value_text, y):
         # label on left, value on right (aligned) inside the column
         x_left = content_rect.left + 10
         x_right = content_rect.right - 10
-        sL = render_surf(font, label, WHITE);  screen.blit(sL, (x_left, y))
+        sL = render_surf(font, label, WHITE);  surf.blit(sL, (x_left, y))
         sV = render_surf(font, value_text, WHITE)
-        screen.blit(sV, (x_right - sV.get_width(), y))
+        surf.blit(sV, (x_right - sV.get_width(), y))
         return y + font.get_height()
     
     # -------------------------------------------------------------------
@@ -2024,17 +1962,17 @@ def draw_judgement_popup(
     # pull game state safely
     chain = globals().get("hexagram_chain", [])
     current_moves = max(0, len(chain) - 1)
-    optimal = globals().get("ROUND_OPTIMAL_DIST", None)
+    optimal = STATE.round_optimal
     if optimal is None:
         optimal = current_moves
 
-    hexas_collected = globals().get("hexagrams_collected", 0)
+    hexas_collected = len(STATE.collected)
     is_final = (hexas_collected >= 64)
 
-    total_moves  = globals().get("RUN_TOTAL_MOVES", 0)
-    total_opt    = globals().get("RUN_TOTAL_OPTIMAL", 0)
-    total_gain   = globals().get("RUN_TOTAL_INSIGHT", 0)
-    total_spent  = globals().get("RUN_TOTAL_SPENT", 0)
+    total_moves  = STATE.total_moves
+    total_opt    = STATE.total_optimal
+    total_gain   = STATE.total_insight
+    total_spent  = STATE.total_spent
 
     # per-round insight (display only; accumulation happens elsewhere)
     insight_points = max(0, optimal * 2 - current_moves)  # original formula you asked for
@@ -2061,12 +1999,12 @@ def draw_judgement_popup(
 
         # Run info box (cumulative)
         cursor_y = blit_center_line("=============RUN INFO==============", WHITE, cursor_y)
-        cursor_y = blit_kv("You made:",              f"{RUN_TOTAL_MOVES} changes", cursor_y)
-        cursor_y = blit_kv("Optimal was:",           f"{RUN_TOTAL_OPTIMAL} changes",   cursor_y)
-        cursor_y = blit_kv("Hints used:", f"{globals().get('RUN_HINTS_COUNT', 0)} hint" + ("s" if globals().get('RUN_HINTS_COUNT', 0) != 1 else ""), cursor_y)
-        cursor_y = blit_kv("Highest optimal streak (hintless):", f"{OPTIMAL_STREAK_BEST} rounds", cursor_y)
-        cursor_y = blit_kv("Insight points gained:", f"+{RUN_TOTAL_INSIGHT}",        cursor_y)
-        cursor_y = blit_kv("Insight points spent:",  f"+{RUN_TOTAL_SPENT}",        cursor_y)
+        cursor_y = blit_kv("You made:",              f"{STATE.total_moves} changes", cursor_y)
+        cursor_y = blit_kv("Optimal was:",           f"{STATE.total_optimal} changes",   cursor_y)
+        cursor_y = blit_kv("Hints used:", f"{STATE.run_hints} hint" + ("s" if STATE.run_hints != 1 else ""), cursor_y)
+        cursor_y = blit_kv("Highest optimal streak (hintless):", f"{STATE.best_streak} rounds", cursor_y)
+        cursor_y = blit_kv("Insight points gained:", f"+{STATE.total_insight}",        cursor_y)
+        cursor_y = blit_kv("Insight points spent:",  f"+{STATE.total_spent}",        cursor_y)
         cursor_y = blit_center_line("=================================", DIM, cursor_y)
         cursor_y += font.get_height() // 3
 
@@ -2098,9 +2036,9 @@ def draw_judgement_popup(
         cursor_y = blit_center_line("=============ROUND INFO=============", WHITE, cursor_y)
         cursor_y = blit_kv("You made:",               f"{current_moves} changes", cursor_y)
         cursor_y = blit_kv("Optimal was:",            f"{optimal} changes",       cursor_y)
-        cursor_y = blit_kv("Hints used:", f"{globals().get('HINTS_COUNT_THIS_ROUND', 0)} hint" + ("s" if globals().get('HINTS_COUNT_THIS_ROUND', 0) != 1 else ""), cursor_y)
-        cursor_y = blit_kv("Current optimal streak (hintless):", f"{OPTIMAL_STREAK_CURR} rounds", cursor_y)
-        cursor_y = blit_kv("Insight points gained:",  f"+{LAST_ROUND_INSIGHT}",       cursor_y)
+        cursor_y = blit_kv("Hints used:", f"{STATE.round_hints} hint" + ("s" if STATE.round_hints != 1 else ""), cursor_y)
+        cursor_y = blit_kv("Current optimal streak (hintless):", f"{STATE.streak} rounds", cursor_y)
+        cursor_y = blit_kv("Insight points gained:",  f"+{STATE.round_insight}",       cursor_y)
         cursor_y = blit_center_line("=================================", DIM, cursor_y)
         cursor_y += font.get_height() // 3
 
@@ -2120,11 +2058,11 @@ def draw_judgement_popup(
 
         # Run info box (cumulative)
         cursor_y = blit_center_line("=============RUN INFO=============", WHITE, cursor_y)
-        cursor_y = blit_kv("You made:",              f"{RUN_TOTAL_MOVES} changes", cursor_y)
-        cursor_y = blit_kv("Optimal was:",           f"{RUN_TOTAL_OPTIMAL} changes",   cursor_y)
-        cursor_y = blit_kv("Hints used:", f"{globals().get('RUN_HINTS_COUNT', 0)} hint" + ("s" if globals().get('RUN_HINTS_COUNT', 0) != 1 else ""), cursor_y)
-        cursor_y = blit_kv("Insight points gained:", f"+{RUN_TOTAL_INSIGHT}",        cursor_y)
-        cursor_y = blit_kv("Insight points spent:",  f"+{RUN_TOTAL_SPENT}",        cursor_y)
+        cursor_y = blit_kv("You made:",              f"{STATE.total_moves} changes", cursor_y)
+        cursor_y = blit_kv("Optimal was:",           f"{STATE.total_optimal} changes",   cursor_y)
+        cursor_y = blit_kv("Hints used:", f"{STATE.run_hints} hint" + ("s" if STATE.run_hints != 1 else ""), cursor_y)
+        cursor_y = blit_kv("Insight points gained:", f"+{STATE.total_insight}",        cursor_y)
+        cursor_y = blit_kv("Insight points spent:",  f"+{STATE.total_spent}",        cursor_y)
         cursor_y = blit_center_line("=================================", DIM, cursor_y)
         cursor_y += font.get_height() // 3
 
@@ -2138,114 +2076,823 @@ def draw_judgement_popup(
     # === Title, Judgment, Chinese (centered in the full grid area) ===
     title_surf = render_surf(font, title, YELLOW)
     title_rect = title_surf.get_rect(center=(grid_bounds.centerx, cursor_y))
-    screen.blit(title_surf, title_rect)
+    surf.blit(title_surf, title_rect)
 
     y = title_rect.bottom + 12
     for line in judgment.split("\n"):
         line_surf = render_surf(font, line, (255, 255, 255))
         line_rect = line_surf.get_rect(centerx=grid_bounds.centerx, y=y)
-        screen.blit(line_surf, line_rect)
+        surf.blit(line_surf, line_rect)
         y += 20
 
     chinese_surf, _ = render_pair(chinese_font, chinese_char, (255, 255, 255))
     chinese_rect = chinese_surf.get_rect(center=(grid_bounds.centerx, min(grid_bounds.bottom - 30, y + 28)))
-    screen.blit(chinese_surf, chinese_rect)
+    surf.blit(chinese_surf, chinese_rect)
 
-# --- Main Loop ---
-async def run_game():
-    global ADD2DECK, ARROW_CHAR, ARROW_FONT, BLANK, DECK_POPUP_RECT, ENDGAME_TEST_ARMED, GRID_AREA_BOTTOM, GRID_AREA_TOP, HEADINGS, HEIGHT, HELP_POPUP_RECT, HINTS_ENABLED
-    global LAST_ROUND_INSIGHT, LINE_STEP, MAX_LINES, MERGE_ACTIVE, OVERLAP, POPUP_VISIBLE, RUN_HINTS_USED, RUN_TOTAL_MOVES, RUN_TOTAL_OPTIMAL, SEQ_OUTCOME, START_CARD_RECT, WIDTH
-    global WIN_CARD_INDEX, WIN_CARD_RECT, WIN_SEQ_ACTIVE, WIN_SEQ_STARTED_AT, _, active_color, allow, alpha, arrow_color, arrow_down_rect, arrow_h, arrow_rect
-    global arrow_surf, arrow_up_rect, arrow_w, arrow_x, arrow_y, available_h, available_w, base, bg, border, border_w, box_bg
-    global box_color, box_height, box_width, box_x, box_y, card_bg, card_border, card_rect, cell_info, center_x, center_y, ch_rect
-    global ch_surf, chain_rows, char, coins_active, coins_color, coins_should_pulse, coins_text, col, col_gap, col_left, col_right, color
-    global count_text, counter_text, cur, cur_y, current_hx, current_moves, cursor_y, cx, cy, deck_page, delay_elapsed, desc
-    global dist, down_arrow, elapsed, ell, end_rect, eng, eng_rect, eng_surf, event, filled_and_wrong, full_title, gap_left
-    global gap_right, gap_x, gap_y, gname, goal_card_bg, goal_card_border, goal_card_rect, goal_col, goal_is_collected, goal_is_yellow, goal_outer, goal_row_index
-    global grid_bounds, grid_height, grid_origin_x, grid_origin_y, grid_rows, grid_width, gx, gy, help_text_lines, hexagrams_collected, hide_static_winner, hover_preview
-    global hover_rect, hover_text, hover_text_color, hud_x, hud_y, hx, i, idx, impossible, info_surf, info_text, insight_text
-    global insight_y, is_collected, is_current, is_failure_last, is_heading, is_last_card, is_winner, k, left, left_inner_right, left_rect, left_x
-    global line, line1, line2, line_h, line_thick_preview, line_y, lines, lines_top, ln, ln_rect, ln_surf, locked
-    global locked_color, made_optimal, margin_x, margin_y, max_row_index, max_text_w, max_w, max_width, merge_end_time, merge_start, merge_window, min_rows_for_slots
-    global mouse_pos, moves_so_far, moving, msg, msg_color, mx, my, name, next_col, next_index, next_inner, next_outer
-    global now, number, nxt, opt_color, opt_index, opt_x, opt_y, optimal, pad, pending_change, period, phase
-    global pin_rect, pin_surf, pinyin, popup_height, popup_rect, popup_width, popup_x, popup_y, poss_color, poss_text, preview_h, preview_w
-    global prompt, pulse, rect, rect1, rect2, remaining, right, right_rect, round_failed, row, running, s
-    global seq_end_time, seq_start_time, slot_outer, slot_rect, sorted_hexes, sr, start_outer, start_rect, suppress_goal_draw, surf, surf1, surf2
-    global sx, sy, symbol, symbol_rect, t, t1, t2, t3, t_eased, tag, tag_rect, tag_surf
-    global target_index, tip_bg, tip_h, tip_pad_x, tip_pad_y, tip_rect, tip_w, tip_x, tip_y, title, title_row_h, title_rows
-    global title_y, token, top_reserve_px, total_h, total_slots, total_to_hide, tr, ts, txt_color, ty, up_arrow, visible_hexes
-    global white, win_hide_count, words, wrap_font, x, y
-    global optimal_filled_wrong
-    global screen
-    global PENDING_ICON_SURF
+JUDGEMENT_LAYER = Layer(paint_judgement_popup, colorkey=CARD_SPRITE_KEY)
 
-    # ---- defer pygame import until runtime is ready ----
-    global js
-    try:
-        import js as _real_js
-        js = _real_js
-    except Exception:
-        class _NoopConsole:
-            def log(self, *a, **k): pass
-        class _NoJS:
-            console = _NoopConsole()
-            def __getattr__(self, name):
-                def _noop(*a, **k): pass
-                return _noop
-        js = _NoJS()
+# --- Frame drawing ---
+def draw_frame():
+    """
+    Draw one frame of the scene onto screen, as far as its clip reaches.
+    run_game calls it once per clip (see DirtyRects.begin), so it must
+    not change the game: the one step it starts, the win sequence, is
+    guarded by WIN_SEQ_ACTIVE.
+    """
+    global ARROW_CHAR, ARROW_FONT, BLANK, DECK_POPUP_RECT, ENDGAME_TEST_ARMED, HEIGHT, HELP_POPUP_RECT
+    global START_CARD_RECT, WIDTH, WIN_CARD_INDEX, WIN_CARD_RECT, WIN_SEQ_ACTIVE, _, active_color, alpha, arrow_color
+    global arrow_down_rect, arrow_h, arrow_rect, arrow_surf, arrow_up_rect, arrow_w, arrow_x, arrow_y, available_w, bg
+    global border, border_w, box_bg, box_color, box_height, box_width, box_x, box_y, card_bg, card_border, card_rect
+    global cell_info, center_x, center_y, ch_rect, ch_surf, char, coins_active, coins_color, coins_should_pulse
+    global coins_text, col, col_gap, col_left, col_right, counter_text, current_hx, current_moves, cursor_y, cx, cy
+    global delay_elapsed, desc, dist, eng, eng_rect, eng_surf, gap_left, gap_right, goal_card_bg, goal_card_border
+    global goal_card_rect, goal_col, goal_is_collected, goal_is_yellow, goal_outer, grid_bounds, grid_height
+    global grid_origin_x, grid_origin_y, grid_rows, grid_width, hide_static_winner, hud_x, hud_y, hx, i, idx
+    global impossible, insight_text, insight_y, is_collected, is_current, is_failure_last, is_last_card, is_winner, k
+    global left, left_inner_right, left_rect, line, line1, line2, line_h, line_thick_preview, lines, ln, ln_rect
+    global ln_surf, locked_color, made_optimal, max_w, max_width, moves_so_far, moving, msg, msg_color, next_col
+    global next_index, next_inner, opt_color, opt_index, pad, pin_rect, pin_surf, pinyin, popup_height, popup_rect
+    global popup_width, popup_x, popup_y, poss_color, poss_text, preview_h, preview_w, prompt, pulse, rect, rect1
+    global rect2, remaining, right, right_rect, row, s, slot_outer, slot_rect, sr, start_outer, suppress_goal_draw
+    global surf1, surf2, t, t_eased, tag, tag_rect, tag_surf, target_index, tip_bg, tip_rect, total_h, total_slots
+    global total_to_hide, txt_color, ty, white, win_hide_count, wrap_font, y
 
-    # ---- defer pygame import until the runtime is ready ----
-    global pygame
+    screen.fill(BG_COLOR)
 
-    js.console.log("BOOT 0: run_game entered")
+    # --- Bottom-left counters (always visible) ---
+    hud_x = 20
+    hud_y = HEIGHT - 155
+    white = (255, 255, 255)
+
+    # Hexagrams collected (shows 0/64 before the first toss)
+    counter_text = render_surf(font, f"Hexagrams Collected: {len(STATE.collected)} of 64", white)
+    screen.blit(counter_text, (hud_x, hud_y))
+
+    # Insight Points (display total; updates when popup appears)
+    insight_y = hud_y + font.get_height() + 4
+    insight_text = render_surf(font, f"Insight Points (IP): {STATE.balance}", white)
+    screen.blit(insight_text, (hud_x, insight_y))
+
+    # Draw UI Buttons
+    coins_text = render_surf(font, "Coins", (0, 0, 0))
+    # Determine if Coins button should be active
+    coins_active = (not game_started) or POPUP_VISIBLE
+
+    # Pulse the Coins button on launch and after successful round popup
+    coins_should_pulse = (not game_started) or POPUP_VISIBLE
+    if coins_active and coins_should_pulse:
+        pulse = 1.0 + 0.6 * wave(now, PULSE_PERIOD_MS)
+        pygame.draw.rect(screen, (255, 255, 140), coins_button, max(2, int(3 * pulse)))
+
+    # Coins button colors
+    active_color = (200, 200, 200)   # same as help/deck icons
+    locked_color = (80, 80, 80)      # same as locked transformation buttons
+
+    coins_color = active_color if coins_active else locked_color
+    # Decide when to pulse the Coins outline
+    coins_should_pulse = (not game_started) or POPUP_VISIBLE
+
+    pygame.draw.rect(screen, coins_color, coins_button)  # fill first
+
+    if (not game_started) or POPUP_VISIBLE:
+        pulse = 1.0 + 0.6 * wave(now, PULSE_PERIOD_MS)
+        pygame.draw.rect(screen, (255, 255, 140), coins_button, max(2, int(3 * pulse)))
+        DIRTY.mark(coins_button)
+    else:
+        pygame.draw.rect(screen, (60, 60, 60), coins_button, 2)
+
+    coins_text = render_surf(font, "Coins", (0, 0, 0))
+    screen.blit(coins_text, (coins_button.centerx - coins_text.get_width() // 2,
+                            coins_button.centery - coins_text.get_height() // 2))
+
+    draw_toolbar_icons(screen)
+    PROF.lap("hud")
+
+    # Draw transformation buttons
+    draw_buttons(screen, font)
+    PROF.lap("buttons")
+
+    # --- Grid geometry (rebuilt only when the window or the chain's row count changes) ---
+    layout = board_layout()
+    grid_width, grid_height, grid_rows = layout.width, layout.height, layout.rows
+    grid_origin_x, grid_origin_y = layout.origin_x, layout.origin_y
+    grid_bounds = layout.bounds.copy()
+
+    # --- Draw empty card slots (two rows * columns) ---
+    SLOT_LAYER.blit(screen, layout.slot_area, layout_key())
+
+    # --- Draw the pending change card (occupies the next slot) ---
+    if pending_change is not None:
+        next_index = len(hexagram_chain)  # immediately to the right of current hexagram
+        if next_index < SLOT_ROWS * columns:
+            card_rect = layout.card_rect(next_index)
+
+            # Card background = button color; border slightly darker
+            bg = lighten(pending_change["color"], 0.75)
+            border = darken(bg, 30)
+
+            pygame.draw.rect(screen, bg, card_rect, border_radius=CARD_RADIUS)
+            pygame.draw.rect(screen, border, card_rect, CARD_BORDER_W, border_radius=CARD_RADIUS)
+
+            # --- 4-tier text layout ---
+            txt_color = (0, 0, 0)
+            line_h = font.get_height()
+            BLANK  = line_h  # one extra blank line between elements
+            cursor_y = card_rect.y + 10
+            max_width = card_rect.width - 16
 
-    # initialize pygame first; do NOT import submodules yet
-    pygame.init()
-    pygame.font.init()
-    # if WEB: await asyncio.sleep(0)
-    pygame.freetype.init()
+            # 1) English name WITH symbols, big and centered
+            eng = pending_change.get("name", "")
+            eng_surf = render_surf(font, eng, txt_color)
+            eng_rect = eng_surf.get_rect(centerx=card_rect.centerx, y=cursor_y)
+            screen.blit(eng_surf, eng_rect)
+            cursor_y += eng_surf.get_height()
+
+            # 2) Pinyin on its own line (centered)
+            pinyin = pending_change.get("pinyin", "")
+            if pinyin:
+                pin_surf = render_surf(font, pinyin, txt_color)
+                pin_rect = pin_surf.get_rect(centerx=card_rect.centerx, y=cursor_y)
+                screen.blit(pin_surf, pin_rect)
+                cursor_y += pin_surf.get_height() + BLANK + BLANK
+
+            # 3) Chinese character on its own line (centered)
+            char = pending_change.get("char", "")
+            if char:
+                if chinese_font:
+                    ch_surf, _ = render_pair(chinese_font, char, txt_color, size=line_h)  # same visual size as text
+                else:
+                    ch_surf = render_surf(font, char, txt_color)
+                ch_rect = ch_surf.get_rect(centerx=card_rect.centerx, y=cursor_y)
+                screen.blit(ch_surf, ch_rect)
+                cursor_y += (ch_surf.get_height() if hasattr(ch_surf, "get_height") else line_h) + BLANK + BLANK
+
+            # 4) Description (wrapped, centered)
+            desc = pending_change.get("desc", "") or pending_change.get("description", "")
+            if desc:
+                max_w = card_rect.width - 20  # you can tighten to -40 if edges feel tight
+                for line in wrap_multiline(desc, max_w, font):
+                    ln_surf = render_surf(font, line, txt_color)
+                    ln_rect = ln_surf.get_rect(centerx=card_rect.centerx, y=cursor_y)
+                    screen.blit(ln_surf, ln_rect)             # <-- use the rect!
+                    cursor_y = ln_rect.bottom                 # advance by actual rendered height
+
+    # --- Slots-remaining message in the next empty slot ---
+    if game_started and goal_hexagram and not STATE.locked:
+        current_moves = (len(hexagram_chain) - 1) + (1 if pending_change is not None else 0)
+        remaining = max(0, STATE.limit - current_moves)
+
+        # Next slot index immediately after the current hexagram
+        next_index = len(hexagram_chain) + (1 if pending_change is not None else 0)
+
+        # Only draw if that slot exists in our 2-row (SLOT_ROWS) grid
+        if next_index < SLOT_ROWS * columns:
+            slot_rect = layout.card_rect(next_index)
+
+            # Message text
+            msg = f"You have {remaining} slot{'s' if remaining != 1 else ''} remaining."
+            max_width = slot_rect.width - 16
+
+            # Choose color: red if last 3 or fewer, else white
+            if remaining <= 3:
+                msg_color = (240, 162, 164)  # bright red
+            else:
+                msg_color = (255, 255, 255)  # white
+
+            # Reuse your wrap helper
+            line1, line2 = wrap_two_lines(msg, max_width, font)
+
+            # Center the message inside the slot (no fill, just border)
+            total_h = font.get_height() * (2 if line2 else 1)
+            ty = slot_rect.y + (slot_rect.height - total_h) // 2
+
+            surf1 = render_surf(font, line1, msg_color)
+            rect1 = surf1.get_rect(centerx=slot_rect.centerx, y=ty)
+            screen.blit(surf1, rect1)
+
+            if line2:
+                surf2 = render_surf(font, line2, msg_color)
+                rect2 = surf2.get_rect(centerx=slot_rect.centerx, y=ty + font.get_height())
+                screen.blit(surf2, rect2)
+
+    cell_info = []  # collect per-card layout info for arrow drawing
+
+    # Display hexagram chain
+    # How many chain cards (from the left) should be hidden this frame?
+    win_hide_count = 0
+    gathered = False   # the gather is over (merge sweep, linger or popup)
+    if WIN_SEQ_ACTIVE:
+        total_to_hide = max(0, len(hexagram_chain) - 1)  # hide everything except the last (the winner)
+        gather = ANIM.get("win_gather")
+        if gather is None:
+            win_hide_count, gathered = total_to_hide, True
+        else:
+            # pause before the gather starts
+            delay_elapsed = max(0, gather.elapsed(now) - WIN_SEQ_START_DELAY_MS)
+            win_hide_count = min(total_to_hide, delay_elapsed // WIN_SEQ_PER_CARD_MS)
 
-    # tiny yield on web to let the FS & canvas settle
-    import sys, asyncio as _asyncio
-    try:
-        if sys.platform == "emscripten" or getattr(sys, "_emscripten_info", None):
-            await _asyncio.sleep(0)
-    except Exception:
-        pass
+    WIN_CARD_RECT = None
+    WIN_CARD_INDEX = -1 
 
-    js.console.log("BOOT 1: pygame inited & freetype ready")
+    START_CARD_RECT = None
+    flip = ANIM.get("flip")
 
-    # now it's safe to create window, fonts, icons, etc.
-    screen = pygame.display.set_mode((WIDTH, HEIGHT))
-    if PENDING_ICON_SURF is not None:
-        try:
-            pygame.display.set_icon(PENDING_ICON_SURF)
-        finally:
-            PENDING_ICON_SURF = None
-    pygame.display.set_caption("Hexadeck")
-    js.console.log("BOOT 2: display set")
+    for i, hx in enumerate(hexagram_chain):
+        # If the win sequence is playing, hide cards [0 .. win_hide_count-1].
+        # The final card (i == len(chain)-1) is the yellow "winner" and should never be hidden.
+        if WIN_SEQ_ACTIVE and i < win_hide_count:
+            continue
+        col = i % columns
+        row = i // columns
+        card_rect = layout.card_rect(i)
 
-    # first paint
-    screen.fill(BG_COLOR)
-    pygame.display.flip()
-    await _asyncio.sleep(0)
-    js.console.log("BOOT 3: first paint ok")
+        # remember the first slot’s rect as the "start"
+        if START_CARD_RECT is None and i == 0:
+            START_CARD_RECT = card_rect.copy()
 
-    # then assets/fonts/buttons (your existing calls)
-    await load_assets()
-    js.console.log(f"BOOT 4: assets loaded? {bool(HEXAGRAM_DATA)}")
+        # ... draw the card background, title, lines, etc ...
+
+        if flip and flip["index"] == i:
+        # Do not draw this card yet; the flip overlay will cover this slot.
+        # Also skip adding it to cell_info so the between-cards arrow doesn't appear yet.
+            continue
+
+        # Save for arrows
+        cell_info.append({
+            "rect": card_rect,
+            "row": row,
+            "col": col,
+            "edge_color": hx.get("edge_color"),
+            "edge_short": hx.get("edge_short"),
+        })
+
+        is_collected    = (hx["code"] in STATE.collected)
+        is_last_card    = (i == len(hexagram_chain) - 1)
+        is_winner       = (goal_hexagram is not None and is_last_card and hx["code"] == goal_hexagram["code"])
+        is_failure_last = (STATE.failed and STATE.locked and is_last_card)
+
+        # Capture the winner’s rect and hide the static winner during the merge window
+        if is_winner:
+            WIN_CARD_RECT = card_rect.copy()
+            WIN_CARD_INDEX = i
+            # Hide the static winner from the end of the gather until the popup is visible
+            hide_static_winner = (
+                WIN_SEQ_ACTIVE
+                and STATE.outcome == "success"
+                and is_winner and is_last_card
+                and gathered                      # gather finished (covers merge AND linger)
+                and not POPUP_VISIBLE             # keep hidden until popup actually appears
+            )
+            if hide_static_winner:
+                continue
+
+        # Background color
+        is_current = is_last_card
+
+        if is_failure_last:
+            card_bg = CARD_BG_FAILURE
+        elif is_winner:
+            # current winning card gets the same yellow fill as the goal
+            card_bg = CARD_BG_COLLECTED
+        elif is_current and is_collected:
+            # only the current card keeps yellow if it's a collected hexagram
+            card_bg = CARD_BG_COLLECTED
+        elif is_current:
+            # current but not collected → normal white
+            card_bg = CARD_BG_DEFAULT
+        else:
+            # any earlier card → lightly dimmed
+            card_bg = CHAIN_CARD_BG_DIM
+
+        # Border color + width
+        if is_failure_last:
+            card_border = CARD_BORDER_FAILURE
+            border_w    = CARD_BORDER_W
+        elif is_winner:
+            card_border = CARD_BORDER_COLLECTED
+            border_w    = CARD_BORDER_W            # normal width for the winner
+        elif is_collected:
+            card_border = CARD_BORDER_COLLECTED    # yellow border for previously collected
+            border_w    = CARD_BORDER_W # thicker rim
+        else:
+            card_border = CARD_BORDER_DEFAULT
+            border_w    = CARD_BORDER_W
+
+        # Draw (pre-rendered face for this hexagram + style)
+        screen.blit(card_sprite(hx, card_rect.size, font, card_bg, card_border, border_w), card_rect)
+
+        draw_resolve_flip(screen, now)
+
+        # --- Draw small right-facing arrows between adjacent cards on SAME ROW ---
+        ARROW_CHAR = "►"   # or "➜" / "➤" / "►" if you prefer
+        ARROW_FONT = font  # use your normal font; we can switch to a slightly smaller one if it feels big
+
+        for k in range(1, len(cell_info)):
+            left  = cell_info[k - 1]
+            right = cell_info[k]
+
+            # Only draw if same row (keeps visual clean; skip row wraps)
+            if left["row"] != right["row"]:
+                # Special case: row 0 last col  →  row 1 first col
+                col_left  = left.get("col",  (left["rect"].left  - grid_origin_x) // CELL_W)
+                col_right = right.get("col", (right["rect"].left - grid_origin_x) // CELL_W)
+                if (left["row"] == 0 and right["row"] == 1
+                    and col_left == (columns - 1) and col_right == 0):
+
+                    arrow_color = right.get("edge_color") or (255, 255, 255)
+
+                    left_inner_right = left["rect"].right
+                    center_x = left_inner_right + CARD_PAD      # ← same spacing as between cards
+                    center_y = left["rect"].centery
+
+                    arrow_surf = render_surf(ARROW_FONT, ARROW_CHAR, arrow_color)
+                    screen.blit(arrow_surf, arrow_surf.get_rect(center=(center_x, center_y)))
+                # Skip normal cross-row drawing
+                continue
+
+            # Arrow uses the color that produced the RIGHT card
+            arrow_color = right.get("edge_color") or (255, 255, 255)
+            # arrow_color = (255, 255, 255)
+
+            # Position: centered between the two cards, vertically centered on the cards
+            gap_left  = left["rect"].right
+            gap_right = right["rect"].left
+            if gap_right <= gap_left:
+                continue  # no space (shouldn't happen with your layout)
+
+            center_x = (gap_left + gap_right) // 2
+            center_y = left["rect"].centery
+
+            arrow_surf = render_surf(ARROW_FONT, ARROW_CHAR, arrow_color)
+            arrow_rect = arrow_surf.get_rect(center=(center_x, center_y))
+            screen.blit(arrow_surf, arrow_rect)
+
+            # Optional: tiny label under the arrow (commented out to avoid clutter)
+            # lbl = right.get("edge_short")
+            # if lbl:
+            #     lbl_surf = TOOLTIP_FONT.render(lbl, True, arrow_color)
+            #     lbl_rect = lbl_surf.get_rect(center=(center_x, center_y + ARROW_FONT.get_height() // 2 + 2))
+            #     screen.blit(lbl_surf, lbl_rect)
+
+        # --- Blinking prompt arrow after the CURRENT card (same position as normal arrows) ---
+        if (game_started
+            and not POPUP_VISIBLE
+            and not STATE.locked
+            and not WIN_SEQ_ACTIVE
+            and not (deck_popup_visible or help_popup_visible)
+            and len(cell_info) >= 1):
+
+            left = cell_info[-1]               # last placed card
+            row  = left["row"]
+            col  = left.get("col", None)
+
+            # Derive next slot in SAME ROW (we never draw cross-row arrows)
+            if col is None:
+                # if your cell_info doesn't store 'col', compute it from the rect:
+                col = (left["rect"].left - grid_origin_x) // CELL_W
+
+            next_col = col + 1
+            if next_col < columns and (len(hexagram_chain) <= STATE.limit):
+                # Build the next slot's inner rect (no card yet, but we know its geometry)
+                next_inner = layout.card_rect(row * columns + next_col)
+
+                gap_left  = left["rect"].right
+                gap_right = next_inner.left
+                if gap_right > gap_left:
+                    center_x = (gap_left + gap_right) // 2
+                    center_y = left["rect"].centery
+
+                    # Blink alpha (smooth sine)
+                    alpha  = int(64 + 191 * wave(now, PROMPT_ARROW_PERIOD_MS))
+
+                    # Use the SAME glyph/font as your normal arrows
+                    ARROW_CHAR = "►"
+                    ARROW_FONT = font
+
+                    prompt = faded_text(ARROW_FONT, ARROW_CHAR, (255, 255, 255), alpha)
+                    prompt_rect = prompt.get_rect(center=(center_x, center_y))
+                    screen.blit(prompt, prompt_rect)
+                    DIRTY.mark(prompt_rect)
+
+            elif (next_col == columns and row == 0 and len(hexagram_chain) <= STATE.limit):
+                # Row wrap case: blink just one pad to the right of the last top-row card
+                left_inner_right = left["rect"].right
+                center_x = left_inner_right + CARD_PAD          # ← match spacing
+                center_y = left["rect"].centery
+
+                alpha  = int(64 + 191 * wave(now, PROMPT_ARROW_PERIOD_MS))
+
+                prompt = faded_text(ARROW_FONT, "►", (255, 255, 255), alpha)
+                prompt_rect = prompt.get_rect(center=(center_x, center_y))
+                screen.blit(prompt, prompt_rect)
+                DIRTY.mark(prompt_rect)
+
+    # Display goal hexagram at far right
+    if goal_hexagram:
+        goal_col = columns - 1
+
+        # --- GOAL CARD COLORS (always set these before drawing the goal card) ---
+        goal_is_collected = (STATE.outcome == "success" and POPUP_VISIBLE)  # ← add POPUP_VISIBLE
+        goal_card_bg     = CARD_BG_COLLECTED  if goal_is_collected else CARD_BG_DEFAULT
+        goal_card_border = CARD_BORDER_COLLECTED if goal_is_collected else CARD_BORDER_DEFAULT
+
+        goal_card_rect = layout.card_rect(columns + goal_col)   # row 1
+
+        goal2start = ANIM.get("goal2start")
+        if goal2start:
+            if goal2start["start_rect"] is None:
+                goal2start["start_rect"] = goal_card_rect.copy()
+            if goal2start["end_rect"] is None:
+                goal2start["end_rect"] = get_chain_card_rect_at(0)
+
+        goal_is_collected = goal_hexagram["code"] in STATE.collected
+        goal_is_yellow = (goal_revealed or goal_is_collected)
+
+        if STATE.failed and STATE.locked:
+            goal_card_bg = CARD_BG_FAILURE
+            goal_card_border = CARD_BORDER_FAILURE
+        else:
+            goal_card_bg = CARD_BG_COLLECTED if goal_is_yellow else CARD_BG_DEFAULT
+            goal_card_border = CARD_BORDER_COLLECTED if goal_is_yellow else CARD_BORDER_DEFAULT
+
+        # DRAW THE GOAL CARD BACKGROUND + BORDER
+        # DRAW THE GOAL CARD BACKGROUND + BORDER
+        suppress_goal_draw = ("goal2start" in ANIM)   # ← ONLY hide during the coins swoosh
+
+        if not suppress_goal_draw:
+            screen.blit(card_sprite(goal_hexagram, goal_card_rect.size, font, goal_card_bg, goal_card_border),
+                        goal_card_rect)
+        else:
+            # Title & lines only; the shell is riding the swoosh
+            draw_card_face(screen, goal_card_rect, goal_hexagram, font)
+
+    # --- Side labels: START (left of start slot), GOAL (right of goal slot) ---
+
+    # Derive the START outer slot rect:
+    if 'START_CARD_RECT' in globals() and START_CARD_RECT:
+        # inflate inner card rect back to the slot box (outside the border)
+        start_outer = START_CARD_RECT.inflate(2 * CARD_PAD, 2 * CARD_PAD)
+    else:
+        # Fallback: column 0, row 0 (the chain row)
+        start_outer = layout.cell_rect(0)
+
+    # Derive the GOAL outer slot rect (rightmost column, row 1 as you place goal)
+    goal_outer = layout.cell_rect(2 * columns - 1)
+
+    # Paint the labels just outside the slot borders
+    draw_side_label(screen, "START", font, start_outer, side="left",  pad=8, ccw=True,  color=(230,230,230))
+    draw_side_label(screen, "GOAL",  font, goal_outer,  side="right", pad=8, ccw=False, color=(230,230,230))
+
+    # --- OPTIMAL marker ---
+    optimal_broken = False
+
+    if game_started and goal_hexagram and STATE.round_optimal is not None and not POPUP_VISIBLE:
+
+        moves_so_far = len(hexagram_chain) - 1
+
+        optimal_still_possible = (
+            STATE.live_dist is not None
+            and moves_so_far + STATE.live_dist == STATE.round_optimal
+        )
+
+        optimal_broken = not optimal_still_possible
+
+        opt_index = STATE.round_optimal
+        total_slots = SLOT_ROWS * columns
+
+        if 0 <= opt_index < total_slots:
+            # Determine OPTIMAL color/state
+            made_optimal = (
+                STATE.outcome == "success"
+                and moves_so_far == STATE.round_optimal
+            )
+
+            if made_optimal:
+                opt_color = (255, 255, 0)          # yellow
+            elif optimal_broken:
+                opt_color = (235, 120, 120)        # red
+            else:
+                opt_color = (255, 255, 255)        # white
+
+            # Slot rect
+            slot_outer = layout.cell_rect(opt_index)
+
+            # Render label
+            tag = render_surf(font, "↓ OPTIMAL ↓", opt_color)
+            tag_rect = tag.get_rect(
+                midbottom=(slot_outer.centerx, slot_outer.top - OPT_LABEL_GAP)
+            )
+
+            if tag_rect.top < 0:
+                tag_rect.top = 0
+
+            screen.blit(tag, tag_rect)
+
+            # Strikethrough immediately once optimal is broken
+            if optimal_broken and not made_optimal:
+                y = tag_rect.centery
+                pad = 4
+                pygame.draw.line(
+                    screen,
+                    opt_color,
+                    (tag_rect.left - pad, y),
+                    (tag_rect.right + pad, y),
+                    1
+                )
+
+
+
+    # --- POSSIBLE / NOT POSSIBLE marker ---
+    if game_started and goal_hexagram and not POPUP_VISIBLE and optimal_broken:
+
+        moves_so_far = len(hexagram_chain) - 1
+        remaining = max(0, STATE.limit - moves_so_far)
+        dist = STATE.live_dist
+
+        impossible = (dist is None) or (dist > remaining)
+
+        if impossible:
+            poss_text  = "↓ NOT POSSIBLE ↓"
+            poss_color = (235, 120, 120)  # red
+            target_index = STATE.limit
+        else:
+            poss_text  = "↓ POSSIBLE ↓"
+            poss_color = (230, 230, 230)
+            target_index = moves_so_far + dist
+
+            # Achieved goal → yellow
+            if STATE.outcome == "success" and dist == 0:
+                poss_color = (255, 255, 0)
+
+        total_slots = SLOT_ROWS * columns
+        if 0 <= target_index < total_slots:
+
+            slot_outer = layout.cell_rect(target_index)
+
+            tag_surf = render_surf(font, poss_text, poss_color)
+            tag_rect = tag_surf.get_rect(
+                midbottom=(slot_outer.centerx, slot_outer.top - OPT_LABEL_GAP)
+            )
+
+            # Clamp
+            WIDTH, HEIGHT = screen.get_size()
+            if tag_rect.top < 0: tag_rect.top = 0
+            if tag_rect.right > WIDTH - 2: tag_rect.right = WIDTH - 2
+            if tag_rect.left < 2: tag_rect.left = 2
+
+            screen.blit(tag_surf, tag_rect)
+
+
+    # Round settled (STATE.play reached the goal or the last slot): run the
+    # success / failure sequence once; totals are already in STATE
+    if STATE.outcome and not WIN_SEQ_ACTIVE:
+        WIN_SEQ_ACTIVE = True
+        start_win_sequence()
+        if STATE.outcome == "success" and ENDGAME_TEST_ARMED and STATE.deck_complete:
+            ENDGAME_TEST_ARMED = False
+            debug_print("[DEV] End-game test completed -> DISARMED")
+
+    PROF.lap("chain")
+
+    # Draw hover preview box if applicable
+    if hover_preview:
+        rect, hx, box_color, idx = hover_preview
+        (box_x, box_y, box_width, box_height), tip_rect, lines = hover_preview_rects(rect, idx)
+        current_hx = hexagram_chain[-1]["binary"]
+
+        # Rounded, lighter background; no border
+        box_bg = lighten(box_color, 0.75)
+        pygame.draw.rect(screen, box_bg, (box_x, box_y, box_width, box_height), border_radius=10)
+
+        # --- Hexagram previews (bars) ---
+        pad = 4
+        col_gap = 6
+
+        arrow_surf = render_surf(font, "→", (0, 0, 0))
+        arrow_w = arrow_surf.get_width()
+        arrow_h = arrow_surf.get_height()
+
+        available_w = box_width - 2*pad - arrow_w - 2*col_gap
+        preview_w   = max(42, available_w // 2)         # a touch wider than before
+        preview_h   = box_height - 2*pad
+
+        left_rect  = pygame.Rect(box_x + pad,                        box_y + pad, preview_w, preview_h)
+        right_rect = pygame.Rect(box_x + box_width - pad - preview_w, box_y + pad, preview_w, preview_h)
+
+        # arrow centered between previews
+        arrow_x = (left_rect.right + right_rect.left - arrow_w) // 2
+        arrow_y = box_y + (box_height - arrow_h) // 2 + 1
+
+        # thinner bars for small previews
+        line_thick_preview = max(0.5, int(preview_h / 40))  # ~3–4 px typically
+
+        # Draw the two hexagrams with tighter horizontal padding and a small fixed yin gap
+        draw_line_figure(screen, left_rect, current_hx, "preview", line_thick_preview)
+        draw_line_figure(screen, right_rect, hx["binary"], "preview", line_thick_preview)
+
+        # Draw arrow last
+        screen.blit(arrow_surf, (arrow_x, arrow_y))
+
+        # --- description tooltip that visually extends the button (centered, smaller font) ---
+        t = TRANSFORMATIONS[idx]
+        wrap_font = TOOLTIP_FONT  # use the smaller font for wrapping & rendering
+        tip_bg = lighten(t["color"], 0.75)
+        pygame.draw.rect(screen, tip_bg, tip_rect, border_radius=10)
+
+        # Center each line horizontally within the tooltip
+        y = tip_rect.y + PREVIEW_TIP_PAD_Y
+        for ln in lines:
+            s = render_surf(wrap_font, ln, (0, 0, 0))
+            sr = s.get_rect(centerx=tip_rect.centerx, y=y)
+            screen.blit(s, sr)
+            y += wrap_font.get_height()
+
+    PROF.lap("hover")
+
+    # --- SUCCESS FLOW: the winner sweeps onto the goal (the popup opens when the sequence ends) ---
+    merge = ANIM.get("win_merge")
+    if merge and WIN_CARD_RECT and goal_hexagram:
+        t_eased = merge.progress(now)   # easeOutQuad
+
+        moving = WIN_CARD_RECT.copy()
+        cx = WIN_CARD_RECT.centerx + t_eased * (goal_card_rect.centerx - WIN_CARD_RECT.centerx)
+        cy = WIN_CARD_RECT.centery + t_eased * (goal_card_rect.centery - WIN_CARD_RECT.centery)
+        moving.center = (cx, cy)
+
+        pygame.draw.rect(screen, (255, 255, 140), moving, 5, border_radius=CARD_RADIUS)
+        pygame.draw.rect(screen, (255, 255, 140), moving.inflate(10, 10), 2, border_radius=CARD_RADIUS)
+
+    # --- POPUPS / DIMMER / MODALS (single consolidated block) ---
+
+    if deck_popup_visible or help_popup_visible:
+        # 0) If the judgment popup is up, draw it FIRST so it sits UNDER the dimmer
+        if POPUP_VISIBLE and goal_hexagram:
+            draw_judgement_popup(
+                screen, font, chinese_font,
+                goal_hexagram, WIDTH, HEIGHT,
+                grid_bounds, goal_card_rect,
+                CARD_RADIUS,
+                outcome=STATE.outcome
+            )
+
+        # 2) Draw the goal→deck swoosh UNDER the dimmer as well (so it gets darkened)
+        draw_add2deck_swoosh(screen, now)
+
+        # 6) Full-screen dim (darkens board + popup + swoosh)
+        draw_modal_dim(screen, alpha=190)  # tweak 170–200 to taste
+
+        # 7) Top-most UI for the Deck/Help modal
+        draw_toolbar_icons(screen)
+        if hover_text and hover_rect:
+            draw_tooltip(screen, hover_text, hover_rect, font, prefer_above=True)
+
+        # 8) (Wherever you currently draw the Deck/Help popup contents) — keep those here, ABOVE the dimmer
+        # draw_deck_popup(...) / draw_help_popup(...)
+
+    else:
+        # No other modal → draw the judgment popup normally on top of the board
+        if POPUP_VISIBLE and goal_hexagram:
+            draw_judgement_popup(
+                screen, font, chinese_font,
+                goal_hexagram, WIDTH, HEIGHT,
+                grid_bounds, goal_card_rect,
+                CARD_RADIUS,
+                outcome=STATE.outcome
+            )
+        # Then draw the swoosh on top of the popup
+        draw_add2deck_swoosh(screen, now)
+        draw_goal2start_swoosh(screen, now)
+
+
+    # --- Deck popup state ---
+    popup_width = 580
+    popup_height = 510
+    popup_x = (WIDTH - popup_width) // 2
+    popup_y = 38
+    popup_rect = pygame.Rect(popup_x, popup_y, popup_width, popup_height)
+    # Arrow button rectangles (top-right corner inside popup)
+    arrow_up_rect, arrow_down_rect = deck_arrow_rects(popup_rect)
+
+    # --- Deck popup rendering ---
+    if deck_popup_visible:
+        DECK_POPUP_RECT = popup_rect  # <-- set global hit area
+        DECK_LAYER.blit(screen, DECK_POPUP_RECT,
+                        (deck_page, board_of(STATE.collected), font, hexagram_font, layout_key()))
+
+    else:
+        DECK_POPUP_RECT = None  # <-- clear when not visible    
+
+    # Draw help popup if visible
+    if help_popup_visible:
+        popup_width = 580
+        popup_height = 510  # Increased height to accommodate all lines
+        popup_x = (WIDTH - popup_width) // 2
+        popup_y = 38  # Top-aligned to avoid covering Coins + messages
+
+        HELP_POPUP_RECT = pygame.Rect(popup_x, popup_y, popup_width, popup_height)  # <-- set global
+
+        HELP_LAYER.blit(screen, HELP_POPUP_RECT, (font,))
+
+    if hover_text and hover_rect:
+        draw_tooltip(screen, hover_text, hover_rect, font, prefer_above=True)
+    PROF.lap("popups")
+
+    if PROF.enabled:
+        # uncached rendering: the numbers change every frame
+        box = PROF.draw(screen, lambda text, color: _rasterize(TOOLTIP_FONT, text, color, True, None)[0])
+        if box:
+            DIRTY.mark(box)
+    PROF.lap("overlay")
+
+
+# --- Main Loop ---
+async def run_game():
+    global ENDGAME_TEST_ARMED, POPUP_VISIBLE, allow, base, color, deck_page, elapsed, end_rect, event
+    global filled_and_wrong, hover_preview, hover_rect, hover_text, hover_text_color, mouse_pos, mx, my, name, now
+    global optimal, pending_change, running, start_rect, title, x
+    global optimal_filled_wrong
+    global screen
+    global PENDING_ICON_SURF
+
+    # ---- defer pygame import until runtime is ready ----
+    global js
+    try:
+        import js as _real_js
+        js = _real_js
+    except Exception:
+        class _NoopConsole:
+            def log(self, *a, **k): pass
+        class _NoJS:
+            console = _NoopConsole()
+            def __getattr__(self, name):
+                def _noop(*a, **k): pass
+                return _noop
+        js = _NoJS()
+
+    # ---- defer pygame import until the runtime is ready ----
+    global pygame
+
+    js.console.log("BOOT 0: run_game entered")
+
+    # initialize pygame first; do NOT import submodules yet
+    pygame.init()
+    pygame.font.init()
+    # if WEB: await asyncio.sleep(0)
+    pygame.freetype.init()
+
+    # tiny yield on web to let the FS & canvas settle
+    import sys, asyncio as _asyncio
+    try:
+        if sys.platform == "emscripten" or getattr(sys, "_emscripten_info", None):
+            await _asyncio.sleep(0)
+    except Exception:
+        pass
+
+    js.console.log("BOOT 1: pygame inited & freetype ready")
+
+    # now it's safe to create window, fonts, icons, etc.
+    screen = pygame.display.set_mode((WIDTH, HEIGHT), WINDOW_FLAGS)
+    if PENDING_ICON_SURF is not None:
+        try:
+            pygame.display.set_icon(PENDING_ICON_SURF)
+        finally:
+            PENDING_ICON_SURF = None
+    pygame.display.set_caption("Hexadeck")
+    js.console.log("BOOT 2: display set")
+
+    # first paint
+    screen.fill(BG_COLOR)
+    pygame.display.flip()
+    await _asyncio.sleep(0)
+    js.console.log("BOOT 3: first paint ok")
+
+    # then assets/fonts/buttons (your existing calls)
+    await load_assets()
+    js.console.log(f"BOOT 4: assets loaded? {bool(HEXAGRAM_DATA)}")
 
     recompute_layout_from_fonts()
     await rebuild_buttons()
     js.console.log("BOOT 5: buttons built")
 
     running = True
+    mode = MOTION
     while running:
-        for event in pygame.event.get():
+        events = await FRAMES.next_frame(mode)
+        now = ANIM.tick()   # one animation timestamp for the whole frame
+        PROF.begin_frame()
+        for event in events:
             if event.type == pygame.QUIT:
                 running = False
     
+            if event.type == pygame.VIDEORESIZE:
+                await resize_window(event.size)
+    
+            if event.type == pygame.KEYDOWN:
+                if event.key == PROFILE_OVERLAY_KEY:
+                    PROF.toggle()
+                elif event.key == PROFILE_DUMP_KEY:
+                    dump_profile()
+    
             if event.type == pygame.KEYDOWN and DEV_TOOLS_ENABLED:
                 if event.key == pygame.K_F12:  # pick any key you like
                     if not ENDGAME_TEST_ARMED:
@@ -2283,16 +2930,13 @@ async def run_game():
                     elif arrow_down_rect.collidepoint(event.pos):
                         deck_page = 1
     
+        # Retire finished animations (their callbacks open the popup or deal the next round)
+        await ANIM.update()
+
         # Resolve pending change after duration
-        now = pygame.time.get_ticks()
         if pending_change is not None:
             if now - pending_change["started_at"] >= PENDING_DURATION_MS:
-                apply_transformation(
-                    pending_change["transform_func"],
-                    pending_change["label"],
-                    color=pending_change.get("color"),
-                    short=pending_change.get("name"),
-                )
+                apply_transformation(pending_change["index"])
                 pending_change = None
     
         # Get hover preview
@@ -2304,1150 +2948,29 @@ async def run_game():
         if deck_icon_rect.collidepoint(mouse_pos):
             hover_text, hover_rect = "Hexadeck", deck_icon_rect
         elif hint_icon_rect.collidepoint(mouse_pos):
-            hover_text = f"Hint (-{HINT_COST_IP} IP)"
+            hover_text = f"Hint (-{STATE.hint_cost} IP)"
             hover_rect = hint_icon_rect
             # Red when you can't afford and the hint isn't already active
             if game_started and not (deck_popup_visible or help_popup_visible or POPUP_VISIBLE):
-                if (not HINTS_ENABLED) and (INSIGHT_BALANCE < HINT_COST_IP):
+                if (not STATE.hint_active) and (STATE.balance < STATE.hint_cost):
                     hover_text_color = (220, 60, 60)  # red
         elif help_button.collidepoint(mouse_pos):  # or help_button if that's your var
             hover_text, hover_rect = "Instructions", help_button
     
-        # When drawing the tooltip, pass fg=hover_text_color
-        if hover_text and hover_rect:
-            draw_tooltip(screen, hover_text, hover_rect, font, prefer_above=True, fg=hover_text_color)
-    
-        # Begin drawing frame
-        screen.fill(BG_COLOR)
-    
-        # --- Bottom-left counters (always visible) ---
-        hud_x = 20
-        hud_y = HEIGHT - 155
-        white = (255, 255, 255)
-    
-        # Hexagrams collected (shows 0/64 before the first toss)
-        counter_text = render_surf(font, f"Hexagrams Collected: {hexagrams_collected} of 64", white)
-        screen.blit(counter_text, (hud_x, hud_y))
-    
-        # Insight Points (display total; updates when popup appears)
-        insight_y = hud_y + font.get_height() + 4
-        insight_text = render_surf(font, f"Insight Points (IP): {INSIGHT_BALANCE}", white)
-        screen.blit(insight_text, (hud_x, insight_y))
-    
-        # Draw UI Buttons
-        coins_text = render_surf(font, "Coins", (0, 0, 0))
-        # Determine if Coins button should be active
-        coins_active = (not game_started) or POPUP_VISIBLE
-    
-        # Pulse the Coins button on launch and after successful round popup
-        coins_should_pulse = (not game_started) or POPUP_VISIBLE
-        if coins_active and coins_should_pulse:
-            t = pygame.time.get_ticks() / 250.0
-            pulse = 1.0 + 0.6 * (0.5 + 0.5 * math.sin(t))
-            pygame.draw.rect(screen, (255, 255, 140), coins_button, max(2, int(3 * pulse)))
-    
-        # Coins button colors
-        active_color = (200, 200, 200)   # same as help/deck icons
-        locked_color = (80, 80, 80)      # same as locked transformation buttons
-    
-        coins_color = active_color if coins_active else locked_color
-        # Decide when to pulse the Coins outline
-        coins_should_pulse = (not game_started) or POPUP_VISIBLE
-    
-        pygame.draw.rect(screen, coins_color, coins_button)  # fill first
-    
-        if (not game_started) or POPUP_VISIBLE:
-            t = pygame.time.get_ticks() / 250.0
-            pulse = 1.0 + 0.6 * (0.5 + 0.5 * math.sin(t))
-            pygame.draw.rect(screen, (255, 255, 140), coins_button, max(2, int(3 * pulse)))
-        else:
-            pygame.draw.rect(screen, (60, 60, 60), coins_button, 2)
-    
-        coins_text = render_surf(font, "Coins", (0, 0, 0))
-        screen.blit(coins_text, (coins_button.centerx - coins_text.get_width() // 2,
-                                coins_button.centery - coins_text.get_height() // 2))
-    
-        draw_toolbar_icons(screen)
-    
-        # Draw transformation buttons
-        draw_buttons(screen, font)
-    
-        # --- Dynamic grid origin per frame ---
-        # columns already defined globally from CELL_W; keep that
-        grid_width = columns * CELL_W
-    
-        # How many rows do we actually need?
-        if hexagram_chain:
-            chain_rows = ((len(hexagram_chain) - 1) // columns) + 1
-        else:
-            chain_rows = 1
-    
-        goal_row_index = 1  # you draw the goal on row 1
-        min_rows_for_slots = SLOT_ROWS
-        max_row_index = max(chain_rows - 1, goal_row_index, min_rows_for_slots - 1)
-        grid_rows = max_row_index + 1
-        grid_height = grid_rows * CELL_H + (grid_rows - 1) * GRID_ROW_GAP
-    
-        # Horizontal center in the window
-        grid_origin_x = (WIDTH - grid_width) // 2
-    
-        # Vertical center between top of window and Coins button (with a small padding)
-        GRID_AREA_TOP = 20
-        GRID_AREA_BOTTOM = coins_button_y - 10
-        available_h = max(0, GRID_AREA_BOTTOM - GRID_AREA_TOP)
-        grid_origin_y = GRID_AREA_TOP + max(0, (available_h - grid_height) // 2)
-        # Nudge the grid up a bit so the OPTIMAL label clears row 2
-        grid_origin_y = max(GRID_AREA_TOP, grid_origin_y - GRID_ROW_GAP // 3)
-    
-        # Bounds of the full grid area (matching the two slot rows)
-        grid_bounds = pygame.Rect(
-            grid_origin_x + CARD_PAD,
-            grid_origin_y + CARD_PAD,
-            columns * CELL_W - 2 * CARD_PAD,
-            SLOT_ROWS * CELL_H + (SLOT_ROWS - 1) * GRID_ROW_GAP - 2 * CARD_PAD
-        )
-    
-        # --- Draw empty card slots (two rows * columns) ---
-        for i in range(SLOT_ROWS * columns):
-            col = i % columns
-            row = i // columns
-            x = grid_origin_x + col * CELL_W
-            y = grid_origin_y + row * (CELL_H + GRID_ROW_GAP)
-    
-            slot_rect = pygame.Rect(
-                x + CARD_PAD,
-                y + CARD_PAD,
-                CELL_W - CARD_PAD * 2,
-                CELL_H - CARD_PAD * 2
-            )
-    
-            # simple white rounded rect with a subtle border
-            pygame.draw.rect(
-                screen,
-                CARD_BORDER_DEFAULT,
-                slot_rect,
-                CARD_BORDER_W,
-                border_radius=CARD_RADIUS
-            )
-    
-        # --- Draw the pending change card (occupies the next slot) ---
-        if pending_change is not None:
-            next_index = len(hexagram_chain)  # immediately to the right of current hexagram
-            if next_index < SLOT_ROWS * columns:
-                col = next_index % columns
-                row = next_index // columns
-                x = grid_origin_x + col * CELL_W
-                y = grid_origin_y + row * (CELL_H + GRID_ROW_GAP)
-    
-                card_rect = pygame.Rect(
-                    x + CARD_PAD,
-                    y + CARD_PAD,
-                    CELL_W - CARD_PAD * 2,
-                    CELL_H - CARD_PAD * 2
-                )
-    
-                # Card background = button color; border slightly darker
-                bg = lighten(pending_change["color"], 0.75)
-                border = darken(bg, 30)
-    
-                pygame.draw.rect(screen, bg, card_rect, border_radius=CARD_RADIUS)
-                pygame.draw.rect(screen, border, card_rect, CARD_BORDER_W, border_radius=CARD_RADIUS)
-    
-                # --- 4-tier text layout ---
-                txt_color = (0, 0, 0)
-                line_h = font.get_height()
-                BLANK  = line_h  # one extra blank line between elements
-                cursor_y = card_rect.y + 10
-                max_width = card_rect.width - 16
-    
-                # 1) English name WITH symbols, big and centered
-                eng = pending_change.get("name", "")
-                eng_surf = render_surf(font, eng, txt_color)
-                eng_rect = eng_surf.get_rect(centerx=card_rect.centerx, y=cursor_y)
-                screen.blit(eng_surf, eng_rect)
-                cursor_y += eng_surf.get_height()
-    
-                # 2) Pinyin on its own line (centered)
-                pinyin = pending_change.get("pinyin", "")
-                if pinyin:
-                    pin_surf = render_surf(font, pinyin, txt_color)
-                    pin_rect = pin_surf.get_rect(centerx=card_rect.centerx, y=cursor_y)
-                    screen.blit(pin_surf, pin_rect)
-                    cursor_y += pin_surf.get_height() + BLANK + BLANK
-    
-                # 3) Chinese character on its own line (centered)
-                char = pending_change.get("char", "")
-                if char:
-                    if chinese_font:
-                        ch_surf, _ = render_pair(chinese_font, char, txt_color, size=line_h)  # same visual size as text
-                    else:
-                        ch_surf = render_surf(font, char, txt_color)
-                    ch_rect = ch_surf.get_rect(centerx=card_rect.centerx, y=cursor_y)
-                    screen.blit(ch_surf, ch_rect)
-                    cursor_y += (ch_surf.get_height() if hasattr(ch_surf, "get_height") else line_h) + BLANK + BLANK
-    
-                # 4) Description (wrapped, centered)
-                desc = pending_change.get("desc", "") or pending_change.get("description", "")
-                if desc:
-                    max_w = card_rect.width - 20  # you can tighten to -40 if edges feel tight
-                    for line in wrap_multiline(desc, max_w, font):
-                        ln_surf = render_surf(font, line, txt_color)
-                        ln_rect = ln_surf.get_rect(centerx=card_rect.centerx, y=cursor_y)
-                        screen.blit(ln_surf, ln_rect)             # <-- use the rect!
-                        cursor_y = ln_rect.bottom                 # advance by actual rendered height
-    
-        # --- Slots-remaining message in the next empty slot ---
-        if game_started and goal_hexagram and not locked:
-            current_moves = (len(hexagram_chain) - 1) + (1 if pending_change is not None else 0)
-            remaining = max(0, transformation_limit - current_moves)
-    
-            # Next slot index immediately after the current hexagram
-            next_index = len(hexagram_chain) + (1 if pending_change is not None else 0)
-    
-            # Only draw if that slot exists in our 2-row (SLOT_ROWS) grid
-            if next_index < SLOT_ROWS * columns:
-                col = next_index % columns
-                row = next_index // columns
-                x = grid_origin_x + col * CELL_W
-                y = grid_origin_y + row * (CELL_H + GRID_ROW_GAP)
-    
-                slot_rect = pygame.Rect(
-                    x + CARD_PAD,
-                    y + CARD_PAD,
-                    CELL_W - CARD_PAD * 2,
-                    CELL_H - CARD_PAD * 2
-                )
-    
-                # Message text
-                msg = f"You have {remaining} slot{'s' if remaining != 1 else ''} remaining."
-                max_width = slot_rect.width - 16
-    
-                # Choose color: red if last 3 or fewer, else white
-                if remaining <= 3:
-                    msg_color = (240, 162, 164)  # bright red
-                else:
-                    msg_color = (255, 255, 255)  # white
-    
-                # Reuse your wrap helper
-                line1, line2 = wrap_two_lines(msg, max_width, font)
-    
-                # Center the message inside the slot (no fill, just border)
-                total_h = font.get_height() * (2 if line2 else 1)
-                ty = slot_rect.y + (slot_rect.height - total_h) // 2
-    
-                surf1 = render_surf(font, line1, msg_color)
-                rect1 = surf1.get_rect(centerx=slot_rect.centerx, y=ty)
-                screen.blit(surf1, rect1)
-    
-                if line2:
-                    surf2 = render_surf(font, line2, msg_color)
-                    rect2 = surf2.get_rect(centerx=slot_rect.centerx, y=ty + font.get_height())
-                    screen.blit(surf2, rect2)
-    
-        cell_info = []  # collect per-card layout info for arrow drawing
-    
-        # Display hexagram chain
-        # How many chain cards (from the left) should be hidden this frame?
-        win_hide_count = 0
-        merge_start = 0
-        merge_window = False
-        if WIN_SEQ_ACTIVE:
-            total_to_hide = max(0, len(hexagram_chain) - 1)  # hide everything except the last (the winner)
-            elapsed = now - WIN_SEQ_STARTED_AT
-    
-            # pause before the gather starts
-            delay_elapsed = max(0, elapsed - WIN_SEQ_START_DELAY_MS)
-            win_hide_count = min(total_to_hide, delay_elapsed // WIN_SEQ_PER_CARD_MS)
-    
-            # success-only merge window (when the sweep should play)
-            merge_start = WIN_SEQ_STARTED_AT + WIN_SEQ_START_DELAY_MS + total_to_hide * WIN_SEQ_PER_CARD_MS
-            merge_window = (SEQ_OUTCOME == "success" and now >= merge_start and now < merge_start + WIN_SEQ_MERGE_MS)
-        
-        WIN_CARD_RECT = None
-        WIN_CARD_INDEX = -1 
-        
-        START_CARD_RECT = None
-    
-        for i, hx in enumerate(hexagram_chain):
-            # If the win sequence is playing, hide cards [0 .. win_hide_count-1].
-            # The final card (i == len(chain)-1) is the yellow "winner" and should never be hidden.
-            if WIN_SEQ_ACTIVE and i < win_hide_count:
-                continue
-            col = i % columns
-            row = i // columns
-            x = grid_origin_x + col * CELL_W
-            y = grid_origin_y + row * (CELL_H + GRID_ROW_GAP)
-    
-            card_rect = pygame.Rect(
-                x + CARD_PAD,
-                y + CARD_PAD,
-                CELL_W - CARD_PAD * 2,
-                CELL_H - CARD_PAD * 2
-            )
-    
-            # remember the first slot’s rect as the "start"
-            if START_CARD_RECT is None and i == 0:
-                START_CARD_RECT = card_rect.copy()
-    
-            # ... draw the card background, title, lines, etc ...
-    
-            if RESOLVE_FLIP and RESOLVE_FLIP.get("index") == i:
-            # Do not draw this card yet; the flip overlay will cover this slot.
-            # Also skip adding it to cell_info so the between-cards arrow doesn't appear yet.
-                continue
-    
-            # Save for arrows
-            cell_info.append({
-                "rect": card_rect,
-                "row": row,
-                "col": col,
-                "edge_color": hx.get("edge_color"),
-                "edge_short": hx.get("edge_short"),
-            })
-    
-            is_collected    = (hx["binary"] in collected_hexagrams)
-            is_last_card    = (i == len(hexagram_chain) - 1)
-            is_winner       = (goal_hexagram is not None and is_last_card and hx["binary"] == goal_hexagram["binary"])
-            is_failure_last = (round_failed and locked and is_last_card)
-    
-            # Capture the winner’s rect and hide the static winner during the merge window
-            if is_winner:
-                WIN_CARD_RECT = card_rect.copy()
-                WIN_CARD_INDEX = i
-                # Hide the static winner from the end of the gather until the popup is visible
-                hide_static_winner = (
-                    WIN_SEQ_ACTIVE
-                    and SEQ_OUTCOME == "success"
-                    and is_winner and is_last_card
-                    and (now >= merge_start)          # gather finished (covers merge AND linger)
-                    and not POPUP_VISIBLE             # keep hidden until popup actually appears
-                )
-                if hide_static_winner:
-                    continue
-    
-            # Background color
-            is_current = is_last_card
-    
-            if is_failure_last:
-                card_bg = CARD_BG_FAILURE
-            elif is_winner:
-                # current winning card gets the same yellow fill as the goal
-                card_bg = CARD_BG_COLLECTED
-            elif is_current and is_collected:
-                # only the current card keeps yellow if it's a collected hexagram
-                card_bg = CARD_BG_COLLECTED
-            elif is_current:
-                # current but not collected → normal white
-                card_bg = CARD_BG_DEFAULT
-            else:
-                # any earlier card → lightly dimmed
-                card_bg = CHAIN_CARD_BG_DIM
-    
-            # Border color + width
-            if is_failure_last:
-                card_border = CARD_BORDER_FAILURE
-                border_w    = CARD_BORDER_W
-            elif is_winner:
-                card_border = CARD_BORDER_COLLECTED
-                border_w    = CARD_BORDER_W            # normal width for the winner
-            elif is_collected:
-                card_border = CARD_BORDER_COLLECTED    # yellow border for previously collected
-                border_w    = CARD_BORDER_W # thicker rim
-            else:
-                card_border = CARD_BORDER_DEFAULT
-                border_w    = CARD_BORDER_W
-    
-            # Draw
-            pygame.draw.rect(screen, card_bg, card_rect, border_radius=CARD_RADIUS)
-            pygame.draw.rect(screen, card_border, card_rect, border_w, border_radius=CARD_RADIUS)
-    
-            # ---- CONTENT INSIDE THE CARD ----
-            # Title: always reserve THREE lines; hexagram bars start on the 4th row
-            name = hx["name"]["english"]
-            number = hx["number"]
-            full_title = f"{number}: {name}"
-            max_width = card_rect.width - 16
-            t1, t2, t3 = wrap_three_lines(full_title, max_width, font)
-    
-            title_y = card_rect.y + 12
-            line_h  = font.get_height()
-            cur_y   = title_y
-    
-            # render up to 3 lines; still advance cur_y even if the line is empty
-            for t in (t1, t2, t3):
-                if t:
-                    ts = render_surf(font, t, TEXT_COLOR)
-                    tr = ts.get_rect(centerx=card_rect.centerx, y=cur_y)
-                    screen.blit(ts, tr)
-                cur_y += line_h
-    
-            # Start the six “yao” bars on the 4th row (stable across cards)
-            lines_top = title_y + line_h * 3 + 6  # +6 = small breathing room
-    
-            # Hexagram lines — centered within the card
-            title_rows     = 3
-            title_row_h    = font.get_height()
-            top_reserve_px = title_rows * title_row_h
-    
-            draw_hexagram_lines(
-                screen, card_rect, hx["binary"],
-                top_reserve_px=top_reserve_px,
-                spacing_scale=1.10,   # optional: open the vertical rhythm a touch
-                valign=0.0,           # anchor toward top of usable box
-                lead_gap_scale=0.6,   # smaller first gap pulls the stack upward
-                y_offset_px=-2        # tiny nudge upward; tweak -1, -2, -3 to taste
-            )
-    
-            draw_resolve_flip(screen, now)
-    
-            # --- Draw small right-facing arrows between adjacent cards on SAME ROW ---
-            ARROW_CHAR = "►"   # or "➜" / "➤" / "►" if you prefer
-            ARROW_FONT = font  # use your normal font; we can switch to a slightly smaller one if it feels big
-    
-            for k in range(1, len(cell_info)):
-                left  = cell_info[k - 1]
-                right = cell_info[k]
-    
-                # Only draw if same row (keeps visual clean; skip row wraps)
-                if left["row"] != right["row"]:
-                    # Special case: row 0 last col  →  row 1 first col
-                    col_left  = left.get("col",  (left["rect"].left  - grid_origin_x) // CELL_W)
-                    col_right = right.get("col", (right["rect"].left - grid_origin_x) // CELL_W)
-                    if (left["row"] == 0 and right["row"] == 1
-                        and col_left == (columns - 1) and col_right == 0):
-    
-                        arrow_color = right.get("edge_color") or (255, 255, 255)
-    
-                        left_inner_right = left["rect"].right
-                        center_x = left_inner_right + CARD_PAD      # ← same spacing as between cards
-                        center_y = left["rect"].centery
-    
-                        arrow_surf = render_surf(ARROW_FONT, ARROW_CHAR, arrow_color)
-                        screen.blit(arrow_surf, arrow_surf.get_rect(center=(center_x, center_y)))
-                    # Skip normal cross-row drawing
-                    continue
-    
-                # Arrow uses the color that produced the RIGHT card
-                arrow_color = right.get("edge_color") or (255, 255, 255)
-                # arrow_color = (255, 255, 255)
-    
-                # Position: centered between the two cards, vertically centered on the cards
-                gap_left  = left["rect"].right
-                gap_right = right["rect"].left
-                if gap_right <= gap_left:
-                    continue  # no space (shouldn't happen with your layout)
-    
-                center_x = (gap_left + gap_right) // 2
-                center_y = left["rect"].centery
-    
-                arrow_surf = render_surf(ARROW_FONT, ARROW_CHAR, arrow_color)
-                arrow_rect = arrow_surf.get_rect(center=(center_x, center_y))
-                screen.blit(arrow_surf, arrow_rect)
-    
-                # Optional: tiny label under the arrow (commented out to avoid clutter)
-                # lbl = right.get("edge_short")
-                # if lbl:
-                #     lbl_surf = TOOLTIP_FONT.render(lbl, True, arrow_color)
-                #     lbl_rect = lbl_surf.get_rect(center=(center_x, center_y + ARROW_FONT.get_height() // 2 + 2))
-                #     screen.blit(lbl_surf, lbl_rect)
-    
-            # --- Blinking prompt arrow after the CURRENT card (same position as normal arrows) ---
-            if (game_started
-                and not POPUP_VISIBLE
-                and not locked
-                and not WIN_SEQ_ACTIVE
-                and not (deck_popup_visible or help_popup_visible)
-                and len(cell_info) >= 1):
-    
-                left = cell_info[-1]               # last placed card
-                row  = left["row"]
-                col  = left.get("col", None)
-    
-                # Derive next slot in SAME ROW (we never draw cross-row arrows)
-                if col is None:
-                    # if your cell_info doesn't store 'col', compute it from the rect:
-                    col = (left["rect"].left - grid_origin_x) // CELL_W
-    
-                next_col = col + 1
-                if next_col < columns and (len(hexagram_chain) <= transformation_limit):
-                    # Build the next slot's inner rect (no card yet, but we know its geometry)
-                    next_outer = pygame.Rect(
-                        grid_origin_x + next_col * CELL_W,
-                        grid_origin_y + row * (CELL_H + GRID_ROW_GAP),
-                        CELL_W, CELL_H
-                    )
-                    next_inner = next_outer.inflate(-2 * CARD_PAD, -2 * CARD_PAD)
-    
-                    gap_left  = left["rect"].right
-                    gap_right = next_inner.left
-                    if gap_right > gap_left:
-                        center_x = (gap_left + gap_right) // 2
-                        center_y = left["rect"].centery
-    
-                        # Blink alpha (smooth sine)
-                        period = PROMPT_ARROW_PERIOD_MS  # e.g., 900ms
-                        phase  = (pygame.time.get_ticks() % period) / float(period)
-                        alpha  = int(64 + 191 * (0.5 + 0.5 * math.sin(2 * math.pi * phase)))
-    
-                        # Use the SAME glyph/font as your normal arrows
-                        ARROW_CHAR = "►"
-                        ARROW_FONT = font
-    
-                        prompt = render_surf(ARROW_FONT, ARROW_CHAR, (255, 255, 255))
-                        prompt.set_alpha(alpha)
-                        screen.blit(prompt, prompt.get_rect(center=(center_x, center_y)))
-    
-                elif (next_col == columns and row == 0 and len(hexagram_chain) <= transformation_limit):
-                    # Row wrap case: blink just one pad to the right of the last top-row card
-                    left_inner_right = left["rect"].right
-                    center_x = left_inner_right + CARD_PAD          # ← match spacing
-                    center_y = left["rect"].centery
-    
-                    period = PROMPT_ARROW_PERIOD_MS
-                    phase  = (pygame.time.get_ticks() % period) / float(period)
-                    alpha  = int(64 + 191 * (0.5 + 0.5 * math.sin(2 * math.pi * phase)))
-    
-                    prompt = render_surf(ARROW_FONT, "►", (255, 255, 255))
-                    prompt.set_alpha(alpha)
-                    screen.blit(prompt, prompt.get_rect(center=(center_x, center_y)))
-    
-        # Display goal hexagram at far right
-        if goal_hexagram:
-            goal_col = columns - 1
-            gx = grid_origin_x + goal_col * CELL_W
-            gy = grid_origin_y + 1 * (CELL_H + GRID_ROW_GAP)
-    
-            # --- GOAL CARD COLORS (always set these before drawing the goal card) ---
-            goal_is_collected = (SEQ_OUTCOME == "success" and POPUP_VISIBLE)  # ← add POPUP_VISIBLE
-            goal_card_bg     = CARD_BG_COLLECTED  if goal_is_collected else CARD_BG_DEFAULT
-            goal_card_border = CARD_BORDER_COLLECTED if goal_is_collected else CARD_BORDER_DEFAULT
-    
-            goal_card_rect = pygame.Rect(
-                gx + CARD_PAD,
-                gy + CARD_PAD,
-                CELL_W - CARD_PAD * 2,
-                CELL_H - CARD_PAD * 2
-            )
-    
-            if GOAL2START:
-                if GOAL2START.get("start_rect") is None:
-                    GOAL2START["start_rect"] = goal_card_rect.copy()
-                if GOAL2START.get("end_rect") is None:
-                    GOAL2START["end_rect"] = get_chain_card_rect_at(0)
-    
-            goal_is_collected = goal_hexagram["binary"] in collected_hexagrams
-            goal_is_yellow = (goal_revealed or goal_is_collected)
-    
-            if round_failed and locked:
-                goal_card_bg = CARD_BG_FAILURE
-                goal_card_border = CARD_BORDER_FAILURE
-            else:
-                goal_card_bg = CARD_BG_COLLECTED if goal_is_yellow else CARD_BG_DEFAULT
-                goal_card_border = CARD_BORDER_COLLECTED if goal_is_yellow else CARD_BORDER_DEFAULT
-    
-            # DRAW THE GOAL CARD BACKGROUND + BORDER
-            # DRAW THE GOAL CARD BACKGROUND + BORDER
-            suppress_goal_draw = (GOAL2START is not None)   # ← ONLY hide during the coins swoosh
-    
-            if not suppress_goal_draw:
-                pygame.draw.rect(screen, goal_card_bg, goal_card_rect, border_radius=CARD_RADIUS)
-                pygame.draw.rect(screen, goal_card_border, goal_card_rect, CARD_BORDER_W, border_radius=CARD_RADIUS)
-    
-            # Title & lines INSIDE the goal card, centered
-            gname = f"{goal_hexagram['number']}: {goal_hexagram['name']['english']}"
-            max_width = goal_card_rect.width - 16
-            t1, t2, t3 = wrap_three_lines(gname, max_width, font)
-    
-            title_y = goal_card_rect.y + 12
-            line_h  = font.get_height()
-            cur_y   = title_y
-    
-            for t in (t1, t2, t3):
-                if t:
-                    ts = render_surf(font, t, TEXT_COLOR)
-                    tr = ts.get_rect(centerx=goal_card_rect.centerx, y=cur_y)
-                    screen.blit(ts, tr)
-                cur_y += line_h
-    
-            lines_top = title_y + line_h * 3 + 6  # start “yao” bars below the reserved title rows
-    
-            title_rows     = 3
-            title_row_h    = font.get_height()
-            top_reserve_px = title_rows * title_row_h
-    
-            draw_hexagram_lines(
-                screen, goal_card_rect, goal_hexagram["binary"],
-                top_reserve_px=top_reserve_px,
-                spacing_scale=1.10,   # optional: open the vertical rhythm a touch
-                valign=0.0,           # anchor toward top of usable box
-                lead_gap_scale=0.6,   # smaller first gap pulls the stack upward
-                y_offset_px=-2        # tiny nudge upward; tweak -1, -2, -3 to taste
-            )
-    
-            # Check win condition and kick off win sequence once
-            if goal_hexagram and hexagram_chain and hexagram_chain[-1]["binary"] == goal_hexagram["binary"]:
-                # first time we notice the win this round
-                if not WIN_SEQ_ACTIVE:
-                    locked = True
-                    WIN_SEQ_ACTIVE     = True
-                    WIN_SEQ_STARTED_AT = now             # or pygame.time.get_ticks()
-                    SEQ_OUTCOME        = "success"
-    
-                    # (optional) mark collected once
-                    if goal_hexagram["binary"] not in collected_hexagrams:
-                        collected_hexagrams.add(goal_hexagram["binary"])
-                        hexagrams_collected += 1
-                        if 'hexagrams_collected' in globals():
-                            hexagrams_collected = len(collected_hexagrams)
-    
-                        if ENDGAME_TEST_ARMED and len(collected_hexagrams) >= 64:
-                            ENDGAME_TEST_ARMED = False
-                            debug_print("[DEV] End-game test completed -> DISARMED")
-    
-                    # --- accumulate totals ONCE ---
-                    current_moves = len(hexagram_chain) - 1
-                    optimal = shortest_path_length if shortest_path_length is not None else current_moves
-    
-                    base = max(1, optimal * 2 - current_moves)
-                    LAST_ROUND_INSIGHT = base
-    
-                    RUN_TOTAL_MOVES   += current_moves
-                    RUN_TOTAL_OPTIMAL += optimal
-    
-                    RUN_HINTS_USED |= LAST_ROUND_USED_HINTS
-                    HINTS_ENABLED = False
-                
-                locked = True
-    
-        # --- Side labels: START (left of start slot), GOAL (right of goal slot) ---
-    
-        # Derive the START outer slot rect:
-        if 'START_CARD_RECT' in globals() and START_CARD_RECT:
-            # inflate inner card rect back to the slot box (outside the border)
-            start_outer = START_CARD_RECT.inflate(2 * CARD_PAD, 2 * CARD_PAD)
-        else:
-            # Fallback: column 0, row 0 (the chain row)
-            sx = grid_origin_x + 0 * CELL_W
-            sy = grid_origin_y + 0 * (CELL_H + GRID_ROW_GAP)   # ⬅️ row 0
-            start_outer = pygame.Rect(sx, sy, CELL_W, CELL_H)
-    
-        # Derive the GOAL outer slot rect (rightmost column, row 1 as you place goal)
-        gx = grid_origin_x + (columns - 1) * CELL_W
-        gy = grid_origin_y + 1 * (CELL_H + GRID_ROW_GAP)
-        goal_outer = pygame.Rect(gx, gy, CELL_W, CELL_H)
-    
-        # Paint the labels just outside the slot borders
-        draw_side_label(screen, "START", font, start_outer, side="left",  pad=8, ccw=True,  color=(230,230,230))
-        draw_side_label(screen, "GOAL",  font, goal_outer,  side="right", pad=8, ccw=False, color=(230,230,230))
-        
-        # --- OPTIMAL marker ---
-        optimal_broken = False
-
-        if game_started and goal_hexagram and ROUND_OPTIMAL_DIST is not None and not POPUP_VISIBLE:
-
-            moves_so_far = len(hexagram_chain) - 1
-
-            optimal_still_possible = (
-                LIVE_POSSIBLE_DIST is not None
-                and moves_so_far + LIVE_POSSIBLE_DIST == ROUND_OPTIMAL_DIST
-            )
-
-            optimal_broken = not optimal_still_possible
-
-            opt_index = ROUND_OPTIMAL_DIST
-            total_slots = SLOT_ROWS * columns
-
-            if 0 <= opt_index < total_slots:
-                col = opt_index % columns
-                row = opt_index // columns
-
-                # Determine OPTIMAL color/state
-                made_optimal = (
-                    SEQ_OUTCOME == "success"
-                    and moves_so_far == ROUND_OPTIMAL_DIST
-                )
-
-                if made_optimal:
-                    opt_color = (255, 255, 0)          # yellow
-                elif optimal_broken:
-                    opt_color = (235, 120, 120)        # red
-                else:
-                    opt_color = (255, 255, 255)        # white
-
-                # Slot rect
-                opt_x = grid_origin_x + col * CELL_W
-                opt_y = grid_origin_y + row * (CELL_H + GRID_ROW_GAP)
-                slot_outer = pygame.Rect(opt_x, opt_y, CELL_W, CELL_H)
-
-                # Render label
-                tag = render_surf(font, "↓ OPTIMAL ↓", opt_color)
-                tag_rect = tag.get_rect(
-                    midbottom=(slot_outer.centerx, slot_outer.top - OPT_LABEL_GAP)
-                )
-
-                if tag_rect.top < 0:
-                    tag_rect.top = 0
-
-                screen.blit(tag, tag_rect)
-
-                # Strikethrough immediately once optimal is broken
-                if optimal_broken and not made_optimal:
-                    y = tag_rect.centery
-                    pad = 4
-                    pygame.draw.line(
-                        screen,
-                        opt_color,
-                        (tag_rect.left - pad, y),
-                        (tag_rect.right + pad, y),
-                        1
-                    )
-
-
-    
-        # --- POSSIBLE / NOT POSSIBLE marker ---
-        if game_started and goal_hexagram and not POPUP_VISIBLE and optimal_broken:
-
-            moves_so_far = len(hexagram_chain) - 1
-            remaining = max(0, transformation_limit - moves_so_far)
-            dist = LIVE_POSSIBLE_DIST
-
-            impossible = (dist is None) or (dist > remaining)
-
-            if impossible:
-                poss_text  = "↓ NOT POSSIBLE ↓"
-                poss_color = (235, 120, 120)  # red
-                target_index = transformation_limit
-            else:
-                poss_text  = "↓ POSSIBLE ↓"
-                poss_color = (230, 230, 230)
-                target_index = moves_so_far + dist
-
-                # Achieved goal → yellow
-                if SEQ_OUTCOME == "success" and dist == 0:
-                    poss_color = (255, 255, 0)
-
-            total_slots = SLOT_ROWS * columns
-            if 0 <= target_index < total_slots:
-
-                col = target_index % columns
-                row = target_index // columns
-                sx = grid_origin_x + col * CELL_W
-                sy = grid_origin_y + row * (CELL_H + GRID_ROW_GAP)
-                slot_outer = pygame.Rect(sx, sy, CELL_W, CELL_H)
-
-                tag_surf = render_surf(font, poss_text, poss_color)
-                tag_rect = tag_surf.get_rect(
-                    midbottom=(slot_outer.centerx, slot_outer.top - OPT_LABEL_GAP)
-                )
-
-                # Clamp
-                WIDTH, HEIGHT = screen.get_size()
-                if tag_rect.top < 0: tag_rect.top = 0
-                if tag_rect.right > WIDTH - 2: tag_rect.right = WIDTH - 2
-                if tag_rect.left < 2: tag_rect.left = 2
-
-                screen.blit(tag_surf, tag_rect)
-
-    
-        # Safety: if we filled the last slot and it's not the goal, mark failure
-        if (
-            not WIN_SEQ_ACTIVE
-            and goal_hexagram
-            and len(hexagram_chain) > 0
-        ):
-            current_moves = len(hexagram_chain) - 1
-            if (
-                current_moves >= transformation_limit
-                and hexagram_chain[-1]["binary"] != goal_hexagram["binary"]
-            ):
-                locked = True
-                round_failed = True
-    
-        # Failure sequence: include this round in cumulative totals (no awards yet)
-        if round_failed and locked and not WIN_SEQ_ACTIVE:
-            SEQ_OUTCOME = "failure"
-            WIN_SEQ_ACTIVE = True
-            WIN_SEQ_STARTED_AT = pygame.time.get_ticks()
-    
-            current_moves = len(hexagram_chain) - 1
-            optimal = ROUND_OPTIMAL_DIST if ROUND_OPTIMAL_DIST is not None else current_moves
-    
-            base = max(1, optimal * 2 - current_moves)
-            LAST_ROUND_INSIGHT = base
-    
-            RUN_TOTAL_MOVES   += current_moves
-            RUN_TOTAL_OPTIMAL += optimal
-            RUN_HINTS_USED    |= LAST_ROUND_USED_HINTS
-            HINTS_ENABLED      = False
-    
-        # Draw hover preview box if applicable
-        if hover_preview:
-            rect, hx, box_color, idx = hover_preview
-            box_width = rect.width
-            box_height = 140
-            box_x = rect.centerx - box_width // 2
-            box_y = rect.top - box_height - 5  # 5px padding above button
-            current_hx = hexagram_chain[-1]["binary"]
-    
-            # Rounded, lighter background; no border
-            box_bg = lighten(box_color, 0.75)
-            pygame.draw.rect(screen, box_bg, (box_x, box_y, box_width, box_height), border_radius=10)
-    
-            # --- Hexagram previews (bars) ---
-            pad = 4
-            col_gap = 6
-    
-            arrow_surf = render_surf(font, "→", (0, 0, 0))
-            arrow_w = arrow_surf.get_width()
-            arrow_h = arrow_surf.get_height()
-    
-            available_w = box_width - 2*pad - arrow_w - 2*col_gap
-            preview_w   = max(42, available_w // 2)         # a touch wider than before
-            preview_h   = box_height - 2*pad
-    
-            left_rect  = pygame.Rect(box_x + pad,                        box_y + pad, preview_w, preview_h)
-            right_rect = pygame.Rect(box_x + box_width - pad - preview_w, box_y + pad, preview_w, preview_h)
-    
-            # arrow centered between previews
-            arrow_x = (left_rect.right + right_rect.left - arrow_w) // 2
-            arrow_y = box_y + (box_height - arrow_h) // 2 + 1
-    
-            # thinner bars for small previews
-            line_thick_preview = max(0.5, int(preview_h / 40))  # ~3–4 px typically
-    
-            # Draw the two hexagrams with tighter horizontal padding and a small fixed yin gap
-            draw_hexagram_lines(
-                screen, left_rect, current_hx,
-                line_thick=line_thick_preview,
-                yin_gap_px=6,               # <- small fixed gap => longer segments
-                inner_pad_x=4, inner_pad_y=6,
-                spacing_scale=1.2,
-                valign=0.0,
-                lead_gap_scale=0.7
-            )
-    
-            draw_hexagram_lines(
-                screen, right_rect, hx["binary"],
-                line_thick=line_thick_preview,
-                yin_gap_px=6,
-                inner_pad_x=4, inner_pad_y=6,
-                spacing_scale=1.2,
-                valign=0.0,
-                lead_gap_scale=0.7
-            )
-    
-            # Draw arrow last
-            screen.blit(arrow_surf, (arrow_x, arrow_y))
-    
-            # --- description tooltip that visually extends the button (centered, smaller font) ---
-            t = TRANSFORMATIONS[idx]
-            tip_w = rect.width
-            tip_pad_x = 8
-            tip_pad_y = 6
-            wrap_font = TOOLTIP_FONT  # use the smaller font for wrapping & rendering
-    
-            # Wrap description to button width minus padding
-            desc = t["desc"]
-            words = desc.split()
-            lines = []
-            cur = ""
-            max_text_w = tip_w - tip_pad_x * 2
-            while words:
-                nxt = (cur + " " + words[0]).strip()
-                if wrap_font.size(nxt)[0] <= max_text_w:
-                    cur = nxt
-                    words.pop(0)
-                else:
-                    if cur:
-                        lines.append(cur)
-                        cur = ""
-                    else:
-                        # emergency hard clip for one ultra-long token
-                        token = words.pop(0)
-                        while token and wrap_font.size(token)[0] > max_text_w:
-                            token = token[:-1]
-                        if token:
-                            lines.append(token)
-            if cur:
-                lines.append(cur)
-    
-            # Optionally cap lines to avoid super tall tooltips (adds ellipsis)
-            MAX_LINES = 3
-            if len(lines) > MAX_LINES:
-                lines = lines[:MAX_LINES]
-                # add ellipsis to last line, clipping until it fits
-                ell = "…"
-                while wrap_font.size(lines[-1] + ell)[0] > max_text_w and len(lines[-1]) > 1:
-                    lines[-1] = lines[-1][:-1]
-                lines[-1] += ell
-    
-            tip_h = tip_pad_y * 2 + len(lines) * wrap_font.get_height()
-    
-            # Place tooltip so it overlaps the button — looks like a single block
-            OVERLAP = 18
-            tip_x = rect.x
-            tip_y = rect.bottom - OVERLAP
-    
-            # Clamp bottom in case of very small windows
-            if tip_y + tip_h > HEIGHT - 4:
-                tip_y = max(4, HEIGHT - 4 - tip_h)
-    
-            tip_bg = lighten(t["color"], 0.75)
-            tip_rect = pygame.Rect(tip_x, tip_y, tip_w, tip_h)
-    
-            pygame.draw.rect(screen, tip_bg, tip_rect, border_radius=10)
-    
-            # Center each line horizontally within the tooltip
-            y = tip_rect.y + tip_pad_y
-            for ln in lines:
-                s = render_surf(wrap_font, ln, (0, 0, 0))
-                sr = s.get_rect(centerx=tip_rect.centerx, y=y)
-                screen.blit(s, sr)
-                y += wrap_font.get_height()
-    
-        # --- SUCCESS FLOW (keep ONE copy of this; remove older variants) ---
-        if WIN_SEQ_ACTIVE and goal_hexagram and hexagram_chain:
-            total_to_hide   = max(0, len(hexagram_chain) - 1)  # hide all but the last card (the winner)
-            seq_start_time  = WIN_SEQ_STARTED_AT + WIN_SEQ_START_DELAY_MS
-            seq_end_time    = seq_start_time + total_to_hide * WIN_SEQ_PER_CARD_MS
-            merge_end_time  = seq_end_time + WIN_SEQ_MERGE_MS
-    
-            now = pygame.time.get_ticks()
-    
-            if SEQ_OUTCOME == "success" and WIN_CARD_RECT:
-                if seq_end_time <= now < merge_end_time:
-                    # MERGE SWEEP (draw moving highlight; do NOT draw popup yet)
-                    MERGE_ACTIVE = True
-                    t = (now - seq_end_time) / float(WIN_SEQ_MERGE_MS)  # 0→1
-                    t_eased = 1.0 - (1.0 - t) * (1.0 - t)               # easeOutQuad
-    
-                    moving = WIN_CARD_RECT.copy()
-                    cx = WIN_CARD_RECT.centerx + t_eased * (goal_card_rect.centerx - WIN_CARD_RECT.centerx)
-                    cy = WIN_CARD_RECT.centery + t_eased * (goal_card_rect.centery - WIN_CARD_RECT.centery)
-                    moving.center = (cx, cy)
-    
-                    pygame.draw.rect(screen, (255, 255, 140), moving, 5, border_radius=CARD_RADIUS)
-                    pygame.draw.rect(screen, (255, 255, 140), moving.inflate(10, 10), 2, border_radius=CARD_RADIUS)
-                else:
-                    MERGE_ACTIVE = False
-                    # after merge + linger, show the popup
-                    if now >= merge_end_time + WIN_SEQ_LINGER_MS and not POPUP_VISIBLE:
-                        finalize_round_awards()          # ← add this line
-                        POPUP_VISIBLE = True
-    
-                        # Kick off "goal → deck" swoosh once, right as the popup appears
-                        if SEQ_OUTCOME == "success" and ADD2DECK is None:
-                            start_rect = goal_card_rect.copy()
-    
-                            # end at a small rectangle inside the deck icon
-                            end_rect = deck_icon_rect.inflate(-deck_icon_rect.width // 2,
-                                                            -deck_icon_rect.height // 2)
-                            if end_rect.width < 10 or end_rect.height < 10:
-                                end_rect = deck_icon_rect.inflate(-deck_icon_rect.width // 3,
-                                                                -deck_icon_rect.height // 3)
-                            end_rect.center = deck_icon_rect.center
-    
-                            ADD2DECK = {
-                                "started_at": now,
-                                "start_rect": start_rect,
-                                "end_rect":   end_rect,
-                            }
-                            # optional: if you’re using it
-                            # ADD2DECK_DONE = False
-                        
-            else:
-                # failure path (or no WIN_CARD_RECT): show popup after gather + linger (no merge)
-                if now >= seq_end_time + WIN_SEQ_LINGER_MS and not POPUP_VISIBLE and SEQ_OUTCOME == "failure":
-                    POPUP_VISIBLE = True
-                    finalize_round_awards()   # <- award once here
-    
-        # --- POPUPS / DIMMER / MODALS (single consolidated block) ---
-    
-        # (Tip) compute once per frame so all animations use the same timestamp
-        now = pygame.time.get_ticks()
-    
-        if deck_popup_visible or help_popup_visible:
-            # 0) If the judgment popup is up, draw it FIRST so it sits UNDER the dimmer
-            if POPUP_VISIBLE and goal_hexagram:
-                draw_judgement_popup(
-                    screen, font, chinese_font,
-                    goal_hexagram, WIDTH, HEIGHT,
-                    grid_bounds, goal_card_rect,
-                    CARD_RADIUS,
-                    outcome=SEQ_OUTCOME
-                )
-    
-            # 2) Draw the goal→deck swoosh UNDER the dimmer as well (so it gets darkened)
-            draw_add2deck_swoosh(screen, now)
-    
-            # 6) Full-screen dim (darkens board + popup + swoosh)
-            draw_modal_dim(screen, alpha=190)  # tweak 170–200 to taste
-    
-            # 7) Top-most UI for the Deck/Help modal
-            draw_toolbar_icons(screen)
-            if hover_text and hover_rect:
-                draw_tooltip(screen, hover_text, hover_rect, font, prefer_above=True)
-    
-            # 8) (Wherever you currently draw the Deck/Help popup contents) — keep those here, ABOVE the dimmer
-            # draw_deck_popup(...) / draw_help_popup(...)
-    
-        else:
-            # No other modal → draw the judgment popup normally on top of the board
-            if POPUP_VISIBLE and goal_hexagram:
-                draw_judgement_popup(
-                    screen, font, chinese_font,
-                    goal_hexagram, WIDTH, HEIGHT,
-                    grid_bounds, goal_card_rect,
-                    CARD_RADIUS,
-                    outcome=SEQ_OUTCOME
-                )
-            # Then draw the swoosh on top of the popup
-            draw_add2deck_swoosh(screen, now)
-            await draw_goal2start_swoosh(screen, now)
-    
-    
-        # --- Deck popup state ---
-        # Arrow button rectangles (top-right corner inside popup)
-        popup_width = 580
-        popup_height = 510
-        popup_x = (WIDTH - popup_width) // 2
-        popup_y = 38
-        arrow_up_rect = pygame.Rect(popup_x + popup_width - 30, popup_y + 10, 20, 20)
-        arrow_down_rect = pygame.Rect(popup_x + popup_width - 30, popup_y + 35, 20, 20)
-    
-        # --- Deck popup rendering ---
-        if deck_popup_visible:
-            popup_rect = pygame.Rect(popup_x, popup_y, popup_width, popup_height)
-            DECK_POPUP_RECT = popup_rect  # <-- set global hit area
-    
-            pygame.draw.rect(screen, (40, 40, 40), DECK_POPUP_RECT)
-            pygame.draw.rect(screen, (255, 255, 255), DECK_POPUP_RECT, 2)
-    
-            # Title and count
-            title = render_surf(font, "HEXADECK", (255, 255, 255))
-            screen.blit(title, (popup_x + popup_width // 2 - title.get_width() // 2, popup_y + 10))
-    
-            count_text = render_surf(font, f"{hexagrams_collected} of 64 collected", (255, 255, 255))
-            screen.blit(count_text, (popup_x + popup_width // 2 - count_text.get_width() // 2, popup_y + 30))
-    
-            # Arrow buttons
-            pygame.draw.rect(screen, (200, 200, 200), arrow_up_rect)
-            pygame.draw.rect(screen, (200, 200, 200), arrow_down_rect)
-            up_arrow = render_surf(font, "▲", (0, 0, 0))
-            down_arrow = render_surf(font, "▼", (0, 0, 0))
-            screen.blit(up_arrow, (arrow_up_rect.centerx - up_arrow.get_width() // 2, arrow_up_rect.centery - up_arrow.get_height() // 2))
-            screen.blit(down_arrow, (arrow_down_rect.centerx - down_arrow.get_width() // 2, arrow_down_rect.centery - down_arrow.get_height() // 2))
-    
-            # Deck grid
-            margin_x = 20
-            margin_y = 60
-            gap_x = 135
-            gap_y = 45
-    
-            sorted_hexes = sorted(HEXAGRAM_DATA.items(), key=lambda x: x[1]["number"])
-            if deck_page == 0:
-                visible_hexes = sorted_hexes[:40]
-            else:
-                visible_hexes = sorted_hexes[40:]
-    
-            for i, (binary, data) in enumerate(visible_hexes):
-                row = i // 4
-                col = i % 4
-                x = popup_x + margin_x + col * gap_x
-                y = popup_y + margin_y + row * gap_y
-    
-                color = (255, 255, 0) if binary in collected_hexagrams else (255, 255, 255)
-    
-                symbol = data["unicode"]
-
-                # width/height without assuming freetype:
-                w, h = text_size(hexagram_font, symbol)          # or text_size(hexagram_font, symbol, size=line_h)
-                symbol_rect = pygame.Rect(x, y, w, h)
-
-                # render at the same topleft:
-                draw_text_to(hexagram_font, screen, symbol_rect.topleft, symbol, color)  # add size=... if you used one
-    
-                number = str(data["number"])
-                name = data["name"]["english"]
-                info_text = f"{number} {name}"
-                max_width = 100
-                while font.size(info_text)[0] > max_width and len(name) > 1:
-                    name = name[:-1]
-                    info_text = f"{number} {name}"
-                info_surf = render_surf(font, info_text, color)
-    
-                screen.blit(info_surf, (x + symbol_rect.width + 5, y))
-    
-        else:
-            DECK_POPUP_RECT = None  # <-- clear when not visible    
-    
-        # Draw help popup if visible
-        if help_popup_visible:
-            popup_width = 580
-            popup_height = 510  # Increased height to accommodate all lines
-            popup_x = (WIDTH - popup_width) // 2
-            popup_y = 38  # Top-aligned to avoid covering Coins + messages
-    
-            HELP_POPUP_RECT = pygame.Rect(popup_x, popup_y, popup_width, popup_height)  # <-- set global
-    
-            pygame.draw.rect(screen, (40, 40, 40), HELP_POPUP_RECT)
-            pygame.draw.rect(screen, (255, 255, 255), HELP_POPUP_RECT, 2)
-    
-            help_text_lines = [
-                "HOW TO PLAY",
-                "Turn the Start hexagram into the Goal hexagram using Change Cards.",
-                "You have 10 change slots per round. OPTIMAL is the shortest change-path.",
-                "POSSIBLE means you still have a chance. After a successful round, the Goal",
-                "hexagram will be added to your Hexadeck, and you will be awarded Insight",
-                "Points (IP) based on how well you did.",
-                "You can use IP to buy Hints or Change Cards. Hints tell you which Change",
-                "Card to play next from your available deck, but they reduce the IP you earn.",
-                "Change Cards cost more, but they allow for better and shorter change-paths.",
-                "Use Coins to advance rounds. The game is over when you either fail to reach",
-                "the Goal or when you've filled out your Hexadeck with all 64 hexagrams.",
-                "",
-                "HOW TO READ A HEXAGRAM",
-                "A hexagram is a series of six lines, generated randomly by coin flip. Each",
-                "line is either broken (yin) or unbroken (yang). The lines are numbered from",
-                "bottom to top.",
-                "                                                    6 ----- yang",
-                "                                                    5 -- -- yin",
-                "                                                    4 ----- yang",
-                "                                                    3 -- -- yin",
-                "                                                    2 ----- yang",
-                "                                                    1 ----- yang",
-                "Lines 1-3 are the Lower (▼) trigram. Lines 4-6 are the Upper (▲) trigram.",
-                "Some Change Cards act on all lines (purple). Others act only on ▼ (green)",
-                "or ▲ (blue). Hover over the Change Cards to see what they do."
-            ]
-    
-            HEADINGS = {"HOW TO PLAY", "HOW TO READ A HEXAGRAM"}
-    
-            line_y = popup_y + 10
-            left_x = popup_x + 50
-            LINE_STEP = 19  # keep your original spacing
-    
-            for line in help_text_lines:
-                is_heading = line in HEADINGS
-    
-    
-                surf = render_surf(font, line, (255, 255, 255))
-    
-                if is_heading:
-                    # center horizontally in the popup; keep same y position
-                    rect = surf.get_rect(centerx=HELP_POPUP_RECT.centerx, y=line_y)
-                else:
-                    # left-aligned like before
-                    rect = surf.get_rect(topleft=(left_x, line_y))
-    
-                screen.blit(surf, rect)
-                line_y += LINE_STEP
-    
-        if hover_text and hover_rect:
-            draw_tooltip(screen, hover_text, hover_rect, font, prefer_above=True)
+        PROF.lap("events")
+        POOL.begin_frame()
+        # Draw the frame: over the whole screen, or once per clip over what changed
+        full = (any(event.type != pygame.MOUSEMOTION for event in events) or (mode == IDLE and not events)
+                or pending_change is not None or (WIN_SEQ_ACTIVE and not POPUP_VISIBLE) or animation_ending())
+        for clip in DIRTY.begin(scene_key(), full=full, damaged=hover_damage()):
+            screen.set_clip(clip)
+            POOL.rewind()
+            draw_frame()
         
-        pygame.display.flip()    
-        await asyncio.sleep(0)
+        DIRTY.present(screen, scene_key())
+        PROF.lap("flip")
+        PROF.end_frame()
+        mode = frame_mode()
 
     try:
         import sys
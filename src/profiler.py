@@ -0,0 +1,115 @@
+"""Frame-time profiler: per-section timings of run_game in a ring buffer, shown as an overlay or dumped to CSV."""
+import csv
+import time
+from collections import deque
+
+import pygame
+
+OVERLAY_BG = (0, 0, 0)
+OVERLAY_FG = (230, 230, 230)
+OVERLAY_HEAD = (255, 255, 140)
+OVERLAY_PAD = 6
+OVERLAY_NAME_W = 64     # section name column
+OVERLAY_COL_W = 52      # each of p50 / p95 / max
+OVERLAY_REFRESH = 15    # frames between redraws of the table (it is blitted as is in between)
+
+def percentile(values, p):
+    """Nearest-rank percentile of sorted values."""
+    return values[min(len(values) - 1, int(len(values) * p / 100))]
+
+class FrameProfiler:
+    """
+    Times the named sections of a frame, given up front in draw order.
+    begin_frame() starts the clock, lap(name) charges the time since the
+    previous lap to that section, end_frame() pushes the frame (ms per
+    section) into a ring buffer of the last `size` frames. While disabled,
+    begin_frame() doesn't start a frame and every lap returns at once.
+
+    stats() gives p50/p95/max per section over the buffer, draw() shows
+    them in a corner of the screen and dump_csv() writes one row per frame.
+    """
+
+    def __init__(self, sections, size=600, enabled=False):
+        self.sections = tuple(sections)
+        self.index = {name: i for i, name in enumerate(self.sections)}
+        self.frames = deque(maxlen=size)   # (frame number, [ms per section])
+        self.enabled = enabled
+        self.count = 0      # frames recorded so far
+        self.row = None     # the frame being timed
+        self.last = 0.0
+        self.overlay = None          # the rendered table
+        self.overlay_at = None       # ... as of this frame count
+
+    def toggle(self):
+        self.enabled = not self.enabled
+        self.row = None
+        return self.enabled
+
+    def begin_frame(self):
+        if self.enabled:
+            self.row = [0.0] * len(self.sections)
+            self.last = time.perf_counter()
+
+    def lap(self, name):
+        if self.row is None:
+            return
+        now = time.perf_counter()
+        self.row[self.index[name]] += (now - self.last) * 1000.0
+        self.last = now
+
+    def end_frame(self):
+        if self.row is None:
+            return
+        self.frames.append((self.count, self.row))
+        self.count += 1
+        self.row = None
+
+    def stats(self):
+        """[(section, p50, p95, max)] in ms, sections then the whole frame; [] before the first frame."""
+        if not self.frames:
+            return []
+        rows = [row for _, row in self.frames]
+        columns = list(zip(*rows)) + [[sum(row) for row in rows]]
+        out = []
+        for name, values in zip(self.sections + ("frame",), columns):
+            values = sorted(values)
+            out.append((name, percentile(values, 50), percentile(values, 95), values[-1]))
+        return out
+
+    def render_table(self, render):
+        """The stats table on an opaque box; render(text, color) -> Surface."""
+        line_h = render("p50", OVERLAY_HEAD).get_height()
+        lines = [(f"{len(self.frames)} frames", "p50", "p95", "max")]
+        lines += [(name, f"{p50:.2f}", f"{p95:.2f}", f"{mx:.2f}") for name, p50, p95, mx in self.stats()]
+
+        table = pygame.Surface((2 * OVERLAY_PAD + OVERLAY_NAME_W + 3 * OVERLAY_COL_W,
+                                2 * OVERLAY_PAD + len(lines) * line_h))
+        table.fill(OVERLAY_BG)
+        y = OVERLAY_PAD
+        for i, cells in enumerate(lines):
+            color = OVERLAY_HEAD if i == 0 or cells[0] == "frame" else OVERLAY_FG
+            table.blit(render(cells[0], color), (OVERLAY_PAD, y))
+            right = OVERLAY_PAD + OVERLAY_NAME_W
+            for cell in cells[1:]:
+                right += OVERLAY_COL_W
+                text = render(cell, color)
+                table.blit(text, (right - text.get_width(), y))
+            y += line_h
+        return table
+
+    def draw(self, surface, render, topleft=(8, 8)):
+        """Blit the table (redrawn every OVERLAY_REFRESH frames); its rect, or None before the first frame."""
+        if not self.frames:
+            return None
+        if self.overlay is None or self.count - self.overlay_at >= OVERLAY_REFRESH:
+            self.overlay = self.render_table(render)
+            self.overlay_at = self.count
+        return surface.blit(self.overlay, topleft)
+
+    def dump_csv(self, path):
+        """Write the buffered frames (frame number, ms per section, total) to path."""
+        with open(path, "w", newline="") as f:
+            out = csv.writer(f)
+            out.writerow(("frame",) + self.sections + ("total",))
+            for n, row in self.frames:
+                out.writerow([n] + [f"{ms:.3f}" for ms in row] + [f"{sum(row):.3f}"])
@@ -0,0 +1,85 @@
+"""Run logs: the seed, then one byte per action; replayed headless at full speed."""
+import struct
+
+from engine import fingerprint
+from gamestate import GameState
+
+REPLAY_MAGIC = b"HXRP"
+REPLAY_VERSION = 1
+REPLAY_HEADER = struct.Struct("<4sBQ4s")   # magic, version, run seed, transform table tag (17 bytes)
+
+# Action bytes: high nibble is the kind, low nibble the transform index
+PLAY  = 0x00   # PLAY | idx
+BUY   = 0x10   # BUY | idx
+HINT  = 0x20
+COINS = 0x30   # deal the next round (the first one opens the run)
+
+class ReplayError(ValueError):
+    """Log is malformed, or an action in it is not legal when replayed."""
+
+def table_tag(transitions):
+    """Short fingerprint so a log isn't replayed against different transforms."""
+    return fingerprint(transitions)[:4]
+
+class ReplayWriter:
+    """Appends one run's actions to path as they happen (unbuffered)."""
+
+    def __init__(self, path, seed, transitions):
+        self.path = path
+        self.file = open(path, "wb", buffering=0)
+        self.file.write(REPLAY_HEADER.pack(REPLAY_MAGIC, REPLAY_VERSION, seed, table_tag(transitions)))
+
+    def record(self, action):
+        self.file.write(bytes((action,)))
+
+    def close(self):
+        self.file.close()
+
+def _coins(state, seed):
+    """Same as the Coins button: first toss of the run, or the next round from the last goal."""
+    if state.goal is None:
+        return state.toss(full_reset=True, seed=seed)
+    if state.outcome != "success" or state.deck_complete:
+        return False   # failure / full deck starts a new run, i.e. a new log
+    state.end_round()
+    return state.toss(start=state.goal)
+
+def replay(data, solver, **rules):
+    """
+    Re-run a log (bytes) with no animation or timing; rules are GameState knobs.
+    Returns the final GameState, awarded as if its last popup had been shown.
+    Raises ReplayError on a bad header or an illegal action.
+    """
+    if len(data) < REPLAY_HEADER.size:
+        raise ReplayError("truncated header")
+    magic, version, seed, tag = REPLAY_HEADER.unpack_from(data)
+    if magic != REPLAY_MAGIC or version != REPLAY_VERSION:
+        raise ReplayError(f"not a v{REPLAY_VERSION} replay log")
+    if tag != table_tag(solver.transitions):
+        raise ReplayError("recorded with different transforms")
+
+    state = GameState(solver, seed, **rules)
+    play, buy, buy_hint = state.play, state.buy, state.buy_hint
+    for pos in range(REPLAY_HEADER.size, len(data)):
+        action = data[pos]
+        kind = action & 0xF0
+        if kind == PLAY:
+            ok = play(action & 0x0F) is not None
+        elif kind == BUY:
+            ok = buy(action & 0x0F)
+        elif action == HINT:
+            ok = buy_hint()
+        elif action == COINS:
+            ok = _coins(state, seed)
+        else:
+            raise ReplayError(f"unknown action 0x{action:02x} at byte {pos}")
+        if not ok:
+            raise ReplayError(f"illegal action 0x{action:02x} at byte {pos}")
+
+    if state.outcome:
+        state.end_round()
+    return state
+
+def replay_file(path, solver, **rules):
+    with open(path, "rb") as f:
+        return replay(f.read(), solver, **rules)
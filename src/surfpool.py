@@ -0,0 +1,69 @@
+"""Reusable surfaces for per-frame drawing, so a steady-state frame allocates none."""
+from collections import OrderedDict
+
+import pygame
+
+class SurfacePool:
+    """
+    scratch(size, flags) hands out a cleared surface that is reused from frame
+    to frame: the n-th request for a (size, flags) in a frame always gets the
+    same one, so several can be in use at once. Call begin_frame() once per
+    frame. cached(key, build) keeps whatever build() returned for as long as
+    the key keeps being asked for (overlays that only change with layout).
+    Entries not used for a while are dropped past limit.
+
+    allocs counts every surface created; frame_allocs those of the frame
+    that just ended (0 once nothing on screen changes size).
+    """
+
+    def __init__(self, limit=64):
+        self.limit = limit
+        self.surfaces = OrderedDict()   # (size, flags, n) / ("cached", key) -> Surface, least recently used first
+        self.used = {}                  # (size, flags) -> scratch surfaces handed out this frame
+        self.allocs = 0
+        self.frame_allocs = 0
+        self._allocs_at_frame = 0
+
+    def clear(self):
+        """Forget every surface (e.g. after the window was resized)."""
+        self.surfaces.clear()
+        self.used.clear()
+
+    def begin_frame(self):
+        self.frame_allocs = self.allocs - self._allocs_at_frame
+        self._allocs_at_frame = self.allocs
+        self.used.clear()
+
+    def rewind(self):
+        """Hand this frame's scratch surfaces out again from the first (another pass over the frame)."""
+        self.used.clear()
+
+    def _store(self, key, surf):
+        self.surfaces[key] = surf
+        self.allocs += 1
+        if len(self.surfaces) > self.limit:
+            self.surfaces.popitem(last=False)
+        return surf
+
+    def scratch(self, size, flags=pygame.SRCALPHA):
+        """A transparent (black, without SRCALPHA) surface at full opacity, valid until the next frame."""
+        size = tuple(size)
+        n = self.used.get((size, flags), 0)
+        self.used[(size, flags)] = n + 1
+        key = (size, flags, n)
+        surf = self.surfaces.get(key)
+        if surf is None:
+            return self._store(key, pygame.Surface(size, flags))
+        self.surfaces.move_to_end(key)
+        surf.fill((0, 0, 0, 0))
+        surf.set_alpha(255)
+        return surf
+
+    def cached(self, key, build):
+        """build() once per key; the result is shared, don't draw on it."""
+        key = ("cached", key)
+        surf = self.surfaces.get(key)
+        if surf is None:
+            return self._store(key, build())
+        self.surfaces.move_to_end(key)
+        return surf
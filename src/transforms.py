@@ -0,0 +1,153 @@
+"""Change cards: the string transforms and their button/card definitions."""
+
+# Change button/card colors and shades
+PURPLE = (128, 0, 128)      # whole
+GREEN  = (50, 160, 90)      # lower
+BLUE   = (70, 120, 220)     # upper
+
+# --- Transformation Functions ---
+def hu_gua(hexagram6):
+    return hexagram6[1:4] + hexagram6[2:5]
+
+def cuo_gua(hexagram6):
+    return "".join("0" if c == "1" else "1" for c in hexagram6)
+
+def cuo_ba_gua(hexagram6):
+    # Invert only the lower trigram (first 3 bits)
+    inverted_lower = "".join("0" if c == "1" else "1" for c in hexagram6[:3])
+    return inverted_lower + hexagram6[3:]
+
+def zong_gua(hexagram6):
+    return hexagram6[::-1]
+
+def yi_wei_gua(hexagram6):
+    return hexagram6[-1] + hexagram6[:-1]
+
+def jiao_gua(hexagram6):
+    return hexagram6[3:] + hexagram6[:3]
+
+def chong_ba_gua(hexagram6):
+    # Duplicate the lower trigram into the upper trigram
+    lower = hexagram6[:3]
+    return lower + lower
+
+def dui_chen_ba_gua(hexagram6):
+    # Mirror lower trigram (bits 0–2) onto upper (bits 3–5)
+    lower = hexagram6[:3]
+    return lower + lower[::-1]
+
+def zong_ba_gua(hexagram6):
+    # Reverse only the lower trigram (first 3 bits)
+    lower_reversed = hexagram6[:3][::-1]
+    return lower_reversed + hexagram6[3:]
+
+# Friendly names -> existing implementations
+def shift_hexagram(h): return yi_wei_gua(h)        # 位卦
+def flip_hexagram(h): return zong_gua(h)           # 综卦
+def swap_hexagram(h): return jiao_gua(h)           # 交卦
+def unhide_hexagram(h): return hu_gua(h)           # 核卦
+def invert_hexagram(h): return cuo_gua(h)          # 错卦
+
+def invert_lower_trigram(h): return cuo_ba_gua(h)  # 错八卦 (lower)
+def flip_lower_trigram(h):   return zong_ba_gua(h) # 综八卦 (lower)
+def mirror_onto_upper_trigram(h): return dui_chen_ba_gua(h)  # 对八卦 (lower → upper)
+def copy_onto_upper_trigram(h):   return chong_ba_gua(h)     # 重八卦 (lower → upper)
+
+# Ensure consistent ordering and labeling throughout
+TRANSFORMATIONS = [
+    # WHOLE (purple)
+    {
+        "short": "SHIFT",
+        "card": "SHIFT (位卦 Yí Wèi Guà)",
+        "desc": "Shift all lines up, top falls.",
+        "scope": "whole",
+        "char": "位卦",
+        "pinyin": "Yí Wèi Guà",
+        "color": PURPLE,
+        "func": shift_hexagram,
+    },
+    {
+        "short": "FLIP",
+        "card": "FLIP (综卦 Zǒng Guà)",
+        "desc": "Flip line order, all lines.",
+        "scope": "whole",
+        "char": "综卦",
+        "pinyin": "Zǒng Guà",
+        "color": PURPLE,
+        "func": flip_hexagram,
+    },
+    {
+        "short": "SWAP",
+        "card": "SWAP (交卦 Jiāo Guà)",
+        "desc": "Swap lower and upper trigrams.",
+        "scope": "whole",
+        "char": "交卦",
+        "pinyin": "Jiāo Guà",
+        "color": PURPLE,
+        "func": swap_hexagram,
+    },
+    {
+        "short": "UNHIDE",
+        "card": "UNHIDE (核卦 Hu Guà)",
+        "desc": "Unhide lines 2-4 ▼, lines 3-5 ▲.",
+        "scope": "whole",
+        "char": "核卦",
+        "pinyin": "Hu Guà",
+        "color": PURPLE,
+        "func": unhide_hexagram,
+    },
+    {
+        "short": "INVERT",
+        "card": "INVERT (错卦 Cuò Guà)",
+        "desc": "Invert yin ↔ yang, all lines.",
+        "scope": "whole",
+        "char": "错卦",
+        "pinyin": "Cuò Guà",
+        "color": PURPLE,
+        "func": invert_hexagram,
+    },
+
+    # LOWER (green)
+    {
+        "short": "INVERT ▼",
+        "card": "INVERT ▼ (错八卦 Cuò Bā Guà)",
+        "desc": "Invert yin ↔ yang, lower trigram.",
+        "scope": "lower",
+        "char": "错八卦",
+        "pinyin": "Cuò Bā Guà",
+        "color": GREEN,
+        "func": invert_lower_trigram,
+    },
+    {
+        "short": "FLIP ▼",
+        "card": "FLIP ▼ (综八卦 Zǒng Bā Guà)",
+        "desc": "Flip line order, lower trigram.",
+        "scope": "lower",
+        "char": "综八卦",
+        "pinyin": "Zǒng Bā Guà",
+        "color": GREEN,
+        "func": flip_lower_trigram,
+    },
+
+    # UPPER (blue)
+    {
+        "short": "MIRROR ▲",
+        "card": "MIRROR ▲ (对八卦 Duìchèn Bā Guà)",
+        "desc": "Mirror lower trigram onto upper.",
+        "scope": "upper",
+        "char": "对八卦",
+        "pinyin": "Duìchèn Bā Guà",
+        "color": BLUE,
+        "func": mirror_onto_upper_trigram,
+    },
+    {
+        "short": "COPY ▲",
+        "card": "COPY ▲ (重八卦 Chóng Bā Guà)",
+        "desc": "Copy lower trigram onto upper.",
+        "scope": "upper",
+        "char": "重八卦",
+        "pinyin": "Chóng Bā Guà",
+        "color": BLUE,
+        "func": copy_onto_upper_trigram,
+    },
+]
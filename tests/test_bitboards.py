@@ -0,0 +1,74 @@
+"""Bitboards.reachable_within agrees with the per-pair solver tables, and feeds simulate's reach."""
+import os
+import sys
+
+import pytest
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+SRC = os.path.join(HERE, os.pardir, "src")
+sys.path.insert(0, SRC)
+sys.path.insert(0, os.path.join(HERE, os.pardir, "tools"))
+
+from engine import ALL_HEXAGRAMS, HEX_COUNT, Bitboards, board_of, build_transitions, load_tables
+from gamestate import GameState
+from transforms import TRANSFORMATIONS
+
+import simulate
+
+MASKS = (0b1, 0b11, 0b101010101, (1 << len(TRANSFORMATIONS)) - 1)
+
+
+@pytest.fixture(scope="module")
+def solver():
+    transitions = build_transitions([t["func"] for t in TRANSFORMATIONS])
+    return load_tables(os.path.join(SRC, "solver.bin"), transitions)
+
+
+@pytest.fixture(scope="module")
+def boards(solver):
+    return Bitboards(solver.transitions)
+
+
+def within(solver, mask, start, moves):
+    """Reference: every goal the tables put at most `moves` moves from start."""
+    codes = []
+    for goal in range(HEX_COUNT):
+        d, _ = solver.lookup(mask, start, goal)
+        if d is not None and d <= moves:
+            codes.append(goal)
+    return board_of(codes)
+
+
+@pytest.mark.parametrize("mask", MASKS)
+def test_reachable_within_matches_tables(solver, boards, mask):
+    for start in range(0, HEX_COUNT, 7):
+        for moves in (0, 1, 2, 4, 10):
+            assert boards.reachable_within(mask, 1 << start, moves) == within(solver, mask, start, moves), (start, moves)
+
+
+def test_expand_is_one_move(solver, boards):
+    mask = MASKS[-1]
+    sources = board_of((0, 9, 63))
+    expected = board_of(row[code] for row in solver.transitions for code in (0, 9, 63))
+    assert boards.expand(mask, sources) == expected
+
+
+def test_multi_source_is_the_union(boards):
+    mask = MASKS[1]
+    sources = (3, 40)
+    union = boards.reachable_within(mask, 1 << 3, 3) | boards.reachable_within(mask, 1 << 40, 3)
+    assert boards.reachable_within(mask, board_of(sources), 3) == union
+
+
+def test_simulated_reach(solver, boards):
+    """Each row's reach counts the uncollected cards in reach of its start card (greedy never shops)."""
+    rows = simulate.play_run(solver, simulate.GreedyPolicy(), seed=7, boards=boards)
+    reach = simulate.ROUND_FIELDS.index("reach")
+    state = GameState(solver, 7)
+    state.toss(full_reset=True, seed=7)
+    collected = set()
+    for row in rows:
+        seen = boards.reachable_within(state.unlocked, 1 << state.current, state.limit)
+        assert row[reach] == bin(seen & ALL_HEXAGRAMS & ~board_of(collected)).count("1")
+        collected.add(state.goal)
+        state.toss(start=state.goal)
@@ -0,0 +1,155 @@
+"""GameState rules: seeded deals, the move limit, round awards and the shop."""
+import os
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, SRC)
+
+from engine import HEX_COUNT, bit_indices, build_transitions, load_tables
+from gamestate import GameState
+from transforms import TRANSFORMATIONS
+
+
+@pytest.fixture(scope="module")
+def solver():
+    transitions = build_transitions([t["func"] for t in TRANSFORMATIONS])
+    return load_tables(os.path.join(SRC, "solver.bin"), transitions)
+
+
+def deal(solver, ok=lambda state: True, **rules):
+    """A freshly tossed run (first seed from 0 up) whose first round satisfies ok."""
+    for seed in range(1000):
+        state = GameState(solver, seed, **rules)
+        state.toss(full_reset=True, seed=seed)
+        if state.shortest is not None and ok(state):
+            return state
+    raise AssertionError("no seed deals such a round")
+
+
+def play_optimal(state):
+    while not state.outcome:
+        assert state.play(state.hint_moves()[0]) is not None
+
+
+def locked_index(state):
+    return next(i for i in range(len(state.transitions)) if not state.is_unlocked(i))
+
+
+def test_toss_is_seeded(solver):
+    def deals(seed):
+        state = GameState(solver, seed)
+        state.toss(full_reset=True, seed=seed)
+        out = [(state.current, state.goal)]
+        for _ in range(10):
+            state.toss(start=state.goal)
+            out.append((state.current, state.goal))
+        return out
+    assert deals(3) == deals(3)
+    assert deals(3) != deals(4)
+
+
+def test_goal_pool_runs_out(solver):
+    state = GameState(solver, 1)
+    state.toss(full_reset=True, seed=1)
+    goals = [state.goal]
+    while state.toss(start=state.goal):
+        assert state.goal != state.current
+        goals.append(state.goal)
+    assert sorted(goals) == list(range(HEX_COUNT))   # every card dealt exactly once
+    assert state.locked
+    assert state.play(bit_indices(state.unlocked)[0]) is None
+
+
+def test_fails_at_the_move_limit(solver):
+    state = deal(solver, lambda s: s.shortest > 3, limit=3)
+    for _ in range(3):
+        assert state.outcome is None
+        state.play(next(i for i in bit_indices(state.unlocked) if i not in state.hint_moves()))
+    assert state.outcome == "failure" and state.failed and state.locked
+    assert state.play(bit_indices(state.unlocked)[0]) is None
+    assert state.moves == 3
+    assert state.end_round() == 0 and state.balance == 0
+
+
+def test_award_bonus_and_streak(solver):
+    state = deal(solver)
+    for streak in (1, 2):
+        optimal = state.round_optimal
+        play_optimal(state)
+        before = state.balance
+        gained = state.end_round()
+        assert state.streak == streak
+        assert gained == optimal + state.optimal_bonus + streak   # max(1, 2 * optimal - moves) = optimal
+        assert state.balance == before + gained
+        assert state.end_round() == gained and state.balance == before + gained   # awarded once
+        state.toss(start=state.goal)
+
+
+def test_award_off_the_optimal_path(solver):
+    state = deal(solver, lambda s: s.shortest <= 3)
+    optimal = state.round_optimal
+    while not state.outcome:
+        state.play(next(i for i in bit_indices(state.unlocked) if i not in state.hint_moves()) if state.moves < 2
+                   else state.hint_moves()[0])
+    assert state.outcome == "success" and state.moves > optimal
+    assert state.end_round() == max(1, 2 * optimal - state.moves)   # no bonus, no streak
+    assert state.streak == 0
+
+
+def test_hint_penalty_and_minimum(solver):
+    state = deal(solver, hint_penalty=1)
+    state.balance = 10
+    optimal = state.round_optimal
+    assert state.buy_hint()
+    play_optimal(state)
+    assert state.end_round() == optimal + state.optimal_bonus - 1   # the streak needs a hintless round
+    assert state.streak == 0
+
+    state = deal(solver, hint_penalty=100)
+    state.balance = 10
+    assert state.buy_hint()
+    play_optimal(state)
+    assert state.end_round() == state.success_min == 1
+
+
+def test_buy(solver):
+    state = deal(solver)
+    idx = locked_index(state)
+    state.balance = state.buy_start_cost
+    assert not state.shop_open and not state.buy(idx)   # no shop before the first round
+    play_optimal(state)
+    state.end_round()
+    state.toss(start=state.goal)
+    state.balance = state.buy_start_cost - 1
+    assert state.shop_open and not state.buy(idx)   # can't afford it
+    state.balance = 2 * state.buy_start_cost + state.buy_cost_step
+    for bad in (-1, len(state.transitions), bit_indices(state.freebies)[0]):
+        assert not state.buy(bad)                   # out of range / already unlocked
+    assert state.buy(idx)
+    assert state.is_unlocked(idx)
+    assert state.balance == state.buy_start_cost + state.buy_cost_step
+    assert state.buy_cost == state.buy_start_cost + state.buy_cost_step
+    assert state.total_spent == state.buy_start_cost
+    state.play(state.hint_moves()[0])
+    assert not state.shop_open and not state.buy(locked_index(state))   # the shop closes on the first move
+
+
+def test_buy_hint(solver):
+    state = deal(solver)
+    assert not state.buy_hint()
+    state.balance = state.hint_cost
+    assert state.buy_hint() and state.hint_active
+    assert not state.buy_hint()                     # one hint per move
+    assert state.balance == 0 and state.round_hints == 1
+    state.play(state.hint_moves()[0])
+    assert not state.hint_active
+
+
+def test_play_rejects_bad_indices(solver):
+    state = deal(solver)
+    chain = list(state.chain)
+    for bad in (-1, len(state.transitions), locked_index(state)):
+        assert state.play(bad) is None
+    assert state.chain == chain
@@ -0,0 +1,95 @@
+"""A recorded run replays to the same state; malformed or illegal logs raise ReplayError."""
+import os
+import random
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, SRC)
+
+from engine import bit_indices, build_transitions, load_tables
+from gamestate import GameState
+from replay import BUY, COINS, HINT, PLAY, REPLAY_HEADER, ReplayError, ReplayWriter, replay, replay_file
+from transforms import TRANSFORMATIONS
+
+SEED = 2024
+ROUNDS = 12
+
+
+@pytest.fixture(scope="module")
+def solver():
+    transitions = build_transitions([t["func"] for t in TRANSFORMATIONS])
+    return load_tables(os.path.join(SRC, "solver.bin"), transitions)
+
+
+def record(path, solver, seed):
+    """Play ROUNDS rounds the way the game loop does, logging every action; returns the final state."""
+    rng = random.Random(seed)
+    state = GameState(solver, seed)
+    writer = ReplayWriter(path, seed, solver.transitions)
+    writer.record(COINS)
+    state.toss(full_reset=True, seed=seed)
+    for rnd in range(ROUNDS):
+        for idx in range(len(state.transitions)):
+            if state.can_buy(idx) and rng.random() < 0.5:
+                assert state.buy(idx)
+                writer.record(BUY | idx)
+        while not state.outcome:
+            if rng.random() < 0.2 and state.buy_hint():
+                writer.record(HINT)
+            moves = state.hint_moves()
+            idx = rng.choice(moves if moves and rng.random() < 0.8 else bit_indices(state.unlocked))
+            assert state.play(idx) is not None
+            writer.record(PLAY | idx)
+        if state.outcome == "failure" or rnd == ROUNDS - 1:
+            break
+        writer.record(COINS)
+        state.end_round()
+        state.toss(start=state.goal)
+    writer.close()
+    state.end_round()
+    return state
+
+
+def test_round_trip(solver, tmp_path):
+    path = tmp_path / "run.hxr"
+    played = record(str(path), solver, SEED)
+    replayed = replay_file(str(path), solver)
+    assert replayed.balance == played.balance
+    assert replayed.collected == played.collected and len(played.collected) > 1
+    assert replayed.total_insight == played.total_insight
+    assert replayed.total_spent == played.total_spent and played.total_spent > 0
+    assert replayed.run_hints == played.run_hints and played.run_hints > 0
+    assert replayed.best_streak == played.best_streak
+    assert replayed.chain == played.chain and replayed.outcome == played.outcome
+
+
+@pytest.fixture
+def log(solver, tmp_path):
+    path = tmp_path / "run.hxr"
+    record(str(path), solver, SEED)
+    return path.read_bytes()
+
+
+def test_truncated_header(solver, log):
+    with pytest.raises(ReplayError, match="truncated"):
+        replay(log[:REPLAY_HEADER.size - 1], solver)
+
+
+def test_wrong_table_tag(solver, log):
+    tag_at = REPLAY_HEADER.size - 4
+    bad = log[:tag_at] + bytes(b ^ 0xFF for b in log[tag_at:REPLAY_HEADER.size]) + log[REPLAY_HEADER.size:]
+    with pytest.raises(ReplayError, match="different transforms"):
+        replay(bad, solver)
+
+
+def test_illegal_action(solver, log):
+    header = log[:REPLAY_HEADER.size]
+    locked = next(i for i in range(len(TRANSFORMATIONS)) if not GameState(solver).is_unlocked(i))
+    with pytest.raises(ReplayError, match="illegal action"):
+        replay(header + bytes((COINS, PLAY | locked)), solver)
+    with pytest.raises(ReplayError, match="illegal action"):
+        replay(header + bytes((COINS, BUY | locked)), solver)   # no shop in the first round
+    with pytest.raises(ReplayError, match="unknown action"):
+        replay(header + bytes((COINS, 0x40)), solver)
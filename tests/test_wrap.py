@@ -0,0 +1,77 @@
+"""wrap_two_lines keeps the original 2-line truncation: whole words, then the ellipsis."""
+import os
+import sys
+
+import pytest
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, SRC)
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+os.environ.setdefault("SDL_AUDIODRIVER", "dummy")
+
+import pygame
+
+import main
+
+TEXTS = [
+    "The Creative works sublime success, furthering through perseverance",
+    "Hexagram of the Well: the town may be changed, but the well cannot be changed",
+    "Abundance has success. The king attains abundance. Be not sad. Be like the sun at midday.",
+    "Supercalifragilisticexpialidocious words overflow",
+    "Short",
+    "",
+]
+
+
+def legacy_wrap_two_lines(text, max_width, font):
+    """wrap_two_lines as it was before the shared wrap engine."""
+    words = text.split()
+    if not words:
+        return "", None
+    line1, line2 = "", ""
+    in_second = False
+    for w in words:
+        if not in_second:
+            test = (line1 + " " + w).strip()
+            if font.size(test)[0] <= max_width:
+                line1 = test
+            else:
+                line2 = w
+                in_second = True
+        else:
+            test2 = (line2 + " " + w).strip()
+            if font.size(test2)[0] <= max_width:
+                line2 = test2
+            else:
+                while font.size((line2 + "…").strip())[0] > max_width and " " in line2:
+                    line2 = line2.rsplit(" ", 1)[0]
+                if font.size((line2 + "…").strip())[0] > max_width:
+                    while line2 and font.size((line2 + "…").strip())[0] > max_width:
+                        line2 = line2[:-1]
+                line2 = (line2 + "…").strip()
+                break
+    return line1, (line2 if line2 else None)
+
+
+@pytest.fixture(scope="module")
+def font():
+    pygame.font.init()
+    yield pygame.font.Font(os.path.join(SRC, "fonts", "dejavu-sans.ttf"), 14)
+    pygame.font.quit()
+
+
+@pytest.mark.parametrize("text", TEXTS)
+def test_matches_legacy(font, text):
+    for width in range(120, 401, 7):
+        if text and font.size(text.split()[0])[0] > width:
+            continue   # the old wrapper left line 1 empty for an oversized first word
+        assert main.wrap_two_lines(text, width, font) == legacy_wrap_two_lines(text, width, font), width
+
+
+def test_overflow_trims_to_a_word(font):
+    text = TEXTS[2]
+    width = font.size("Abundance has success. The king")[0]
+    line1, line2 = main.wrap_two_lines(text, width, font)
+    assert line2.endswith("…")
+    kept = line2[:-1].split()
+    assert kept and kept == text[len(line1):].split()[:len(kept)]   # whole words only
@@ -0,0 +1,259 @@
+"""Micro-benchmarks of the game logic hot paths (no pygame).
+
+    python tools/bench_logic.py [--repeat N] [--pairs N] [--json] [--baseline PATH] [--threshold 0.25] [--gate] [--save]
+
+Times, in µs per op (the fastest of --repeat passes, taken round-robin):
+  transform[SHORT]   each TRANSFORMATIONS string function, one op = all 64 hexagrams
+  transition_lookup  the integer transition tables, one op = every (transform, code) step
+  bfs_mean/p95/max   shortest_path_with_allowed, one op = one start/goal query,
+                     per unlock mask (every mask, --pairs fixed queries each);
+                     per-mask numbers are in the JSON under bfs_by_mask
+  solver_lookup      the same queries answered from solver.bin, one op = one
+                     mask's --pairs queries
+  guidance_per_move  GameState.recompute_live + recompute_static (what the
+                     game runs after every move and purchase), over positions
+                     from several rounds of seeded runs
+  toss               GameState.toss: dealing start card and goal (reset_game)
+
+--json prints the results as JSON instead of a table. The times are
+absolute, so they are only reported (next to a baseline, if one was saved
+here); --gate exits non-zero if a metric is slower than the baseline by more
+than --threshold plus its noise: how far the fastest quarter of its passes
+spread (the larger of this run's and the baseline's). --save records this run as the
+baseline; it is per machine and not checked in.
+"""
+import argparse
+import copy
+import json
+import os
+import random
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, SRC)
+
+from engine import BINARIES, HEX_COUNT, bit_indices, build_transitions, load_tables, shortest_path_with_allowed
+from gamestate import GameState
+from transforms import TRANSFORMATIONS
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_logic_baseline.json")
+SEED = 12345
+TRANSFORM_ROUNDS = 500    # passes over the 64 hexagrams per transform, per sample
+LOOKUP_ROUNDS = 500       # passes over every (transform, code) step, per sample
+SOLVER_ROUNDS = 10        # passes over every mask's queries, per sample
+GUIDANCE_RUNS = 20        # seeded runs whose positions are re-measured
+DETOUR = 0.15             # ... share of random (not optimal) moves in them
+BUY_CHANCE = 0.5          # ... chance of buying (again) while the shop is open
+TOSS_RUNS = 50            # whole runs dealt (64 tosses each)
+
+
+def measure(cases, repeat):
+    """
+    {name: [µs per op, ...]} for cases [(name, ops, work)]: one sorted sample
+    per timed work() call, repeat each. Passes go round-robin over all cases,
+    so a burst of machine noise costs each case one pass rather than all of them.
+    """
+    samples = {}
+    for _ in range(repeat):
+        for name, ops, work in cases:
+            t0 = time.perf_counter()
+            work()
+            samples.setdefault(name, []).append((time.perf_counter() - t0) * 1e6 / ops)
+    return {name: sorted(us) for name, us in samples.items()}
+
+
+def transform_cases():
+    cases = []
+    for t in TRANSFORMATIONS:
+        def work(func=t["func"]):
+            for _ in range(TRANSFORM_ROUNDS):
+                for b in BINARIES:
+                    func(b)
+        cases.append((f"transform[{t['short']}]", TRANSFORM_ROUNDS, work))
+    return cases
+
+
+def lookup_cases(transitions, solver, queries):
+    def steps():
+        for _ in range(LOOKUP_ROUNDS):
+            for row in transitions:
+                for code in range(HEX_COUNT):
+                    row[code]
+
+    masks = range(1 << len(transitions))
+    for mask in masks:
+        solver.table(mask)   # slice every table out of solver.bin before timing
+
+    def lookups():
+        for _ in range(SOLVER_ROUNDS):
+            for mask in masks:
+                for start, goal in queries:
+                    solver.lookup(mask, start, goal)
+    return [
+        ("transition_lookup", LOOKUP_ROUNDS, steps),
+        ("solver_lookup", SOLVER_ROUNDS * len(masks), lookups),
+    ]
+
+
+def bfs_cases(transitions, queries):
+    """shortest_path_with_allowed over the same queries, one case per unlock mask ("bfs[mask]")."""
+    cases = []
+    for mask in range(1 << len(transitions)):
+        def work(allowed=bit_indices(mask)):
+            for start, goal in queries:
+                shortest_path_with_allowed(transitions, start, goal, allowed)
+        cases.append((f"bfs[{mask}]", len(queries), work))
+    return cases
+
+
+def positions(solver):
+    """
+    A GameState copy at every move of GUIDANCE_RUNS seeded runs, played
+    round after round until a round fails or the deck is complete: mostly
+    optimal moves with a DETOUR share of random ones, buying a random
+    affordable transform now and then while the shop is open.
+    """
+    rng = random.Random(SEED)
+    out = []
+    for run in range(GUIDANCE_RUNS):
+        state = GameState(solver, seed=run)
+        state.toss(full_reset=True, seed=run)
+        while True:
+            while state.shop_open and rng.random() < BUY_CHANCE:
+                affordable = [i for i in range(len(state.transitions)) if state.can_buy(i)]
+                if not affordable:
+                    break
+                state.buy(rng.choice(affordable))
+            while not state.outcome:
+                moves = state.hint_moves()
+                if not moves or rng.random() < DETOUR:
+                    moves = bit_indices(state.unlocked)
+                state.play(rng.choice(moves))
+                out.append(copy.copy(state))
+            state.end_round()
+            if state.outcome == "failure" or state.deck_complete:
+                break
+            state.toss(start=state.goal)
+    masks = {state.unlocked for state in out}
+    if len(masks) < 2:
+        raise RuntimeError(f"bench: guidance positions cover {len(masks)} unlock mask(s), expected several")
+    return out
+
+
+def state_cases(solver):
+    states = positions(solver)
+
+    def guidance():
+        for state in states:
+            state.recompute_live()
+            state.recompute_static()
+
+    dealer = GameState(solver, seed=SEED)
+
+    def tosses():
+        for run in range(TOSS_RUNS):
+            dealer.toss(full_reset=True, seed=run)
+            while dealer.toss(start=dealer.goal):
+                pass
+    return [
+        ("guidance_per_move", len(states), guidance),
+        ("toss", TOSS_RUNS * HEX_COUNT, tosses),
+    ]
+
+
+def run(repeat, pairs):
+    transitions = build_transitions([t["func"] for t in TRANSFORMATIONS])
+    solver = load_tables(os.path.join(SRC, "solver.bin"), transitions)
+    rng = random.Random(SEED)
+    queries = [(rng.randrange(HEX_COUNT), rng.randrange(HEX_COUNT)) for _ in range(pairs)]
+
+    cases = (transform_cases() + lookup_cases(transitions, solver, queries)
+             + bfs_cases(transitions, queries) + state_cases(solver))
+    samples = measure(cases, repeat)
+    timings = {name: us[0] for name, us in samples.items()}
+    spread = {name: us[len(us) // 4] - us[0] for name, us in samples.items()}
+
+    by_mask = {name[4:-1]: us for name, us in timings.items() if name.startswith("bfs[")}
+    masks = sorted(by_mask, key=by_mask.get)
+    p95 = masks[min(len(masks) - 1, int(len(masks) * 0.95))]
+    metrics = {name: us for name, us in timings.items() if not name.startswith("bfs[")}
+    metrics["bfs_mean"] = sum(by_mask.values()) / len(masks)
+    metrics["bfs_p95"] = by_mask[p95]
+    metrics["bfs_max"] = by_mask[masks[-1]]
+    # the aggregates take the spread of the mask(s) they come from
+    spread["bfs_mean"] = sum(spread[f"bfs[{mask}]"] for mask in masks) / len(masks)
+    spread["bfs_p95"] = spread[f"bfs[{p95}]"]
+    spread["bfs_max"] = spread[f"bfs[{masks[-1]}]"]
+    return {
+        "unit": "us/op",
+        "metrics": {name: round(us, 3) for name, us in metrics.items()},
+        "spread": {name: round(spread[name], 3) for name in metrics},
+        "bfs_by_mask": {mask: round(us, 3) for mask, us in by_mask.items()},
+    }
+
+
+def regressions(results, baseline, threshold):
+    """Lines for every metric slower than the baseline by more than threshold plus its noise."""
+    out = []
+    for name, base in baseline["metrics"].items():
+        now = results["metrics"].get(name)
+        if now is None:
+            out.append(f"{name}: missing from this run")
+            continue
+        noise = max(results["spread"][name], baseline.get("spread", {}).get(name, 0.0))
+        limit = base * (1 + threshold) + noise
+        if now > limit:
+            out.append(f"{name}: {now:,.3f} µs vs baseline {base:,.3f} µs (+{now / base - 1:.0%}, limit {limit:,.3f})")
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=10, help="passes per measurement (the fastest counts)")
+    parser.add_argument("--pairs", type=int, default=64, help="start/goal pairs per unlock mask")
+    parser.add_argument("--json", action="store_true", help="print the results as JSON")
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON (default: tools/bench_logic_baseline.json)")
+    parser.add_argument("--threshold", type=float, default=0.25, help="allowed slowdown per metric (fraction)")
+    parser.add_argument("--gate", action="store_true", help="fail on a slowdown (baseline saved on this machine)")
+    parser.add_argument("--save", action="store_true", help="write this run as the new baseline")
+    args = parser.parse_args()
+
+    results = run(args.repeat, args.pairs)
+    metrics = results["metrics"]
+
+    baseline = None
+    if not args.save and os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    if args.gate and baseline is None and not args.save:
+        sys.exit(f"--gate: no baseline at {args.baseline} (run with --save on this machine first)")
+    failed = regressions(results, baseline, args.threshold) if args.gate and baseline else []
+
+    if args.json:
+        results["regressions"] = failed
+        json.dump(results, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        width = max(len(name) for name in metrics)
+        for name, us in metrics.items():
+            base = baseline["metrics"].get(name) if baseline else None
+            base = f"  (baseline {base:,.3f})" if base is not None else ""
+            print(f"{name:<{width}} {us:>12,.3f} µs{base}")
+        for line in failed:
+            print(f"REGRESSION {line}")
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+        print(f"baseline saved to {args.baseline}", file=sys.stderr)
+    elif baseline is None:
+        print(f"no baseline at {args.baseline} (run with --save to record one)", file=sys.stderr)
+    elif not args.gate:
+        print("timings only reported; --gate fails on a slowdown against the baseline", file=sys.stderr)
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
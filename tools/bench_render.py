@@ -0,0 +1,313 @@
+"""Headless rendering benchmark: canned scenarios through run_game on the SDL dummy driver.
+
+    python tools/bench_render.py [--baseline PATH] [--tolerance 0.25] [--fps] [--ms] [--save]
+
+Drives the real game loop frame by frame (every frame is FRAME_MS of
+animation time; mouse and clicks are scripted) through: a fresh toss,
+hovering every transform, the deck popup on both pages, the help popup, a
+won round up to the end of the goal->deck swoosh and a full 10-move chain.
+Per scenario it reports frames per second, surfaces allocated per frame
+(every pygame.Surface() and surface-returning pygame.transform call, from
+the pool, layers, atlases and popups alike, plus text rasterizations) and
+ms per frame spent in render_surf (the text cache, render_pair) and
+draw_hexagram_lines.
+
+Exits non-zero if a scenario regressed against the baseline JSON in what is
+deterministic: frame counts and allocations, exactly. fps and the ms metrics
+are only reported, since the baseline's are from whatever machine recorded
+it; with a baseline saved on the same machine, --fps gates fps (by the
+tolerance) and --ms the ms metrics (by the tolerance plus MS_SLACK).
+--save records this run as the new baseline instead.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, SRC)
+os.environ["SDL_VIDEODRIVER"] = "dummy"
+os.environ["SDL_AUDIODRIVER"] = "dummy"
+
+import pygame
+
+from anim import ManualClock
+from frames import AMBIENT, IDLE, MOTION
+
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "bench_baseline.json")
+FRAME_MS = 16           # animation time per frame (60 fps)
+SEED = 12345            # run seed source, so every bench plays the same rounds
+WAIT_LIMIT = 600        # frames to wait for the game before giving up
+ALLOC_SLACK = 0.01      # allocations are deterministic: allowed growth per frame
+MS_SLACK = 0.05         # timer noise floor for the per-frame ms metrics
+
+# metric -> (label, higher is better, flag that gates it or None: always)
+METRICS = {
+    "fps":                    ("fps", True, "fps"),
+    "allocs_per_frame":       ("allocs/frame", False, None),
+    "render_surf_ms":         ("render_surf ms/frame", False, "ms"),
+    "draw_hexagram_lines_ms": ("draw_hexagram_lines ms/frame", False, "ms"),
+}
+
+
+class Timed:
+    """Stands in for a main.py function (callers look it up by name) and sums its wall time."""
+
+    def __init__(self, module, name):
+        self.func = getattr(module, name)
+        self.ms = 0.0
+        setattr(module, name, self)
+
+    def __call__(self, *args, **kwargs):
+        t0 = time.perf_counter()
+        try:
+            return self.func(*args, **kwargs)
+        finally:
+            self.ms += (time.perf_counter() - t0) * 1000.0
+
+
+class Allocations:
+    """
+    Counts the surfaces created while installed: replaces pygame.Surface with
+    a counting subclass and wraps the pygame.transform functions that return
+    a new surface. (Callers look both up on the module at call time.)
+    """
+
+    TRANSFORMS = ("scale", "smoothscale", "rotate", "rotozoom", "flip")
+
+    def __init__(self):
+        self.count = 0
+        counter = self
+
+        class Surface(pygame.Surface):
+            def __init__(self, *args, **kwargs):
+                super().__init__(*args, **kwargs)
+                counter.count += 1
+        pygame.Surface = Surface
+
+        for name in self.TRANSFORMS:
+            setattr(pygame.transform, name, self.counted(getattr(pygame.transform, name)))
+
+    def counted(self, func):
+        def wrapper(*args, **kwargs):
+            self.count += 1
+            return func(*args, **kwargs)
+        return wrapper
+
+
+class Bench:
+    """
+    Replaces main.FRAMES: every frame is due at once and FRAME_MS later on
+    ANIM's clock. Between frames it runs the scenario script, a generator
+    that posts input and yields how many frames to let pass; each frame's
+    wall time and counters go to the scenario that was current when it ran.
+    """
+
+    def __init__(self, game):
+        self.game = game
+        self.clock = ManualClock()
+        self.intervals = {IDLE: FRAME_MS, AMBIENT: FRAME_MS, MOTION: FRAME_MS}
+        self.mouse = (0, 0)
+        self.text = Timed(game, "render_pair")
+        self.lines = Timed(game, "draw_hexagram_lines")
+        self.allocs = Allocations()
+        self.totals = {}        # scenario -> summed counters
+        self.current = None     # scenario being measured (None: not measured)
+        self.frame = None       # (scenario, counters at frame start)
+        self.wait = 0
+        self.script = self.scenarios()
+
+    def counters(self):
+        return (time.perf_counter(), self.allocs.count, self.game.TEXT_CACHE_STATS["misses"],
+                self.text.ms, self.lines.ms)
+
+    async def next_frame(self, mode):
+        await asyncio.sleep(0)
+        if self.frame is not None:
+            name, start = self.frame
+            spent = [b - a for a, b in zip(start, self.counters())]
+            total = self.totals.setdefault(name, [0] * (len(spent) + 1))
+            total[0] += 1
+            for i, value in enumerate(spent):
+                total[i + 1] += value
+        self.clock.advance(FRAME_MS)
+
+        if self.wait:
+            self.wait -= 1
+        else:
+            try:
+                self.wait = next(self.script) - 1
+            except StopIteration:
+                pygame.event.post(pygame.event.Event(pygame.QUIT))
+        self.frame = (self.current, self.counters()) if self.current else None
+        return pygame.event.get()
+
+    # --- input ---
+    def move(self, pos):
+        self.mouse = pos
+        pygame.event.post(pygame.event.Event(pygame.MOUSEMOTION, pos=pos, rel=(0, 0), buttons=(0, 0, 0)))
+
+    def click(self, pos):
+        self.move(pos)
+        pygame.event.post(pygame.event.Event(pygame.MOUSEBUTTONDOWN, pos=pos, button=1))
+
+    def transform(self, idx):
+        """Center of transform button idx."""
+        return next(rect.center for rect, i in self.game.button_hitboxes if i == idx)
+
+    def until(self, ready):
+        for _ in range(WAIT_LIMIT):
+            yield 1
+            if ready():
+                return
+        raise RuntimeError(f"bench: game stuck in scenario {self.current!r}")
+
+    def play(self, idx):
+        """Play transform idx and wait for its card to land (pending change, then the flip)."""
+        game = self.game
+        self.click(self.transform(idx))
+        yield from self.until(lambda: game.pending_change is None and "flip" not in game.ANIM)
+
+    # --- the scenarios, in order (each starts where the previous one left the game) ---
+    def scenarios(self):
+        game = self.game
+        state = lambda: game.STATE
+        yield 5   # boot
+
+        self.current = "toss"
+        self.click(game.coins_button.center)
+        yield 60
+
+        self.current = "hover"
+        for rect, _ in list(game.button_hitboxes):
+            self.move(rect.center)
+            yield 15
+        self.move((5, 5))
+        yield 1
+
+        self.current = "deck"
+        self.click(game.deck_icon_rect.center)
+        yield 30
+        self.click(game.arrow_down_rect.center)
+        yield 30
+        self.click(game.deck_icon_rect.center)
+        yield 5
+
+        self.current = "help"
+        self.click(game.help_button.center)
+        yield 30
+        self.click(game.help_button.center)
+        yield 5
+
+        self.current = "win"
+        while state().outcome is None:
+            yield from self.play(min(state().hint_moves()))
+        yield from self.until(lambda: game.POPUP_VISIBLE and "add2deck" not in game.ANIM)
+
+        self.current = None   # next round
+        self.click(game.coins_button.center)
+        yield from self.until(lambda: "goal2start" not in game.ANIM and not game.POPUP_VISIBLE)
+
+        self.current = "chain"
+        for _ in range(state().limit):
+            if state().outcome is not None:
+                break
+            unlocked = [i for i in range(len(game.TRANSFORMATIONS)) if state().is_unlocked(i)]
+            off_path = [i for i in unlocked if i not in state().hint_moves()]
+            yield from self.play((off_path or unlocked)[0])
+        self.current = None
+
+    def results(self):
+        out = {}
+        for name, (frames, seconds, allocs, misses, text_ms, lines_ms) in self.totals.items():
+            out[name] = {
+                "frames": frames,
+                "fps": round(frames / seconds, 1) if seconds else 0.0,
+                "allocs_per_frame": round((allocs + misses) / frames, 3),
+                "render_surf_ms": round(text_ms / frames, 3),
+                "draw_hexagram_lines_ms": round(lines_ms / frames, 3),
+            }
+        return out
+
+
+def run():
+    os.chdir(SRC)   # main loads its assets relative to the working directory
+    random.seed(SEED)
+    import main
+    main.RECORD_REPLAYS = False
+    bench = Bench(main)
+    main.FRAMES = bench
+    main.ANIM.set_clock(bench.clock)
+    pygame.mouse.get_pos = lambda: bench.mouse
+    asyncio.run(main.run_game())
+    return bench.results()
+
+
+def regressions(results, baseline, tolerance, timed=()):
+    """Human-readable lines for every gated metric (timed: the flags given) that got worse than the baseline allows."""
+    out = []
+    for name, base in baseline.items():
+        now = results.get(name)
+        if now is None:
+            out.append(f"{name}: scenario missing from this run")
+            continue
+        if now["frames"] != base["frames"]:
+            out.append(f"{name}: {now['frames']} frames, baseline has {base['frames']} (re-save the baseline)")
+        for metric, (label, higher_is_better, flag) in METRICS.items():
+            if flag is not None and flag not in timed:
+                continue
+            if higher_is_better:
+                limit = base[metric] * (1 - tolerance)
+                worse = now[metric] < limit
+            else:
+                slack = ALLOC_SLACK if metric == "allocs_per_frame" else base[metric] * tolerance + MS_SLACK
+                limit = base[metric] + slack
+                worse = now[metric] > limit
+            if worse:
+                out.append(f"{name}: {label} {now[metric]} vs baseline {base[metric]} (limit {limit:.3f})")
+    return out
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", default=BASELINE, help="baseline JSON (default: tools/bench_baseline.json)")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed fps drop / time growth (fraction)")
+    parser.add_argument("--fps", action="store_true", help="also fail on an fps drop (baseline from this machine)")
+    parser.add_argument("--ms", action="store_true", help="also fail on slower ms metrics (baseline from this machine)")
+    parser.add_argument("--save", action="store_true", help="write this run as the new baseline")
+    args = parser.parse_args()
+    baseline_path = os.path.abspath(args.baseline)
+
+    results = run()
+
+    widths = {metric: max(len(label), 8) for metric, (label, _, _) in METRICS.items()}
+    print(f"{'scenario':<8} {'frames':>6}  " + "  ".join(f"{label:>{widths[m]}}" for m, (label, _, _) in METRICS.items()))
+    for name, row in results.items():
+        print(f"{name:<8} {row['frames']:>6}  " + "  ".join(f"{row[m]:>{widths[m]}}" for m in METRICS))
+
+    if args.save:
+        with open(baseline_path, "w") as f:
+            json.dump({"frame_ms": FRAME_MS, "scenarios": results}, f, indent=2)
+            f.write("\n")
+        print(f"baseline saved to {baseline_path}")
+        return
+    if not os.path.exists(baseline_path):
+        print(f"no baseline at {baseline_path} (run with --save to record one)")
+        return
+
+    with open(baseline_path) as f:
+        baseline = json.load(f)["scenarios"]
+    timed = [flag for flag in ("fps", "ms") if getattr(args, flag)]
+    failed = regressions(results, baseline, args.tolerance, timed)
+    for line in failed:
+        print(f"REGRESSION {line}")
+    gated = ", ".join(["frames", "allocs"] + [f"{flag} (tolerance {args.tolerance:.0%})" for flag in timed])
+    print(f"{len(results)} scenarios, {len(failed)} regressions (gated: {gated})")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""Regenerate src/solver.bin after changing TRANSFORMATIONS.
+
+    python tools/build_tables.py [--out PATH] [--numpy] [--verify]
+
+--numpy solves every mask at once with batched array ops (needs numpy);
+--verify checks the result against the per-mask reference solver.
+"""
+import argparse
+import os
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, SRC)
+
+from engine import (
+    DIST_BITS, HEX_COUNT, UNREACHABLE, SolverTables, build_transitions, entry_typecode,
+    save_tables, solve_mask,
+)
+from transforms import TRANSFORMATIONS
+
+
+def solve_all_numpy(transitions):
+    """
+    SolverTables for every mask, solved together on (masks, start, goal) arrays.
+    Same entries as solve_mask: distance plus the first moves the reference
+    BFS reports (for a node one layer short of the goal, that BFS keeps the
+    lowest-index optimal first move it was discovered with).
+    """
+    import numpy as np
+
+    n = len(transitions)
+    masks = np.arange(1 << n)
+    perm = np.array([list(row) for row in transitions], dtype=np.intp)     # (n, 64)
+    enabled = (masks[:, None] >> np.arange(n)) & 1 == 1                     # (masks, n)
+    nodes = np.arange(HEX_COUNT)
+
+    # Adjacency per mask: adj[m, c, g] = 1 if an unlocked transform maps c to g
+    edge = np.zeros((n, HEX_COUNT, HEX_COUNT), dtype=np.float32)
+    edge[np.arange(n)[:, None], nodes, perm] = 1
+    adj = np.einsum("mi,icg->mcg", enabled.astype(np.float32), edge)
+
+    # Distances: one batched boolean matrix product per BFS layer; a pair's
+    # distance is the number of layers it stayed unseen.
+    seen = np.broadcast_to(np.eye(HEX_COUNT, dtype=bool), (len(masks), HEX_COUNT, HEX_COUNT)).copy()
+    dist = np.zeros(seen.shape, dtype=np.int16)
+    frontier = seen.astype(np.float32)
+    for _ in range(HEX_COUNT):
+        new = (frontier @ adj > 0) & ~seen
+        if not new.any():
+            break
+        dist += ~seen
+        seen |= new
+        frontier = new.astype(np.float32)
+    dist[~seen] = UNREACHABLE
+
+    # The rest works on (mask, node, start) so every gather is along axis 1.
+    dist = np.ascontiguousarray(dist.transpose(0, 2, 1))
+
+    # Every optimal first move: transform i is optimal for (s, g) if it lands
+    # one step closer. The reference keeps only the lowest one per node.
+    optimal = np.zeros(dist.shape, dtype=np.int32)
+    for i in range(n):
+        closer = np.take(dist, perm[i], axis=2) == dist - 1
+        closer &= enabled[:, i, None, None]
+        optimal |= closer.astype(np.int32) << i
+    lowest = optimal & -optimal
+
+    # moves[g, s] = OR over edges p -i-> g with dist[p, s] + 1 == dist[g, s]
+    # of the first move into p (i itself when p is the start).
+    moves = np.zeros(dist.shape, dtype=np.int32)
+    for i in range(n):
+        targets = perm[i]                                                   # p -> g
+        step = dist[:, targets, :] == dist + 1                              # (m, p, s)
+        step &= enabled[:, i, None, None]
+        first = lowest.copy()
+        first[:, nodes, nodes] = 1 << i
+        value = np.where(step, first, 0)
+        # scatter-OR over p: split p so no destination repeats within a group
+        rank = np.zeros(HEX_COUNT, dtype=np.intp)
+        counts = {}
+        for p_, g in enumerate(targets):
+            rank[p_] = counts.get(g, 0)
+            counts[g] = rank[p_] + 1
+        for r in range(max(counts.values())):
+            group = np.flatnonzero(rank == r)
+            moves[:, targets[group], :] |= value[:, group, :]
+
+    dist = dist.transpose(0, 2, 1)
+    moves = moves.transpose(0, 2, 1)
+
+    typecode = entry_typecode(n)
+    packed = (dist.astype(np.uint32) | (moves.astype(np.uint32) << DIST_BITS))
+    packed = packed.astype(np.uint16 if typecode == "H" else np.uint32)
+    return SolverTables(transitions, blob=memoryview(packed.tobytes()).cast(typecode))
+
+
+def verify(tables):
+    """Compare every mask with solve_mask; returns the list of masks that differ."""
+    return [
+        mask for mask in range(1 << len(tables.transitions))
+        if list(tables.table(mask)) != list(solve_mask(tables.transitions, mask))
+    ]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--out", default=os.path.join(SRC, "solver.bin"))
+    parser.add_argument("--numpy", action="store_true", help="batched NumPy solver")
+    parser.add_argument("--verify", action="store_true", help="check against the reference solver")
+    args = parser.parse_args()
+
+    t0 = time.perf_counter()
+    transitions = build_transitions([t["func"] for t in TRANSFORMATIONS])
+    if args.numpy:
+        tables = solve_all_numpy(transitions)
+    else:
+        tables = SolverTables(transitions)
+        tables.build_all()
+    t1 = time.perf_counter()
+    print(f"solved {1 << len(transitions)} masks in {t1 - t0:.2f}s")
+
+    if args.verify:
+        bad = verify(tables)
+        if bad:
+            sys.exit(f"{len(bad)} masks differ from the reference, e.g. {bad[:8]}")
+        print("verified against the reference solver")
+
+    save_tables(args.out, tables)
+    print(f"wrote {os.path.normpath(args.out)} ({os.path.getsize(args.out)} bytes)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,235 @@
+"""Monte Carlo runs of the headless game with bot policies.
+
+    python tools/simulate.py [--policy NAME ...] [--runs N] [--seed S] [--workers W] [--out rounds.csv]
+
+Each run goes from a full reset to deck completion or failure. Rounds are
+streamed to --out as CSV (one row per round); a per-policy summary is printed.
+reach is how many cards not yet in the deck the start card could get to within
+the move limit, with the transforms unlocked once the shop closed.
+"""
+import argparse
+import csv
+import multiprocessing
+import os
+import random
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, SRC)
+
+from engine import ALL_HEXAGRAMS, Bitboards, board_of, build_transitions, load_tables
+from gamestate import GameState
+from transforms import TRANSFORMATIONS
+
+ROUND_FIELDS = ("policy", "seed", "round", "success", "moves", "optimal", "ip", "hints", "bought", "balance", "reach")
+
+
+# --- Policies ---
+# shop() is asked repeatedly while the shop is open (return an index to buy, or None),
+# hint() before every move, move() for the transform to play.
+class RandomPolicy:
+    name = "random"
+
+    def shop(self, state, rng):
+        return None
+
+    def hint(self, state, rng):
+        return False
+
+    def move(self, state, rng):
+        return rng.choice([i for i in range(len(state.transitions)) if state.is_unlocked(i)])
+
+class GreedyPolicy(RandomPolicy):
+    """Always plays an optimal move (what the hint ring would show), never spends."""
+    name = "greedy"
+
+    def move(self, state, rng):
+        moves = state.hint_moves()
+        return moves[0] if moves else RandomPolicy.move(self, state, rng)
+
+class HintPolicy(RandomPolicy):
+    """Buys a hint before every move it can afford and follows it; random otherwise."""
+    name = "hints"
+
+    def hint(self, state, rng):
+        return state.balance >= state.hint_cost
+
+    def move(self, state, rng):
+        if state.hint_active:
+            return GreedyPolicy.move(self, state, rng)
+        return RandomPolicy.move(self, state, rng)
+
+class ShopPolicy(GreedyPolicy):
+    """Buys a change card whenever it can afford one, then plays greedily."""
+    name = "shop"
+
+    def shop(self, state, rng):
+        for i in range(len(state.transitions)):
+            if state.can_buy(i):
+                return i
+        return None
+
+class MixedPolicy(RandomPolicy):
+    """
+    A fallible player: plays an optimal move SKILL of the time, buys a hint
+    when the round is at risk and a change card when it can keep a hint's
+    cost in reserve, so every economy knob (and the move limit) matters.
+    """
+    name = "mixed"
+    SKILL = 0.75
+
+    def shop(self, state, rng):
+        if state.balance < state.buy_cost + state.hint_cost:
+            return None
+        return ShopPolicy.shop(self, state, rng)
+
+    def hint(self, state, rng):
+        at_risk = state.live_dist is not None and state.limit - state.moves <= state.live_dist + 1
+        return at_risk and not state.hint_active and state.balance >= state.hint_cost
+
+    def move(self, state, rng):
+        if state.hint_active or rng.random() < self.SKILL:
+            return GreedyPolicy.move(self, state, rng)
+        return RandomPolicy.move(self, state, rng)
+
+POLICIES = {p.name: p for p in (RandomPolicy, GreedyPolicy, HintPolicy, ShopPolicy, MixedPolicy)}
+
+
+# --- Simulation ---
+def load_solver():
+    transitions = build_transitions([t["func"] for t in TRANSFORMATIONS])
+    return load_tables(os.path.join(SRC, "solver.bin"), transitions)
+
+def play_run(solver, policy, seed, rules=None, boards=None):
+    """One full run; returns a row (see ROUND_FIELDS) per round."""
+    state = GameState(solver, seed, **(rules or {}))
+    boards = boards or Bitboards(solver.transitions)
+    rng = random.Random(f"bot-{seed}")   # the bot's own choices, a stream apart from the deal
+    state.toss(full_reset=True, seed=seed)
+    rows = []
+    rnd = 0
+    while True:
+        bought = 0
+        while state.shop_open:
+            idx = policy.shop(state, rng)
+            if idx is None or not state.buy(idx):
+                break
+            bought += 1
+        reach = boards.reachable_within(state.unlocked, 1 << state.current, state.limit)
+        reach = bin(reach & ALL_HEXAGRAMS & ~board_of(state.collected)).count("1")
+        while not state.outcome:
+            if policy.hint(state, rng):
+                state.buy_hint()
+            if state.play(policy.move(state, rng)) is None:
+                raise RuntimeError(f"{policy.name} played a locked transform (seed {seed})")
+        state.end_round()
+        rows.append((policy.name, seed, rnd, state.outcome == "success", state.moves,
+                     state.round_optimal, state.round_insight, state.round_hints, bought, state.balance, reach))
+        if state.outcome == "failure" or state.deck_complete:
+            return rows
+        state.toss(start=state.goal)
+        rnd += 1
+
+_SOLVER = None
+_BOARDS = None
+
+def _init_worker():
+    global _SOLVER, _BOARDS
+    _SOLVER = load_solver()
+    _BOARDS = Bitboards(_SOLVER.transitions)
+
+def _run_batch(task):
+    name, seeds, rules = task
+    policy = POLICIES[name]()
+    return [play_run(_SOLVER, policy, seed, rules, _BOARDS) for seed in seeds]
+
+def simulate(name, runs, seed=0, rules=None, workers=None, batch=64, pool=None):
+    """
+    Yield the rounds of each run (a list of rows) as batches finish, in any order.
+    Runs use seeds seed .. seed + runs - 1; pass pool to reuse worker processes.
+    """
+    tasks = [(name, range(s, min(s + batch, seed + runs)), rules) for s in range(seed, seed + runs, batch)]
+    own = pool is None
+    if own:
+        pool = multiprocessing.Pool(workers, initializer=_init_worker)
+    try:
+        for result in pool.imap_unordered(_run_batch, tasks):
+            yield from result
+    finally:
+        if own:
+            pool.close()
+            pool.join()
+
+class Summary:
+    """Running totals over runs (see report())."""
+
+    def __init__(self):
+        self.runs = self.completed = self.rounds = self.wins = 0
+        self.moves = self.optimal = self.ip = self.hints = self.bought = self.reach = 0
+
+    def add(self, rows):
+        self.runs += 1
+        self.completed += rows[-1][3]   # last round won → deck complete
+        for _, _, _, success, moves, optimal, ip, hints, bought, _, reach in rows:
+            self.rounds += 1
+            self.wins += success
+            self.moves += moves
+            self.optimal += optimal or 0
+            self.ip += ip
+            self.hints += hints
+            self.bought += bought
+            self.reach += reach
+
+    def report(self):
+        runs, rounds = max(self.runs, 1), max(self.rounds, 1)
+        return {
+            "runs": self.runs,
+            "completion": self.completed / runs,
+            "rounds/run": self.rounds / runs,
+            "win rate": self.wins / rounds,
+            "moves/round": self.moves / rounds,
+            "optimal/round": self.optimal / rounds,
+            "ip/round": self.ip / rounds,
+            "hints/round": self.hints / rounds,
+            "bought/run": self.bought / runs,
+            "reach/round": self.reach / rounds,
+        }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--policy", action="append", choices=sorted(POLICIES), help="repeatable (default: all)")
+    parser.add_argument("--runs", type=int, default=1000, help="runs per policy")
+    parser.add_argument("--seed", type=int, default=0, help="first run seed")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--out", help="write one CSV row per round here")
+    args = parser.parse_args()
+
+    out = open(args.out, "w", newline="") if args.out else None
+    writer = csv.writer(out) if out else None
+    if writer:
+        writer.writerow(ROUND_FIELDS)
+
+    pool = multiprocessing.Pool(args.workers, initializer=_init_worker)
+    try:
+        for name in args.policy or sorted(POLICIES):
+            summary = Summary()
+            t0 = time.perf_counter()
+            for rows in simulate(name, args.runs, args.seed, pool=pool):
+                summary.add(rows)
+                if writer:
+                    writer.writerows(rows)
+            elapsed = time.perf_counter() - t0
+            stats = "  ".join(f"{k}={v:.3f}" if isinstance(v, float) else f"{k}={v}"
+                              for k, v in summary.report().items())
+            print(f"{name:>7}: {stats}  ({summary.rounds / elapsed:,.0f} rounds/s)")
+    finally:
+        pool.close()
+        pool.join()
+        if out:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
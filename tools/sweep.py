@@ -0,0 +1,120 @@
+"""Grid sweep of the economy knobs over simulated runs.
+
+    python tools/sweep.py --buy-start-cost 4,6,8 --hint-cost 1,2 [--policy mixed] [--runs N] [--csv out.csv]
+
+Every combination of the given values (unlisted knobs keep their gamestate.py
+defaults) is simulated on all cores; prints completion rate, run length and
+the Insight Point curve (mean IP earned / balance after round k) per config.
+The default policy, mixed, reacts to every knob; with another one a swept
+knob may change nothing (shop never buys hints), which is warned about.
+"""
+import argparse
+import csv
+import itertools
+import multiprocessing
+import sys
+import time
+
+from simulate import POLICIES, _init_worker, simulate
+
+import gamestate
+
+# flag -> (GameState keyword, default)
+KNOBS = {
+    "buy-start-cost": ("buy_start_cost", gamestate.BUY_START_COST),
+    "buy-cost-step":  ("buy_cost_step", gamestate.BUY_COST_STEP),
+    "hint-cost":      ("hint_cost", gamestate.HINT_COST_IP),
+    "optimal-bonus":  ("optimal_bonus", gamestate.OPTIMAL_BONUS_IP),
+    "hint-penalty":   ("hint_penalty", gamestate.HINT_PENALTY_IP),
+    "limit":          ("limit", gamestate.TRANSFORMATION_LIMIT),
+}
+
+KNOB_NAMES = {kw for kw, _ in KNOBS.values()}
+CURVE_ROUNDS = (1, 8, 16, 32, 48, 64)   # IP curve sample points (rounds played)
+
+
+def int_list(text):
+    return [int(v) for v in text.split(",")]
+
+def grid(args):
+    """Every rules dict in the cartesian product of the knob values."""
+    names = [kw for kw, _ in KNOBS.values()]
+    values = [getattr(args, kw) or [default] for kw, default in KNOBS.values()]
+    return [dict(zip(names, combo)) for combo in itertools.product(*values)]
+
+def inert(results, swept):
+    """Swept knobs whose values gave identical summaries, whatever the other knobs were set to."""
+    out = []
+    for kw in swept:
+        outcomes = {}
+        for row in results:
+            others = tuple(row[k] for k in swept if k != kw)
+            outcomes.setdefault(others, set()).add(tuple(row[k] for k in row if k not in KNOB_NAMES))
+        if all(len(rows) == 1 for rows in outcomes.values()):
+            out.append(kw)
+    return out
+
+def run_config(pool, policy, runs, seed, rules):
+    """Aggregate one configuration; returns a summary dict."""
+    completed = rounds = 0
+    earned = [0] * max(CURVE_ROUNDS)    # sum over runs of cumulative IP after round k
+    balance = [0] * max(CURVE_ROUNDS)
+    reached = [0] * max(CURVE_ROUNDS)   # runs that played at least k rounds
+    for rows in simulate(policy, runs, seed, rules, pool=pool):
+        completed += rows[-1][3]
+        rounds += len(rows)
+        total = 0
+        for k, row in enumerate(rows[:len(earned)]):
+            total += row[6]
+            earned[k] += total
+            balance[k] += row[9]
+            reached[k] += 1
+
+    summary = {"completion": completed / runs, "rounds/run": rounds / runs}
+    for k in CURVE_ROUNDS:
+        n = reached[k - 1]
+        summary[f"ip@{k}"] = earned[k - 1] / n if n else None
+        summary[f"bal@{k}"] = balance[k - 1] / n if n else None
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    for flag, (kw, default) in KNOBS.items():
+        parser.add_argument(f"--{flag}", dest=kw, type=int_list, help=f"comma-separated (default {default})")
+    parser.add_argument("--policy", default="mixed", choices=sorted(POLICIES))
+    parser.add_argument("--runs", type=int, default=500, help="runs per configuration")
+    parser.add_argument("--seed", type=int, default=0, help="first run seed (same seeds for every config)")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--csv", help="also write the table here")
+    args = parser.parse_args()
+
+    configs = grid(args)
+    swept = [kw for kw, _ in KNOBS.values() if getattr(args, kw)]
+    results = []
+    t0 = time.perf_counter()
+    with multiprocessing.Pool(args.workers, initializer=_init_worker) as pool:
+        for rules in configs:
+            results.append({**rules, **run_config(pool, args.policy, args.runs, args.seed, rules)})
+    elapsed = time.perf_counter() - t0
+
+    columns = swept + list(results[0])[len(KNOBS):]
+    print("  ".join(f"{c:>10}" for c in columns))
+    for row in results:
+        cells = (row[c] for c in columns)
+        print("  ".join(f"{'-':>10}" if v is None else f"{v:>10.3f}" if isinstance(v, float) else f"{v:>10}"
+                        for v in cells))
+    print(f"{len(configs)} configs x {args.runs} runs ({args.policy}), {elapsed:.1f}s")
+    flags = {kw: flag for flag, (kw, _) in KNOBS.items()}
+    for kw in inert(results, [kw for kw in swept if len(set(getattr(args, kw))) > 1]):
+        print(f"warning: --{flags[kw]} made no difference under the {args.policy} policy", file=sys.stderr)
+
+    if args.csv:
+        with open(args.csv, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=list(results[0]))
+            writer.writeheader()
+            writer.writerows(results)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""Replay run logs (.hxr) headless and print their scores.
+
+    python tools/verify_replays.py PATH [PATH ...]   # files or directories
+
+Exits non-zero if any log fails to replay.
+"""
+import argparse
+import os
+import sys
+import time
+
+SRC = os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir, "src")
+sys.path.insert(0, SRC)
+
+from engine import build_transitions, load_tables
+from replay import ReplayError, replay
+from transforms import TRANSFORMATIONS
+
+
+def log_paths(paths):
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".hxr"):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("paths", nargs="+")
+    parser.add_argument("-q", "--quiet", action="store_true", help="summary only")
+    args = parser.parse_args()
+
+    transitions = build_transitions([t["func"] for t in TRANSFORMATIONS])
+    solver = load_tables(os.path.join(SRC, "solver.bin"), transitions)
+
+    logs = []
+    for path in log_paths(args.paths):
+        with open(path, "rb") as f:
+            logs.append((path, f.read()))
+
+    failed = 0
+    t0 = time.perf_counter()
+    for path, data in logs:
+        try:
+            state = replay(data, solver)
+        except ReplayError as e:
+            failed += 1
+            print(f"{path}: FAILED {e}")
+            continue
+        if not args.quiet:
+            print(f"{path}: seed={state.seed:08x} collected={len(state.collected)} "
+                  f"moves={state.total_moves} optimal={state.total_optimal} "
+                  f"insight={state.total_insight} spent={state.total_spent} hints={state.run_hints}")
+    elapsed = time.perf_counter() - t0
+
+    rate = len(logs) / elapsed * 60 if elapsed else 0
+    print(f"{len(logs)} logs, {failed} failed, {elapsed:.3f}s ({rate:,.0f} runs/min)")
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()